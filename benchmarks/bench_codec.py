@@ -0,0 +1,80 @@
+"""Скорость JSON бэкендов на ответах API из ``tests/fixtures``.
+
+Все JSON тела из кассет vcr разбираются и сериализуются обратно каждым установленным
+бэкендом ``vscaledriver.codec``, для каждого считается время на один проход по корпусу
+и ускорение относительно стандартного ``json``.
+
+Запуск из корня репозитория, пакет должен быть установлен (``pip install -e .[fast]``)::
+
+    python benchmarks/bench_codec.py --repeat 200
+"""
+import argparse
+import json
+import pathlib
+import sys
+import time
+from typing import List
+
+import yaml  # type: ignore[import]
+
+from vscaledriver import codec
+
+FIXTURES = pathlib.Path(__file__).parent.parent / "tests" / "fixtures"
+
+
+def load_bodies(fixtures: pathlib.Path = FIXTURES) -> List[bytes]:
+    """Тела ответов из кассет, которые являются JSON"""
+    bodies = []
+    for path in sorted(fixtures.glob("*.yaml")):
+        for interaction in yaml.safe_load(path.read_text())["interactions"]:
+            body = interaction["response"]["body"]["string"]
+            try:
+                json.loads(body)
+            except ValueError:
+                continue
+            bodies.append(body.encode("utf-8") if isinstance(body, str) else body)
+    return bodies
+
+
+def measure(backend: codec.Codec, bodies: List[bytes], repeat: int) -> dict:
+    objects = [backend.loads(body) for body in bodies]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for body in bodies:
+            backend.loads(body)
+    loads = (time.perf_counter() - started) / repeat
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for obj in objects:
+            backend.dumps(obj)
+    dumps = (time.perf_counter() - started) / repeat
+    return {"loads_us": loads * 1e6, "dumps_us": dumps * 1e6}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    bodies = load_bodies()
+    print(f"{len(bodies)} bodies, {sum(map(len, bodies))} bytes")
+    report = {}
+    for name in codec.BACKENDS:
+        try:
+            backend = codec.get_codec(name)
+        except ImportError:
+            print(f"{name:<7} not installed")
+            continue
+        report[name] = measure(backend, bodies, args.repeat)
+
+    base = report["json"]
+    for name, r in report.items():
+        print(
+            f"{name:<7} loads {r['loads_us']:8.1f} us (x{base['loads_us'] / r['loads_us']:.1f})  "
+            f"dumps {r['dumps_us']:8.1f} us (x{base['dumps_us'] / r['dumps_us']:.1f})"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
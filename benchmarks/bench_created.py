@@ -0,0 +1,48 @@
+"""Микробенчмарк разбора поля ``created`` скалетов.
+
+Запуск из корня репозитория, пакет должен быть установлен (``pip install -e .``)::
+
+    python benchmarks/bench_created.py
+"""
+import datetime
+import json
+import pathlib
+import timeit
+
+import yaml  # type: ignore[import]
+
+from vscaledriver import VscaleDriver, parse_created
+
+FIXTURE = pathlib.Path(__file__).parent.parent / "tests" / "fixtures" / "list_nodes.yaml"
+NUMBER = 20000
+
+
+def load_scalets():
+    cassette = yaml.safe_load(FIXTURE.read_text())
+    return json.loads(cassette["interactions"][0]["response"]["body"]["string"])
+
+
+def per_call_ns(stmt) -> float:
+    best = min(timeit.repeat(stmt, number=NUMBER, repeat=5))
+    return best / NUMBER * 1e9
+
+
+def main():
+    scalet = load_scalets()[0]
+    created = scalet["created"]
+
+    eager = VscaleDriver("token")
+    deferred = VscaleDriver("token", ex_defer_created=True)
+
+    results = [
+        ("strptime", per_call_ns(lambda: datetime.datetime.strptime(created, "%d.%m.%Y %H:%M:%S"))),
+        ("parse_created", per_call_ns(lambda: parse_created(created))),
+        ("_to_node, eager created", per_call_ns(lambda: eager._to_node(dict(scalet)))),
+        ("_to_node, deferred created", per_call_ns(lambda: deferred._to_node(dict(scalet)))),
+    ]
+    for name, ns in results:
+        print(f"{name:<28} {ns:8.0f} ns/node")
+
+
+if __name__ == "__main__":
+    main()
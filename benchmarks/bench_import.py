@@ -0,0 +1,94 @@
+"""Время холодного импорта драйверов.
+
+Каждый замер - отдельный процесс Python, в котором импортируется только нужный драйвер.
+Считается время импорта (без старта интерпретатора) и сколько модулей при этом загружено,
+результат можно сохранить в JSON и сравнить с прошлым запуском.
+
+Запуск из корня репозитория, пакет должен быть установлен (``pip install -e .``)::
+
+    python benchmarks/bench_import.py --output import.json
+    python benchmarks/bench_import.py --compare import.json --threshold 20
+"""
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+from typing import List
+
+TARGETS = {
+    "vscaledriver": "import vscaledriver",
+    "dns": "from vscaledriver import VscaleDns",
+    "compute": "from vscaledriver import VscaleDriver",
+    "compute+dns": "from vscaledriver import VscaleDns, VscaleDriver",
+    "aio": "import vscaledriver.aio",
+}
+
+PROBE = """
+import sys, time
+before = set(sys.modules)
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+loaded = set(sys.modules) - before
+print(elapsed, len(loaded), int("libcloud.compute.base" in loaded), int("libcloud.dns.base" in loaded))
+"""
+
+
+def measure(statement: str, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(statement=statement)], check=True, capture_output=True, text=True
+        ).stdout.split()
+        times.append(float(output[0]))
+    return {
+        "median_ms": statistics.median(times) * 1000,
+        "min_ms": min(times) * 1000,
+        "modules": int(output[1]),
+        "compute_stack": bool(int(output[2])),
+        "dns_stack": bool(int(output[3])),
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """Цели, у которых медиана выросла больше чем на ``threshold`` процентов"""
+    regressions = []
+    for name, result in report.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        change = (result["median_ms"] - old["median_ms"]) / old["median_ms"] * 100
+        if change > threshold:
+            regressions.append(f"{name}: +{change:.1f}% import time")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--output", type=pathlib.Path, help="куда сохранить результат в JSON")
+    parser.add_argument("--compare", type=pathlib.Path, help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--threshold", type=float, default=20, help="допустимый рост времени импорта, проценты")
+    args = parser.parse_args(argv)
+
+    report = {name: measure(statement, args.repeat) for name, statement in TARGETS.items()}
+    for name, r in report.items():
+        stacks = "+".join(s for s in ("compute", "dns") if r[f"{s}_stack"]) or "-"
+        print(
+            f"{name:<12} median {r['median_ms']:7.1f} ms  min {r['min_ms']:7.1f} ms  {r['modules']:4d} modules  stack: {stacks}"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
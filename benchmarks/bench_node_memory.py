@@ -0,0 +1,49 @@
+"""Память, занимаемая нодами ``list_nodes`` в обычном и компактном режиме.
+
+Запуск из корня репозитория, пакет должен быть установлен (``pip install -e .``)::
+
+    python benchmarks/bench_node_memory.py
+"""
+import json
+import pathlib
+import tracemalloc
+
+import yaml  # type: ignore[import]
+
+from vscaledriver import VscaleDriver
+
+FIXTURE = pathlib.Path(__file__).parent.parent / "tests" / "fixtures" / "list_nodes.yaml"
+NODES = 20000
+
+
+def load_scalets():
+    cassette = yaml.safe_load(FIXTURE.read_text())
+    scalets = json.loads(cassette["interactions"][0]["response"]["body"]["string"])
+    return [dict(scalets[i % len(scalets)], ctid=i, name=f"node-{i}") for i in range(NODES)]
+
+
+def retained_bytes(driver: VscaleDriver, scalets: list) -> int:
+    # ответ API в памяти уже есть, считаем только то, что остаётся после разбора
+    payload = json.dumps(scalets)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = [driver._to_node(n) for n in json.loads(payload)]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del nodes
+    return size
+
+
+def main():
+    scalets = load_scalets()
+    for name, driver in (
+        ("Node", VscaleDriver("token")),
+        ("Node, deferred created", VscaleDriver("token", ex_defer_created=True)),
+        ("VscaleNodeView", VscaleDriver("token", ex_compact_nodes=True)),
+    ):
+        size = retained_bytes(driver, scalets)
+        print(f"{name:<24} {size / NODES:8.0f} bytes/node  {size / 2**20:7.1f} MiB per {NODES} nodes")
+
+
+if __name__ == "__main__":
+    main()
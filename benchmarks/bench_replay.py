@@ -0,0 +1,258 @@
+"""Бенчмарк драйверов на записанных ответах API из ``tests/fixtures``.
+
+Кассеты vcr раздаются локальным HTTP сервером с настраиваемой задержкой, операции
+``VscaleDriver`` и ``VscaleDns`` выполняются последовательно и в нескольких потоках.
+Для каждой операции считаются ops/s, p50/p99 задержки и пик памяти на операцию,
+результат сохраняется в JSON, который можно сравнить с прошлым запуском.
+
+Запуск из корня репозитория, пакет должен быть установлен (``pip install -e .``)::
+
+    python benchmarks/bench_replay.py --latency 5 --output bench.json
+    python benchmarks/bench_replay.py --compare bench.json --threshold 10
+"""
+import argparse
+import importlib.metadata
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urlsplit
+
+import libcloud
+import yaml  # type: ignore[import]
+from libcloud.dns.base import Zone
+
+from vscaledriver import VscaleDns, VscaleDriver
+
+FIXTURES = pathlib.Path(__file__).parent.parent / "tests" / "fixtures"
+HOP_BY_HOP = {"connection", "content-length", "transfer-encoding", "set-cookie", "date"}
+
+
+def load_responses(fixtures: pathlib.Path = FIXTURES) -> Dict[Tuple[str, str], dict]:
+    """(метод, путь) -> первый успешный ответ из кассет, если успешных нет - первый любой"""
+    responses: Dict[Tuple[str, str], dict] = {}
+    for path in sorted(fixtures.glob("*.yaml")):
+        for interaction in yaml.safe_load(path.read_text())["interactions"]:
+            request = interaction["request"]
+            url = urlsplit(request["uri"])
+            key = (request["method"], url.path + (f"?{url.query}" if url.query else ""))
+            response = interaction["response"]
+            current = responses.get(key)
+            if current is None or (current["status"]["code"] >= 300 and response["status"]["code"] < 300):
+                responses[key] = response
+    return responses
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # заголовки и тело уходят отдельными пакетами, без TCP_NODELAY каждый ответ ждёт delayed ACK
+    disable_nagle_algorithm = True
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        response = self.server.responses.get((self.command, self.path))
+        if response is None:
+            status, headers, body = 404, {"Content-Type": "application/json"}, b'{"error": "not_found"}'
+        else:
+            status = response["status"]["code"]
+            headers = {k: v[0] for k, v in response["headers"].items() if k.lower() not in HOP_BY_HOP}
+            body = (response["body"]["string"] or "").encode("utf-8")
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+    responses: Dict[Tuple[str, str], dict] = {}
+    latency: float = 0
+
+
+def start_server(latency: float) -> ReplayServer:
+    server = ReplayServer(("127.0.0.1", 0), ReplayHandler)
+    server.responses = load_responses()
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_operations(host: str, port: int) -> Dict[str, Callable[[], object]]:
+    compute = VscaleDriver("token", secure=False, host=host, port=port)
+    dns = VscaleDns("token", secure=False, host=host, port=port)
+    zone = Zone("68155", "cloudsea.ru", "master", ttl=None, driver=dns)
+    return {
+        "compute.list_nodes": compute.list_nodes,
+        "compute.ex_iter_nodes": lambda: list(compute.ex_iter_nodes()),
+        "compute.list_sizes": compute.list_sizes,
+        "compute.list_images": compute.list_images,
+        "compute.list_locations": compute.list_locations,
+        "compute.list_key_pairs": compute.list_key_pairs,
+        "dns.list_zones": dns.list_zones,
+        "dns.get_zone": lambda: dns.get_zone("cloudsea.ru"),
+        "dns.list_records": lambda: dns.list_records(zone),
+        "dns.export_zone_to_bind_format": lambda: dns.export_zone_to_bind_format(zone),
+    }
+
+
+def package_version():
+    try:
+        return importlib.metadata.version("vscaledriver")
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_sequential(op: Callable[[], object], iterations: int) -> List[float]:
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        op()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run_concurrent(op: Callable[[], object], iterations: int, concurrency: int) -> List[float]:
+    def timed(_):
+        started = time.perf_counter()
+        op()
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(timed, range(iterations)))
+
+
+def peak_memory_per_op(op: Callable[[], object], iterations: int) -> float:
+    # пик выделенной памяти на одну операцию, без учёта уже занятой
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            tracemalloc.reset_peak()
+            before, _peak = tracemalloc.get_traced_memory()
+            op()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return statistics.mean(peaks)
+
+
+def benchmark(args) -> dict:
+    server = start_server(args.latency / 1000)
+    host, port = server.server_address
+    operations = build_operations(host, port)
+    if args.ops:
+        operations = {name: op for name, op in operations.items() if any(name.startswith(p) for p in args.ops)}
+
+    results = []
+    try:
+        for name, op in operations.items():
+            op()  # прогрев соединения
+            for mode, concurrency in (("sequential", 1), ("concurrent", args.concurrency)):
+                started = time.perf_counter()
+                if concurrency == 1:
+                    latencies = run_sequential(op, args.iterations)
+                else:
+                    latencies = run_concurrent(op, args.iterations, concurrency)
+                elapsed = time.perf_counter() - started
+                results.append(
+                    {
+                        "operation": name,
+                        "mode": mode,
+                        "concurrency": concurrency,
+                        "ops": len(latencies),
+                        "ops_per_sec": len(latencies) / elapsed,
+                        "p50_ms": percentile(latencies, 0.5) * 1000,
+                        "p99_ms": percentile(latencies, 0.99) * 1000,
+                    }
+                )
+            mem = peak_memory_per_op(op, min(args.iterations, 50))
+            for result in results[-2:]:
+                result["mem_peak_bytes_per_op"] = mem
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return {
+        "meta": {
+            "vscaledriver": package_version(),
+            "libcloud": libcloud.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency_ms": args.latency,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """Операции, у которых ops/s упал больше чем на ``threshold`` процентов"""
+    previous = {(r["operation"], r["mode"]): r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        old = previous.get((result["operation"], result["mode"]))
+        if old is None:
+            continue
+        change = (result["ops_per_sec"] - old["ops_per_sec"]) / old["ops_per_sec"] * 100
+        if change < -threshold:
+            regressions.append(f"{result['operation']} ({result['mode']}): {change:.1f}% ops/s")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--latency", type=float, default=0, help="задержка ответа сервера, мс")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--ops", nargs="*", help="префиксы операций, например dns. или compute.list_nodes")
+    parser.add_argument("--output", type=pathlib.Path, help="куда сохранить результат в JSON")
+    parser.add_argument("--compare", type=pathlib.Path, help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--threshold", type=float, default=10, help="допустимое падение ops/s, проценты")
+    args = parser.parse_args(argv)
+
+    report = benchmark(args)
+    for r in report["results"]:
+        print(
+            f"{r['operation']:<34} {r['mode']:<10} {r['ops_per_sec']:9.1f} ops/s "
+            f"p50 {r['p50_ms']:7.2f} ms  p99 {r['p99_ms']:7.2f} ms  {r['mem_peak_bytes_per_op'] / 1024:8.1f} KiB/op"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
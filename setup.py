@@ -23,6 +23,7 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url=url,
     install_requires=["apache-libcloud>=3.0.0"],
+    extras_require={"async": ["aiohttp>=3.7"], "fast": ["orjson>=3"]},
     packages=setuptools.find_packages(),
     classifiers=[
         "Intended Audience :: System Administrators",
@@ -0,0 +1,226 @@
+import asyncio
+
+import pytest
+import vcr
+from libcloud.common.types import InvalidCredsError, ProviderError
+from libcloud.compute.types import NodeState
+
+aiohttp = pytest.importorskip("aiohttp")
+
+from vscaledriver.aio import AsyncSingleFlight  # noqa: E402
+from vscaledriver.aio import AsyncVscaleDns, AsyncVscaleDriver, close_shared_session  # noqa: E402
+from vscaledriver.catalogstore import CatalogStore  # noqa: E402
+from vscaledriver.fake import FakeVscaleApi  # noqa: E402
+from vscaledriver.retry import CircuitBreaker, is_transient_error  # noqa: E402
+
+
+def run(coro):
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            await close_shared_session()
+
+    return asyncio.run(wrapper())
+
+
+@vcr.use_cassette("./tests/fixtures/list_sizes.yaml", filter_headers=["X-Token"])
+def test_async_list_sizes(vscale_key):
+    conn = AsyncVscaleDriver(key=vscale_key)
+    sizes = run(conn.list_sizes(location="msk0"))
+    size = sizes.pop()
+    assert size.id == "monster"
+    assert size.ram == 8192
+
+
+@vcr.use_cassette("./tests/fixtures/list_nodes.yaml", filter_headers=["X-Token"])
+def test_async_list_nodes(vscale_key):
+    conn = AsyncVscaleDriver(key=vscale_key)
+    nodes = run(conn.list_nodes())
+    assert nodes[0].id == "3547397"
+    assert nodes[0].driver is conn
+
+
+@vcr.use_cassette("./tests/fixtures/list_nodes.yaml", filter_headers=["X-Token"], allow_playback_repeats=True)
+def test_async_list_node_changes(vscale_key):
+    conn = AsyncVscaleDriver(key=vscale_key)
+    changes = run(conn.ex_list_node_changes())
+    assert [n.id for n in changes.added] == ["3547397", "3547400"]
+    assert not run(conn.ex_list_node_changes(since=changes.snapshot))
+
+
+def test_async_node_watcher():
+    with FakeVscaleApi() as api:
+        conn = AsyncVscaleDriver("token", **api.driver_kwargs())
+
+        async def scenario():
+            node = await conn.create_node("node", (await conn.list_sizes())[0], (await conn.list_images())[0])
+            watcher = conn.ex_node_watcher(wait_period=0.01, max_wait_period=0.02)
+            transition = asyncio.get_running_loop().create_future()
+            watcher.subscribe(lambda t: transition.done() or transition.set_result(t))
+            async with watcher:
+                while watcher.polls == 0:
+                    await asyncio.sleep(0.01)
+                await conn.stop_node(node)
+                return await asyncio.wait_for(transition, 5)
+
+        transition = run(scenario())
+        assert transition.old_state is NodeState.RUNNING
+        assert transition.new_state is NodeState.STOPPED
+
+
+@vcr.use_cassette("./tests/fixtures/dns_get_zone.yaml", filter_headers=["X-Token"])
+def test_async_dns_get_zone(vscale_key):
+    conn = AsyncVscaleDns(key=vscale_key)
+    zone = run(conn.get_zone("cloudsea.ru"))
+    assert zone.id == "68155"
+    assert zone.domain == "cloudsea.ru"
+
+
+@vcr.use_cassette("./tests/fixtures/dns_get_zone_not_folund.yaml", filter_headers=["X-Token"])
+def test_async_dns_get_zone_not_found(vscale_key):
+    conn = AsyncVscaleDns(key=vscale_key)
+    with pytest.raises(ProviderError, match="domain_not_found") as exc_info:
+        run(conn.get_zone("example.com"))
+    assert exc_info.value.http_code == 404
+
+
+@vcr.use_cassette(
+    "./tests/fixtures/dns_list_zones_unauthorized.yaml",
+    filter_headers=["X-Token"],
+    decode_compressed_response=True,
+)
+def test_async_dns_list_zones_unauthorized():
+    conn = AsyncVscaleDns(key="key")
+    with pytest.raises(InvalidCredsError):
+        run(conn.list_zones())
+
+
+def test_async_coalesce_requests():
+    with FakeVscaleApi(latency=0.1) as api:
+        flight = AsyncSingleFlight()
+        conn = AsyncVscaleDns("token", ex_coalesce_requests=flight, **api.driver_kwargs())
+
+        async def scenario():
+            await conn.create_zone("cloudsea.ru")
+            return await asyncio.gather(*(conn.list_zones() for _ in range(5)))
+
+        results = run(scenario())
+        assert api.requests == 2
+        assert flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+        assert all(r[0].domain == "cloudsea.ru" for r in results)
+
+
+def test_async_coalesce_parsed_in_place():
+    with FakeVscaleApi(latency=0.05) as api:
+        flight = AsyncSingleFlight()
+        conn = AsyncVscaleDns("token", ex_coalesce_requests=flight, **api.driver_kwargs())
+
+        async def scenario():
+            zone = await conn.create_zone("cloudsea.ru")
+            await conn.create_record("www.cloudsea.ru", zone, "A", "10.0.0.1")
+            zones = await asyncio.gather(*(conn.get_zone(zone.id) for _ in range(5)))
+            records = await asyncio.gather(*(conn.list_records(zone) for _ in range(5)))
+            return zone, zones, records
+
+        zone, zones, records = run(scenario())
+        assert flight.stats()["coalesced"] == 8
+        assert all(z.id == zone.id and z.domain == "cloudsea.ru" for z in zones)
+        assert all(len(r) == len(records[0]) and r[0].id == records[0][0].id for r in records)
+
+
+def test_async_list_zones_fills_zone_cache():
+    with FakeVscaleApi() as api:
+        conn = AsyncVscaleDns("token", ex_zone_cache_ttl=60, **api.driver_kwargs())
+
+        async def scenario():
+            created = await conn.create_zone("cloudsea.ru")
+            conn.ex_invalidate_zone_cache()
+            (listed,) = await conn.list_zones()
+            requests = api.requests
+            zone = await conn.get_zone("cloudsea.ru")
+            assert api.requests == requests
+            return created, listed, zone
+
+        created, listed, zone = run(scenario())
+        assert listed.extra == zone.extra == created.extra
+        assert zone is not listed
+
+
+def test_async_catalog_store(tmp_path):
+    with FakeVscaleApi() as api:
+        kwargs = api.driver_kwargs()
+        conn = AsyncVscaleDriver("token", ex_catalog_store=CatalogStore(tmp_path, max_age=0), **kwargs)
+        images = run(conn.list_images())
+
+        async def stale_read():
+            result = await conn.list_images()
+            await asyncio.gather(*conn._catalog_refreshes)
+            return result
+
+        assert [i.id for i in run(stale_read())] == [i.id for i in images]
+        assert api.requests == 2
+
+    conn = AsyncVscaleDriver("token", ex_catalog_store=tmp_path, **kwargs)
+    assert [i.id for i in run(conn.list_images())] == [i.id for i in images]
+
+
+def test_async_transient_errors():
+    assert is_transient_error(aiohttp.ServerDisconnectedError())
+    assert is_transient_error(aiohttp.ClientPayloadError("truncated"))
+    assert is_transient_error(asyncio.TimeoutError())
+    assert not is_transient_error(ValueError())
+
+
+def test_async_cancelled_trial_releases_circuit():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, timer=lambda: now[0])
+    breaker.record("v1/domains/", aiohttp.ServerDisconnectedError())
+    now[0] = 10
+    with FakeVscaleApi(latency=0.2) as api:
+        conn = AsyncVscaleDns("token", ex_circuit_breaker=breaker, **api.driver_kwargs())
+
+        async def scenario():
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(conn.list_zones(), 0.05)
+            assert breaker.state("v1/domains/") == "half-open"
+            # отменённый пробный запрос не занимает цепь: следующий проходит и замыкает её
+            return await conn.list_zones()
+
+        assert run(scenario()) == []
+        assert breaker.state("v1/domains/") == "closed"
+
+
+def test_async_coalesce_cancelled_leader():
+    with FakeVscaleApi(latency=0.1) as api:
+        flight = AsyncSingleFlight()
+        conn = AsyncVscaleDns("token", ex_coalesce_requests=flight, **api.driver_kwargs())
+
+        async def scenario():
+            leader = asyncio.ensure_future(conn.list_zones())
+            await asyncio.sleep(0.02)
+            followers = asyncio.gather(*(conn.list_zones() for _ in range(3)))
+            await asyncio.sleep(0.02)
+            leader.cancel()
+            # отмена ведущего не отменяет ведомых: один из них повторяет запрос
+            return await followers
+
+        assert run(scenario()) == [[], [], []]
+        assert flight.stats() == {"calls": 2, "coalesced": 2, "in_flight": 0}
+
+
+def test_async_node_watcher_refcount():
+    with FakeVscaleApi() as api:
+        conn = AsyncVscaleDriver("refcount token", **api.driver_kwargs())
+
+        async def scenario():
+            watcher = conn.ex_node_watcher(wait_period=0.01, max_wait_period=0.02)
+            async with watcher:
+                async with conn.ex_node_watcher():
+                    pass
+                running = watcher._task is not None and not watcher._task.done()
+            return running, watcher._task
+
+        running, task = run(scenario())
+        assert running
+        assert task is None
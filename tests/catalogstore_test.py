@@ -0,0 +1,68 @@
+import json
+
+from vscaledriver import VscaleDriver
+from vscaledriver.catalogstore import CatalogStore
+from vscaledriver.fake import FakeVscaleApi
+
+
+def test_catalog_store_cold_start(tmp_path):
+    with FakeVscaleApi() as api:
+        kwargs = api.driver_kwargs()
+        driver = VscaleDriver("token", ex_catalog_store=tmp_path, **kwargs)
+        images = driver.list_images()
+        sizes = driver.list_sizes(location="spb0")
+        locations = driver.list_locations()
+        assert api.requests == 3
+        assert len(list(tmp_path.glob("*.json"))) == 3
+
+    # API уже остановлен: новый процесс берёт справочники с диска
+    driver = VscaleDriver("token", ex_catalog_store=str(tmp_path), **kwargs)
+    assert [i.id for i in driver.list_images()] == [i.id for i in images]
+    assert [s.id for s in driver.list_sizes(location="spb0")] == [s.id for s in sizes]
+    assert [loc.id for loc in driver.list_locations()] == [loc.id for loc in locations]
+    assert driver.ex_catalog_cache_stats() == {"store": {"hits": 3, "stale_hits": 0, "misses": 0, "refreshes": 0}}
+
+
+def test_catalog_store_background_revalidation(tmp_path):
+    with FakeVscaleApi() as api:
+        store = CatalogStore(tmp_path, max_age=0)
+        driver = VscaleDriver("token", ex_catalog_store=store, **api.driver_kwargs())
+        images = driver.list_images()
+        fetched_at = store.load(driver._catalog_key("v1/images")).fetched_at
+
+        assert [i.id for i in driver.list_images()] == [i.id for i in images]
+        assert store.wait_refreshed(5)
+        assert api.requests == 2
+        assert store.stats()["stale_hits"] == 1
+        assert store.load(driver._catalog_key("v1/images")).fetched_at > fetched_at
+
+
+def test_catalog_store_ignores_broken_files(tmp_path):
+    store = CatalogStore(tmp_path)
+    store.save("api.vscale.io/v1/images", [{"id": "image"}])
+    assert store.load("api.vscale.io/v1/images").data == [{"id": "image"}]
+
+    file = next(tmp_path.glob("*.json"))
+    content = json.loads(file.read_text())
+    file.write_text(json.dumps(dict(content, version=CatalogStore.VERSION + 1)))
+    assert store.load("api.vscale.io/v1/images") is None
+
+    file.write_text('{"version": 1, "key": "api.vscale.io/v1/ima')
+    assert store.load("api.vscale.io/v1/images") is None
+
+    store.save("api.vscale.io/v1/images", [])
+    store.invalidate()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_catalog_store_unwritable(tmp_path, caplog):
+    (tmp_path / "file").write_text("")
+    store = CatalogStore(tmp_path / "file" / "store")
+    with FakeVscaleApi() as api:
+        driver = VscaleDriver("token", ex_catalog_store=store, **api.driver_kwargs())
+        # API ответил, запрос не падает из-за того, что справочник некуда сохранить
+        assert driver.list_images()
+        assert driver.list_images()
+        assert api.requests == 2
+    assert isinstance(store.last_error, OSError)
+    assert "Failed to save catalog" in caplog.text
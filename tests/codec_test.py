@@ -0,0 +1,47 @@
+import pytest
+
+from vscaledriver import VscaleDns, VscaleDriver, codec
+from vscaledriver.fake import FakeVscaleApi
+
+PUBLIC_KEY = "ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIDdlUgMYerMvfRdmMWOSYbbVTkq5kjawV8nwQq0Ify6P user@archlinux"
+
+
+@pytest.fixture(params=list(codec.BACKENDS))
+def backend(request):
+    try:
+        previous = codec.set_codec(request.param)
+    except ImportError:
+        pytest.skip(f"{request.param} is not installed")
+    yield request.param
+    codec.set_codec(previous)
+
+
+def test_codec_roundtrip(backend):
+    payload = {"name": "узел", "ttl": 300, "keys": [1, 2], "extra": None}
+    data = codec.dumps(payload)
+    assert isinstance(data, bytes)
+    assert codec.loads(data) == payload
+    assert codec.loads(data.decode("utf-8")) == payload
+    assert codec.current_codec().name == backend
+
+
+def test_codec_drivers(backend):
+    with FakeVscaleApi() as api:
+        driver = VscaleDriver("token", ex_compact_nodes=True, **api.driver_kwargs())
+        key_pair = driver.create_key_pair("ключ", PUBLIC_KEY)
+        assert driver.get_key_pair("ключ").extra["id"] == key_pair.extra["id"]
+
+        driver.create_node("узел", driver.list_sizes()[0], driver.list_images()[0])
+        (node,) = driver.list_nodes()
+        assert node.name == "узел"
+        assert node.extra["name"] == "узел"
+
+        dns = VscaleDns("token", **api.driver_kwargs())
+        zone = dns.create_zone("cloudsea.ru")
+        record = dns.create_record("cloudsea.ru", zone, "TXT", "проверка")
+        assert dns.get_record(zone.id, record.id).data == "проверка"
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="unknown JSON backend"):
+        codec.get_codec("yaml")
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+from vscaledriver import VscaleDns, VscaleDriver
+
+
+@pytest.fixture()
+def vscale_key() -> str:
+    key = os.getenv("DRIVER_TOKEN")
+    if key is None:
+        pytest.exit("set up DRIVER_TOKEN environment variable")
+    return str(key)
+
+
+@pytest.fixture()
+def compute_conn(vscale_key):
+    conn = VscaleDriver(key=vscale_key)
+    return conn
+
+
+@pytest.fixture()
+def dns_conn(vscale_key):
+    conn = VscaleDns(key=vscale_key)
+    return conn
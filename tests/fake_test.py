@@ -0,0 +1,374 @@
+import time
+
+import pytest
+from libcloud.common.exceptions import BaseHTTPError, RateLimitReachedError
+from libcloud.common.types import InvalidCredsError, ProviderError
+from libcloud.compute.base import NodeAuthSSHKey, NodeSize
+from libcloud.compute.types import KeyPairDoesNotExistError, NodeState
+from libcloud.dns.base import Zone
+from libcloud.dns.types import RecordAlreadyExistsError, RecordDoesNotExistError, RecordError, ZoneDoesNotExistError
+
+from vscaledriver import VscaleDns, VscaleDriver
+from vscaledriver.fake import FakeApiError, FakeVscaleApi
+from vscaledriver.metrics import RequestMetrics
+from vscaledriver.retry import RetryPolicy
+
+PUBLIC_KEY = "ssh-ed25519 AAAAC3NzaC1lZDI1NTE5AAAAIDdlUgMYerMvfRdmMWOSYbbVTkq5kjawV8nwQq0Ify6P user@archlinux"
+
+
+@pytest.fixture()
+def fake_api():
+    with FakeVscaleApi() as api:
+        yield api
+
+
+def test_fake_compute_lifecycle(fake_api):
+    driver = VscaleDriver("token", **fake_api.driver_kwargs())
+    size = driver.list_sizes(location="spb0")[0]
+    image = driver.list_images()[0]
+
+    result = driver.ex_create_nodes([{"name": f"node-{i}", "size": size, "image": image} for i in range(20)], concurrency=4)
+    assert len(result.succeeded) == 20
+    nodes = driver.list_nodes()
+    assert len(nodes) == 20
+    assert all(n.state is NodeState.RUNNING for n in nodes)
+
+    node = nodes[0]
+    assert driver.stop_node(node)
+    assert driver.list_nodes()[0].state is NodeState.STOPPED
+    assert driver.start_node(node)
+    assert driver.destroy_node(node)
+    assert len(driver.list_nodes()) == 19
+
+    # настоящий API отвечает 500 на удаление несуществующего скалета
+    with pytest.raises(BaseHTTPError) as e:
+        driver.destroy_node(node)
+    assert e.value.code == 500
+
+
+def test_fake_catalog_extra_copies(fake_api):
+    driver = VscaleDriver("token", ex_catalog_cache_ttl=60, **fake_api.driver_kwargs())
+    driver.list_sizes()[0].extra["locations"].append("nowhere")
+    driver.list_images()[0].extra["locations"].clear()
+    driver.list_locations()[0].extra["description"] = "changed"
+    # кэш каталогов не меняется через extra
+    assert "nowhere" not in driver.list_sizes()[0].extra["locations"]
+    assert driver.list_images()[0].extra["locations"]
+    assert driver.list_locations()[0].extra["description"] != "changed"
+
+
+def test_fake_key_pairs(fake_api):
+    driver = VscaleDriver("token", **fake_api.driver_kwargs())
+    key_pair = driver.create_key_pair("example key", PUBLIC_KEY)
+    assert driver.get_key_pair("example key").extra["id"] == key_pair.extra["id"]
+    assert driver.delete_key_pair(key_pair)
+    assert driver.list_key_pairs() == []
+
+
+def test_fake_create_node_ssh_key(fake_api):
+    driver = VscaleDriver("token", **fake_api.driver_kwargs())
+    other = VscaleDriver("token", **fake_api.driver_kwargs())
+    size = driver.list_sizes(location="spb0")[0]
+    image = driver.list_images()[0]
+    key_pair = other.create_key_pair("example key", PUBLIC_KEY)
+
+    # ключ добавлен в обход индекса драйвера и передан без комментария
+    auth = NodeAuthSSHKey(PUBLIC_KEY.rsplit(" ", 1)[0])
+    node = driver.create_node("node", size, image, auth=auth)
+    assert fake_api.state.get_scalet(int(node.id))["keys"] == [{"id": key_pair.extra["id"], "name": "example key"}]
+
+    with pytest.raises(KeyPairDoesNotExistError):
+        driver.create_node("node", size, image, auth=NodeAuthSSHKey("ssh-ed25519 AAAAunknown"))
+
+    # настоящий API отвечает 400 на неизвестный id ключа
+    with pytest.raises(FakeApiError, match="key_not_found"):
+        fake_api.state.add_scalet("node", keys=[key_pair.extra["id"] + 1])
+
+
+def test_fake_create_node_unknown_rplan(fake_api):
+    driver = VscaleDriver("token", **fake_api.driver_kwargs())
+    image = driver.list_images()[0]
+    broken = NodeSize(id="broken", name="broken", ram=0, disk=0, price=0, driver=driver, bandwidth=0)
+    with pytest.raises(ProviderError) as e:
+        driver.create_node("bad", broken, image)
+    assert e.value.http_code == 404
+    assert e.value.value == "rplan_not_found"
+
+
+def test_fake_key_pair_index_expires(fake_api):
+    driver = VscaleDriver("token", ex_key_pair_index_ttl=0.05, **fake_api.driver_kwargs())
+    other = VscaleDriver("token", **fake_api.driver_kwargs())
+    key_pair = other.create_key_pair("example key", PUBLIC_KEY)
+    indexed = driver.get_key_pair("example key")
+    # в списке ключей extra - только id, как и до индекса
+    assert indexed.extra == {"id": key_pair.extra["id"]}
+
+    # ключ удалён другим процессом: после ttl индекс перечитывается
+    other.delete_key_pair(key_pair)
+    assert driver.get_key_pair("example key") is indexed
+    time.sleep(0.06)
+    assert driver.get_key_pair("example key") is None
+
+    # 404 на удаление тоже убирает ключ из индекса
+    driver = VscaleDriver("token", **fake_api.driver_kwargs())
+    key_pair = other.create_key_pair("second key", PUBLIC_KEY)
+    stale = driver.get_key_pair("second key")
+    other.delete_key_pair(key_pair)
+    with pytest.raises(ProviderError):
+        driver.delete_key_pair(stale)
+    assert driver.ex_get_key_pair_by_id(stale.extra["id"]) is None
+
+
+def test_fake_boot_time():
+    with FakeVscaleApi(boot_time=0.05) as api:
+        driver = VscaleDriver("token", **api.driver_kwargs())
+        node = driver.create_node("node", driver.list_sizes()[0], driver.list_images()[0])
+        assert node.state is NodeState.PENDING
+        ((running, ips),) = driver.wait_until_running([node], wait_period=0.02, timeout=5)
+        assert running.state is NodeState.RUNNING
+        assert ips == running.public_ips
+
+
+def test_fake_dns_errors(fake_api):
+    dns = VscaleDns("token", **fake_api.driver_kwargs())
+    zone = dns.create_zone("cloudsea.ru")
+    assert {r.type for r in dns.list_records(zone)} == {"NS", "SOA"}
+
+    record = dns.create_record("www.cloudsea.ru", zone, "A", "10.0.0.1")
+    with pytest.raises(RecordAlreadyExistsError):
+        dns.create_record("www.cloudsea.ru", zone, "A", "10.0.0.1")
+
+    cname = dns.create_record("mail.cloudsea.ru", zone, "A", "10.0.0.2")
+    with pytest.raises(RecordError) as e:
+        dns.update_record(cname, name="www.cloudsea.ru", type="CNAME", data="cloudsea.ru")
+    assert e.value.value == "cname_record_conflict"
+
+    assert dns.delete_record(record)
+    with pytest.raises(RecordDoesNotExistError):
+        dns.update_record(record, name=None, type=None, data="10.0.0.3")
+
+    assert dns.delete_zone(zone)
+    with pytest.raises(ZoneDoesNotExistError):
+        dns.delete_zone(zone)
+
+
+def test_fake_zone_cache_shape(fake_api):
+    dns = VscaleDns("token", ex_zone_cache_ttl=60, **fake_api.driver_kwargs())
+    created = dns.create_zone("cloudsea.ru")
+    dns.ex_invalidate_zone_cache()
+    (listed,) = dns.list_zones()
+    assert listed.extra == created.extra
+
+    # список заполняет кеш get_zone, форма extra та же
+    requests = fake_api.requests
+    zone = dns.get_zone("cloudsea.ru")
+    assert fake_api.requests == requests
+    assert (zone.id, zone.extra) == (listed.id, listed.extra)
+    # одна запись на зону, поиск по имени идёт через id
+    assert dns.ex_zone_cache_stats()["size"] == 1
+
+    # из кеша отдаются копии
+    zone.extra["tags"].append("changed")
+    listed.extra.clear()
+    assert dns.get_zone(zone.id) is not zone
+    assert dns.get_zone(zone.id).extra == created.extra
+
+
+def test_fake_token():
+    with FakeVscaleApi(token="secret") as api:
+        assert VscaleDns("secret", **api.driver_kwargs()).list_zones() == []
+        with pytest.raises(InvalidCredsError):
+            VscaleDns("wrong", **api.driver_kwargs()).list_zones()
+
+
+def test_fake_rate_limit():
+    with FakeVscaleApi(rate_limit=(2, 60)) as api:
+        dns = VscaleDns("token", **api.driver_kwargs())
+        dns.list_zones()
+        dns.list_zones()
+        with pytest.raises(RateLimitReachedError) as e:
+            dns.list_zones()
+        assert e.value.retry_after == 30
+
+    with FakeVscaleApi(rate_limit=(1, 0.2)) as api:
+        sleeps = []
+
+        def sleep(delay):
+            sleeps.append(delay)
+            time.sleep(0.2)
+
+        policy = RetryPolicy(retries=5, sleep=sleep)
+        dns = VscaleDns("token", ex_retry=policy, **api.driver_kwargs())
+        for _ in range(3):
+            dns.list_zones()
+        assert api.rate_limited == len(sleeps) > 0
+
+
+def test_fake_list_node_changes(fake_api):
+    driver = VscaleDriver("token", **fake_api.driver_kwargs())
+    size, image = driver.list_sizes()[0], driver.list_images()[0]
+    nodes = [driver.create_node(f"node-{i}", size, image) for i in range(5)]
+
+    changes = driver.ex_list_node_changes()
+    assert {n.id for n in changes.added} == {n.id for n in nodes}
+    assert len(changes.snapshot) == 5
+
+    unchanged = driver.ex_list_node_changes(since=changes.snapshot)
+    assert not unchanged
+    assert unchanged.snapshot.fingerprints == changes.snapshot.fingerprints
+
+    driver.stop_node(nodes[0])
+    driver.destroy_node(nodes[1])
+    new = driver.create_node("node-5", size, image)
+    delta = driver.ex_list_node_changes(since=unchanged.snapshot)
+    assert [n.id for n in delta.added] == [new.id]
+    assert [(n.id, n.state) for n in delta.modified] == [(nodes[0].id, NodeState.STOPPED)]
+    assert delta.removed == [nodes[1].id]
+    assert nodes[1].id not in delta.snapshot
+
+
+def test_fake_batch_power_operations(fake_api):
+    driver = VscaleDriver("token", **fake_api.driver_kwargs())
+    size, image = driver.list_sizes()[0], driver.list_images()[0]
+    nodes = driver.ex_create_nodes([{"name": f"node-{i}", "size": size, "image": image} for i in range(12)]).succeeded
+    nodes = [outcome.result for outcome in nodes]
+
+    stopped = driver.ex_stop_nodes(nodes, concurrency=4, rate=1000, wait=True)
+    assert stopped
+    by_id = stopped.by_item(lambda node: node.id)
+    assert set(by_id) == {n.id for n in nodes}
+    assert all(outcome.result.state is NodeState.STOPPED for outcome in by_id.values())
+
+    assert driver.ex_reboot_nodes(nodes[:2])
+    assert driver.ex_destroy_nodes(nodes[:6], concurrency=3)
+    # два уже удалены: API отвечает 500, остальные удаляются
+    result = driver.ex_destroy_nodes(nodes[4:])
+    assert {o.item.id for o in result.failed} == {n.id for n in nodes[4:6]}
+    assert all(o.error.code == 500 for o in result.failed)
+    assert driver.list_nodes() == []
+
+
+def test_fake_batch_start_wait_timeout():
+    with FakeVscaleApi(boot_time=60) as api:
+        driver = VscaleDriver("token", **api.driver_kwargs())
+        size, image = driver.list_sizes()[0], driver.list_images()[0]
+        node = driver.create_node("node", size, image)
+        driver.stop_node(node)
+
+        result = driver.ex_start_nodes([node], wait=True, timeout=0.1)
+        assert not result
+        assert result.failed[0].item is node
+        assert "Timed out" in str(result.failed[0].error)
+
+
+def test_fake_batch_wait_poll_error(fake_api, monkeypatch):
+    driver = VscaleDriver("token", **fake_api.driver_kwargs())
+    size, image = driver.list_sizes()[0], driver.list_images()[0]
+    nodes = [driver.create_node(f"node-{i}", size, image) for i in range(3)]
+
+    def rate_limited():
+        raise RateLimitReachedError(headers={})
+
+    monkeypatch.setattr(driver, "list_nodes", rate_limited)
+    # ноды остановлены, ошибка опроса не теряет результат, а записывается каждой ноде
+    result = driver.ex_stop_nodes(nodes, wait=True)
+    assert not result.succeeded
+    assert {o.item.id for o in result.failed} == {n.id for n in nodes}
+    assert all(isinstance(o.error, RateLimitReachedError) for o in result.failed)
+    monkeypatch.undo()
+    assert {n.state for n in driver.list_nodes()} == {NodeState.STOPPED}
+
+
+def test_fake_wait_until_running_ipv4(fake_api, monkeypatch):
+    driver = VscaleDriver("token", **fake_api.driver_kwargs())
+    node = driver.create_node("node", driver.list_sizes()[0], driver.list_images()[0])
+    list_nodes = driver.list_nodes
+    polls = []
+
+    def ipv6_first(**kwargs):
+        polls.append(kwargs)
+        nodes = list_nodes()
+        if len(polls) == 1:
+            # нода уже запущена, но IPv4 адреса ещё нет
+            for n in nodes:
+                n.public_ips = ["2a00:15f8::1"]
+        return nodes
+
+    monkeypatch.setattr(driver, "list_nodes", ipv6_first)
+    ((running, ips),) = driver.wait_until_running([node], wait_period=0.01, ex_list_nodes_kwargs={"marker": 1})
+    assert polls == [{"marker": 1}, {"marker": 1}]
+    assert ips
+    assert "2a00:15f8::1" not in ips
+    assert running.public_ips == ips
+
+    polls.clear()
+    ((running, ips),) = driver.wait_until_running([node], wait_period=0.01, force_ipv4=False)
+    assert ips == ["2a00:15f8::1"]
+    with pytest.raises(ValueError, match="ssh_interface"):
+        driver.wait_until_running([node], ssh_interface="ips")
+
+
+def test_fake_bulk_records(fake_api):
+    dns = VscaleDns("token", **fake_api.driver_kwargs())
+    zone = dns.create_zone("cloudsea.ru")
+    records = [(f"node{i}.cloudsea.ru", "A", f"10.0.0.{i}") for i in range(40)]
+    records += [
+        {"name": "node0.cloudsea.ru", "type": "A", "data": "10.0.0.0"},
+        ("node1.cloudsea.ru", "CNAME", "cloudsea.ru"),
+        ("txt.cloudsea.ru", "TXT", "v=spf1 -all", {"ttl": 300}),
+    ]
+
+    result = dns.ex_create_records(zone, records, concurrency=8, rate=1000)
+    assert len(result.succeeded) == 41
+    errors = {type(o.error) for o in result.failed}
+    assert errors == {RecordAlreadyExistsError, RecordError}
+    assert dns.ex_find_records(zone, "txt.cloudsea.ru", "TXT")[0].ttl == 300
+
+    created = [o.result for o in result.succeeded]
+    assert dns.delete_record(created[0])
+    deleted = dns.ex_delete_records(created, concurrency=8)
+    assert [o.item for o in deleted.failed] == [created[0]]
+    assert isinstance(deleted.failed[0].error, RecordDoesNotExistError)
+    assert {r.type for r in dns.list_records(zone)} == {"NS", "SOA"}
+
+    with pytest.raises(ZoneDoesNotExistError):
+        dns.create_record("www.example.ru", Zone("0", "example.ru", "master", None, dns), "A", "10.0.0.1")
+
+
+def test_fake_records_ttl(fake_api):
+    dns = VscaleDns("token", **fake_api.driver_kwargs())
+    zone = dns.create_zone("cloudsea.ru")
+    txt = dns.create_record("txt.cloudsea.ru", zone, "TXT", "v=spf1 -all", {"ttl": 300})
+    mx = ("mx.cloudsea.ru", "MX", "mail.cloudsea.ru", {"ttl": 600, "priority": 10})
+
+    # пачкой и синхронизацией записи создаются одинаково, TTL из Record и extra сохраняется
+    dns.delete_record(txt)
+    (created,) = dns.ex_create_records(zone, [txt]).succeeded
+    assert created.result.ttl == 300
+    dns.delete_record(created.result)
+    result = dns.ex_sync_zone(zone, [txt, mx], ignore_types=("NS", "SOA"))
+    assert sorted(o.result.ttl for o in result.created.succeeded) == [300, 600]
+    assert dns.ex_sync_zone(zone, [txt, mx[:3]], ignore_types=("NS", "SOA"), dry_run=True).plan.unchanged == 2
+
+
+def test_fake_sync_zone_names_and_order(fake_api):
+    samples = []
+    dns = VscaleDns("token", ex_metrics=RequestMetrics(exporters=[samples.append]), **fake_api.driver_kwargs())
+    zone = dns.create_zone("cloudsea.ru")
+    dns.create_record("www.cloudsea.ru", zone, "A", "10.0.0.1")
+    dns.create_record("old.cloudsea.ru", zone, "A", "10.0.0.2")
+    dns.create_record("mail.cloudsea.ru", zone, "A", "10.0.0.3")
+
+    desired = [
+        ("WWW.cloudsea.ru.", "A", "10.0.0.1"),
+        ("Mail.cloudsea.ru.", "A", "10.0.0.4"),
+        ("new.cloudsea.ru", "A", "10.0.0.5"),
+    ]
+    plan = dns.ex_sync_zone(zone, desired, ignore_types=("NS", "SOA"), dry_run=True).plan
+    assert plan.unchanged == 1
+    assert [(r.name, d.name) for r, d in plan.update] == [("mail.cloudsea.ru", "Mail.cloudsea.ru.")]
+
+    # удаления идут после создания и обновлений
+    del samples[:]
+    assert dns.ex_sync_zone(zone, desired, ignore_types=("NS", "SOA"))
+    assert [s.method for s in samples] == ["GET", "POST", "PUT", "DELETE"]
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+
+import pytest
+
+import vscaledriver
+
+
+def loaded_modules(statement):
+    code = f"import sys\n{statement}\nprint(' '.join(sys.modules))"
+    return set(subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout.split())
+
+
+def test_dns_without_compute_stack():
+    modules = loaded_modules("from vscaledriver import VscaleDns")
+    assert "libcloud.dns.base" in modules
+    assert "libcloud.compute.base" not in modules
+    assert "libcloud.utils.publickey" not in modules
+
+
+def test_compute_without_dns_stack():
+    modules = loaded_modules("from vscaledriver import VscaleDriver")
+    assert "libcloud.compute.base" in modules
+    assert "libcloud.dns.base" not in modules
+    # fingerprint ключей нужен только при обращении к нему
+    assert "libcloud.utils.publickey" not in modules
+
+
+def test_lazy_attributes():
+    from vscaledriver.dns import VscaleDns
+
+    assert vscaledriver.VscaleDns is VscaleDns
+    assert "VscaleDriver" in dir(vscaledriver)
+    with pytest.raises(AttributeError):
+        vscaledriver.MissingDriver
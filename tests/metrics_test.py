@@ -0,0 +1,83 @@
+import pytest
+import vcr
+from libcloud.common.types import ProviderError
+from libcloud.dns.base import Zone
+
+from vscaledriver import VscaleDns
+from vscaledriver.fake import FakeVscaleApi
+from vscaledriver.metrics import RequestMetrics
+
+
+@vcr.use_cassette("./tests/fixtures/dns_sync_zone.yaml", filter_headers=["X-Token"])
+def test_dns_request_metrics(vscale_key):
+    samples = []
+    metrics = RequestMetrics(exporters=[samples.append])
+    dns_conn = VscaleDns(key=vscale_key, ex_metrics=metrics)
+    zone = Zone("68155", "cloudsea.ru", "master", ttl=None, driver=dns_conn)
+    desired = [
+        ("cloudsea.ru", "NS", "ns1.vscale.io"),
+        ("cloudsea.ru", "NS", "ns2.vscale.io"),
+        ("www.cloudsea.ru", "A", "10.0.0.1"),
+        ("cloudsea.ru", "TXT", "v=spf1 -all"),
+    ]
+    dns_conn.ex_sync_zone(zone, desired)
+
+    snapshot = metrics.snapshot()
+    assert set(snapshot) == {
+        "GET v1/domains/{id}/records/",
+        "DELETE v1/domains/{id}/records/{id}",
+        "POST v1/domains/{id}/records/",
+    }
+    listed = snapshot["GET v1/domains/{id}/records/"]
+    assert listed["count"] == 1
+    assert listed["statuses"] == {200: 1}
+    assert listed["bytes_received"] > 0
+    assert listed["latency"]["p50"] is not None
+
+    assert snapshot["DELETE v1/domains/{id}/records/{id}"]["count"] == 1
+
+    created = snapshot["POST v1/domains/{id}/records/"]
+    assert created["errors"] == 1
+    assert created["statuses"] == {409: 1}
+    assert created["error_labels"] == {"record_already_exists": 1}
+    assert created["bytes_sent"] > 0
+
+    assert len(samples) == 3
+    assert [s.error for s in samples] == [None, "record_already_exists", None]
+    assert dns_conn.connection.metrics is metrics
+
+
+def test_request_metrics_histogram():
+    metrics = RequestMetrics(buckets=(0.1, 1.0))
+    for duration in (0.05, 0.1, 0.5, 0.7, 3.0):
+        metrics.record("get", "v1/scalets", duration, status=200)
+    metrics.record("GET", "v1/scalets", 0.2, error=ConnectionResetError())
+
+    route = metrics.snapshot()["GET v1/scalets"]
+    assert route["count"] == 6
+    assert route["errors"] == 1
+    assert route["error_labels"] == {"ConnectionResetError": 1}
+    assert route["latency"]["buckets"] == {0.1: 2, 1.0: 3, float("inf"): 1}
+    assert route["latency"]["p50"] == 1.0
+    assert route["latency"]["p99"] == float("inf")
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_request_metrics_failing_exporter(caplog):
+    def broken(sample):
+        raise RuntimeError("exporter down")
+
+    samples = []
+    metrics = RequestMetrics(exporters=[broken, samples.append])
+    with FakeVscaleApi() as api:
+        dns = VscaleDns("token", ex_metrics=metrics, **api.driver_kwargs())
+        assert dns.list_zones() == []
+        # на ошибке API наружу выходит она, а не ошибка экспортера
+        with pytest.raises(ProviderError, match="domain_not_found"):
+            dns.get_zone("cloudsea.ru")
+
+    assert [s.error for s in samples] == [None, "domain_not_found"]
+    assert metrics.snapshot()["GET v1/domains/{id}"]["errors"] == 1
+    assert "exporter down" in caplog.text
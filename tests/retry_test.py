@@ -0,0 +1,183 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from libcloud.common.base import ConnectionKey
+from libcloud.common.exceptions import BaseHTTPError, RateLimitReachedError
+from libcloud.common.types import ProviderError
+
+from vscaledriver import VscaleDns, VscaleDriver
+from vscaledriver.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, route_template
+
+ZONE = b'{"id": 68155, "name": "cloudsea.ru"}'
+
+
+class _ScriptedHandler(BaseHTTPRequestHandler):
+    """Отвечает по очереди ответами из ``server.script``, когда он пуст - 200 с ``ZONE``"""
+
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self.server.calls.append((self.command, self.path))
+        status, headers, body = self.server.script.pop(0) if self.server.script else (200, {}, ZONE)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def scripted_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ScriptedHandler)
+    server.script = []
+    server.calls = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _dns(server, **kwargs) -> VscaleDns:
+    host, port = server.server_address
+    return VscaleDns("token", secure=False, host=host, port=port, **kwargs)
+
+
+def _policy(sleeps, retries=3):
+    return RetryPolicy(retries=retries, backoff=0.01, sleep=sleeps.append)
+
+
+BAD_GATEWAY = (502, {"Content-Type": "text/html"}, b"<html>Bad Gateway</html>")
+UNAVAILABLE = (503, {"Content-Type": "application/json"}, b'{"error": "unavailable"}')
+RATE_LIMITED = (429, {"Content-Type": "application/json", "Retry-After": "2"}, b'{"error": "too_many_requests"}')
+
+
+def test_route_template():
+    assert route_template("v1/domains/68155/records/504") == "v1/domains/{id}/records/{id}"
+    assert route_template("/v1/domains/cloudsea.ru") == "v1/domains/{id}"
+    assert route_template("v1/scalets/123/start") == "v1/scalets/{id}/start"
+    assert route_template("v1/domains/?page=2") == "v1/domains/"
+
+
+def test_non_json_error_body(scripted_server):
+    scripted_server.script = [BAD_GATEWAY]
+    with pytest.raises(BaseHTTPError) as e:
+        _dns(scripted_server).get_zone("cloudsea.ru")
+    assert e.value.code == 502
+    assert "Bad Gateway" in e.value.message
+
+
+def test_retry_get_honors_retry_after(scripted_server):
+    scripted_server.script = [BAD_GATEWAY, RATE_LIMITED]
+    sleeps = []
+    zone = _dns(scripted_server, ex_retry=_policy(sleeps)).get_zone("cloudsea.ru")
+    assert zone.domain == "cloudsea.ru"
+    assert len(scripted_server.calls) == 3
+    assert sleeps[0] <= 0.01
+    assert sleeps[1] == 2
+
+
+def test_retry_gives_up(scripted_server):
+    scripted_server.script = [UNAVAILABLE] * 3
+    sleeps = []
+    with pytest.raises(BaseHTTPError) as e:
+        _dns(scripted_server, ex_retry=_policy(sleeps, retries=2)).get_zone("cloudsea.ru")
+    assert e.value.code == 503
+    assert len(sleeps) == 2
+
+
+def test_retry_skips_post_and_client_errors(scripted_server):
+    sleeps = []
+    dns = _dns(scripted_server, ex_retry=_policy(sleeps))
+
+    scripted_server.script = [UNAVAILABLE]
+    with pytest.raises(BaseHTTPError):
+        dns.create_zone("cloudsea.ru")
+
+    scripted_server.script = [(404, {}, b'{"error": "domain_not_found"}')]
+    with pytest.raises(ProviderError):
+        dns.get_zone("cloudsea.ru")
+    assert sleeps == []
+
+    # 429 повторяется и для POST: запрос не был выполнен
+    scripted_server.script = [RATE_LIMITED]
+    assert dns.create_zone("cloudsea.ru").domain == "cloudsea.ru"
+    assert sleeps == [2]
+
+
+def test_retry_policy_int(scripted_server):
+    host, port = scripted_server.server_address
+    compute = VscaleDriver("token", secure=False, host=host, port=port, ex_retry=2)
+    assert compute.connection.retry.retries == 2
+    assert VscaleDriver("token", ex_retry=0).connection.retry is None
+
+
+def test_circuit_breaker(scripted_server):
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, timer=lambda: now[0])
+    dns = _dns(scripted_server, ex_circuit_breaker=breaker)
+
+    scripted_server.script = [UNAVAILABLE, UNAVAILABLE]
+    for _ in range(2):
+        with pytest.raises(BaseHTTPError):
+            dns.get_zone("cloudsea.ru")
+    assert breaker.state("v1/domains/{id}") == "open"
+
+    with pytest.raises(CircuitOpenError) as e:
+        dns.get_zone("example.com")
+    assert e.value.retry_in == 10
+    assert len(scripted_server.calls) == 2
+    # другие маршруты не затронуты
+    scripted_server.script = [(200, {}, b"[]")]
+    assert dns.list_zones() == []
+
+    now[0] = 11
+    assert breaker.state("v1/domains/{id}") == "half-open"
+    assert dns.get_zone("cloudsea.ru").domain == "cloudsea.ru"
+    assert breaker.state("v1/domains/{id}") == "closed"
+
+
+def test_circuit_breaker_failed_trial_reopens():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, timer=lambda: now[0])
+    breaker.record("v1/scalets", RateLimitReachedError(headers={}))
+    assert breaker.state("v1/scalets") == "open"
+
+    now[0] = 10
+    breaker.before_request("v1/scalets")
+    # пока идёт пробный запрос, остальные не пропускаются
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request("v1/scalets")
+    breaker.record("v1/scalets", ConnectionResetError())
+    assert breaker.state("v1/scalets") == "open"
+    assert breaker.stats() == {"v1/scalets": {"state": "open", "failures": 2}}
+
+
+def test_circuit_breaker_interrupted_trial(scripted_server, monkeypatch):
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, timer=lambda: now[0])
+    breaker.record("v1/domains/{id}", ConnectionResetError())
+    now[0] = 10
+    dns = _dns(scripted_server, ex_circuit_breaker=breaker)
+
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as m:
+        m.setattr(ConnectionKey, "request", interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            dns.get_zone("cloudsea.ru")
+    # прерванный пробный запрос не считается ошибкой и не оставляет цепь разомкнутой навсегда
+    assert breaker.stats() == {"v1/domains/{id}": {"state": "half-open", "failures": 1}}
+    assert dns.get_zone("cloudsea.ru").domain == "cloudsea.ru"
+    assert breaker.state("v1/domains/{id}") == "closed"
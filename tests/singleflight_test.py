@@ -0,0 +1,141 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from vscaledriver import VscaleDns, VscaleDriver
+from vscaledriver.fake import FakeVscaleApi
+from vscaledriver.singleflight import SingleFlight
+
+
+def test_coalesce_concurrent_gets():
+    with FakeVscaleApi(latency=0.2) as api:
+        flight = SingleFlight()
+        driver = VscaleDriver("token", ex_coalesce_requests=flight, **api.driver_kwargs())
+        dns = VscaleDns("token", ex_coalesce_requests=flight, **api.driver_kwargs())
+        driver.create_node("node", driver.list_sizes()[0], driver.list_images()[0])
+        dns.create_zone("cloudsea.ru")
+        requests = api.requests
+
+        barrier = threading.Barrier(8)
+
+        def call(i):
+            barrier.wait()
+            return driver.list_nodes() if i % 2 else dns.list_zones()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(call, range(8)))
+
+        # по одному запросу на list_nodes и list_zones
+        assert api.requests - requests == 2
+        # list_sizes и list_images при подготовке + два объединённых запроса
+        assert flight.stats() == {"calls": 4, "coalesced": 6, "in_flight": 0}
+        assert all(len(r) == 1 for r in results)
+        assert results[1][0] is not results[3][0]
+
+
+def test_coalesce_parsed_in_place():
+    # get_zone и list_records разбирают ответ на месте, ведомые не должны видеть изменения ведущего
+    with FakeVscaleApi(latency=0.05) as api:
+        flight = SingleFlight()
+        dns = VscaleDns("token", ex_coalesce_requests=flight, **api.driver_kwargs())
+        zone = dns.create_zone("cloudsea.ru")
+        dns.create_record("www.cloudsea.ru", zone, "A", "10.0.0.1")
+        barrier = threading.Barrier(8)
+
+        def call(i):
+            barrier.wait()
+            return dns.get_zone(zone.id) if i % 2 else dns.list_records(zone)
+
+        for _ in range(3):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(call, range(8)))
+            assert all(z.id == zone.id and z.domain == "cloudsea.ru" for z in results[1::2])
+            assert all(sorted(r.name for r in records) == sorted(r.name for r in results[0]) for records in results[::2])
+        assert flight.stats()["coalesced"] > 0
+
+
+def test_coalesce_skips_mutations():
+    with FakeVscaleApi(latency=0.1) as api:
+        flight = SingleFlight()
+        dns = VscaleDns("token", ex_coalesce_requests=flight, **api.driver_kwargs())
+        barrier = threading.Barrier(4)
+
+        def create(i):
+            barrier.wait()
+            return dns.create_zone(f"zone{i}.ru")
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            zones = list(executor.map(create, range(4)))
+        assert len({z.id for z in zones}) == 4
+        assert flight.stats()["calls"] == 0
+
+
+def test_single_flight_shares_errors_and_copies():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    class Response:
+        object = {"scalets": [1, 2]}
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return Response()
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        leader = executor.submit(flight.do, "key", fetch)
+        started.wait()
+        followers = [executor.submit(flight.do, "key", fetch) for _ in range(2)]
+        while flight.stats()["coalesced"] < 2:
+            started.wait(0.01)
+        release.set()
+        responses = [leader.result()] + [f.result() for f in followers]
+
+    assert len(calls) == 1
+    responses[1].object["scalets"].append(3)
+    assert responses[0].object == {"scalets": [1, 2]}
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        flight.do("key", fail)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_single_flight_interrupted_leader():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    class Response:
+        object = {"scalets": []}
+
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            started.set()
+            release.wait()
+            raise KeyboardInterrupt
+        return Response()
+
+    def leader():
+        with pytest.raises(KeyboardInterrupt):
+            flight.do("key", fetch)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        interrupted = executor.submit(leader)
+        started.wait()
+        followers = [executor.submit(flight.do, "key", fetch) for _ in range(2)]
+        while flight.stats()["coalesced"] < 2:
+            started.wait(0.01)
+        release.set()
+        interrupted.result()
+        # прерывание ведущего не передаётся ведомым: один из них повторяет запрос
+        assert all(f.result().object == {"scalets": []} for f in followers)
+
+    assert len(calls) > 1
+    assert flight.stats()["in_flight"] == 0
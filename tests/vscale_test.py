@@ -1,36 +1,25 @@
 import datetime
+import io
 import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import pytest
 import vcr
 from libcloud.common.exceptions import BaseHTTPError
-from libcloud.common.types import InvalidCredsError, ProviderError
+from libcloud.common.types import InvalidCredsError, LibcloudError, ProviderError
 from libcloud.compute.base import Node, NodeImage, NodeSize
 from libcloud.compute.types import NodeState
 from libcloud.dns.base import Record, Zone
 from libcloud.dns.types import RecordAlreadyExistsError, RecordDoesNotExistError, RecordType, ZoneDoesNotExistError, ZoneError
 
-from vscaledriver import VscaleDns, VscaleDriver
-
-
-@pytest.fixture()
-def vscale_key() -> str:
-    key = os.getenv("DRIVER_TOKEN")
-    if key is None:
-        pytest.exit("set up DRIVER_TOKEN environment variable")
-    return str(key)
-
-
-@pytest.fixture()
-def compute_conn(vscale_key):
-    conn = VscaleDriver(key=vscale_key)
-    return conn
-
-
-@pytest.fixture()
-def dns_conn(vscale_key):
-    conn = VscaleDns(key=vscale_key)
-    return conn
+from vscaledriver import VscaleDns, VscaleDriver, VscaleNodeView, parse_created
+from vscaledriver.bind import BindRecord, format_bind_record, iter_bind_records
+from vscaledriver.bulk import RateLimiter, run_bulk
+from vscaledriver.cache import TTLCache
+from vscaledriver.jsonstream import iter_json_array
+from vscaledriver.pool import VscaleConnectionPool
 
 
 @vcr.use_cassette("./tests/fixtures/list_key_pairs.yaml", filter_headers=["X-Token"])
@@ -63,6 +52,35 @@ def test_compute_list_sizes_with_location_filtering(compute_conn):
     assert size.extra["id"] == "monster"
 
 
+@vcr.use_cassette("./tests/fixtures/list_sizes.yaml", filter_headers=["X-Token"])
+def test_compute_list_sizes_catalog_cache(vscale_key):
+    # в кассете один запрос, повторный поход в API упадёт
+    conn = VscaleDriver(key=vscale_key, ex_catalog_cache_ttl=60)
+    sizes = conn.list_sizes()
+    assert len(sizes) == 5
+    assert len(conn.list_sizes(location="msk0")) == 5
+    assert conn.list_sizes(location="ams0") == []
+    stats = conn.ex_catalog_cache_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_catalog_cache_ttl_and_eviction():
+    now = [0.0]
+    cache = TTLCache(ttl=10, maxsize=2, timer=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert "a" not in cache
+    assert cache.get("b") == 2
+    now[0] = 11
+    assert cache.get("c") is None
+    assert cache.stats()["evictions"] == 1
+    cache.set("c", 3)
+    cache.invalidate()
+    assert len(cache) == 0
+
+
 @vcr.use_cassette("./tests/fixtures/list_images.yaml", filter_headers=["X-Token"])
 def test_compute_list_images(compute_conn):
     keys = compute_conn.list_images()
@@ -90,6 +108,24 @@ def test_compute_get_key_pair(compute_conn):
     assert key.extra["id"] == 46329
 
 
+@vcr.use_cassette("./tests/fixtures/compute_get_key_pair.yaml", filter_headers=["X-Token"])
+def test_compute_get_key_pair_indexed(compute_conn):
+    # в кассете один запрос: повторные поиски идут по индексу
+    key = compute_conn.get_key_pair("x200s")
+    assert key._fingerprint is None
+    assert compute_conn.get_key_pair("x200s") is key
+    assert compute_conn.ex_get_key_pair_by_id(46329) is key
+    assert key.fingerprint == "ca:28:dc:6e:9e:72:48:d3:bc:73:76:19:d2:5f:c3:e8"
+
+
+@vcr.use_cassette("./tests/fixtures/compute_delete_key_pair.yaml", filter_headers=["X-Token"])
+def test_compute_delete_key_pair_updates_index(compute_conn):
+    kp = compute_conn.get_key_pair("test key")
+    assert compute_conn.delete_key_pair(kp)
+    assert "test key" not in compute_conn._key_pairs_by_name
+    assert kp.extra["id"] not in compute_conn._key_pairs_by_id
+
+
 @vcr.use_cassette("./tests/fixtures/compute_get_key_pair_empty.yaml", filter_headers=["X-Token"])
 def test_compute_get_key_pair_empty(compute_conn):
     key = compute_conn.get_key_pair("MissingName")
@@ -114,6 +150,71 @@ def test_compute_list_nodes(compute_conn):
     assert node1.image.id == "ubuntu_20.04_64_001_master"
 
 
+@vcr.use_cassette("./tests/fixtures/list_nodes.yaml", filter_headers=["X-Token"])
+def test_compute_list_nodes_defer_created(vscale_key):
+    conn = VscaleDriver(key=vscale_key, ex_defer_created=True)
+    node1 = conn.list_nodes()[0]
+    assert node1._created_at == "20.03.2021 05:25:10"
+    assert node1.created_at == datetime.datetime(2021, 3, 20, 5, 25, 10)
+    assert node1._created_at == node1.created_at
+
+
+@vcr.use_cassette("./tests/fixtures/list_nodes.yaml", filter_headers=["X-Token"], allow_playback_repeats=True)
+def test_compute_list_nodes_compact(vscale_key):
+    conn = VscaleDriver(key=vscale_key, ex_compact_nodes=True)
+    nodes = conn.list_nodes()
+    node1 = nodes[0]
+    assert isinstance(node1, VscaleNodeView)
+    assert not hasattr(node1, "__dict__")
+    assert node1.id == "3547397"
+    assert node1.state is NodeState.RUNNING
+    assert node1.public_ips == ("31.184.254.27",)
+    assert node1.created_at == datetime.datetime(2021, 3, 20, 5, 25, 10)
+    assert node1.extra["rplan"] == "small"
+
+    # образы не создаются заново для каждого скалета
+    assert conn.list_nodes()[0].image is node1.image
+
+    node = node1.to_node()
+    assert isinstance(node, Node)
+    assert node.id == node1.id
+    assert node.extra == node1.extra
+    assert node.created_at == node1.created_at
+    assert node.uuid == node1.uuid
+
+
+def test_parse_created():
+    assert parse_created("20.08.2015 14:57:04") == datetime.datetime(2015, 8, 20, 14, 57, 4)
+    assert parse_created("1.8.2015 4:57:04") == datetime.datetime(2015, 8, 1, 4, 57, 4)
+    with pytest.raises(ValueError, match="does not match format"):
+        parse_created("2015-08-20 14:57:04")
+
+
+@vcr.use_cassette("./tests/fixtures/list_nodes.yaml", filter_headers=["X-Token"])
+def test_compute_iter_nodes(compute_conn):
+    nodes = compute_conn.ex_iter_nodes()
+    node1 = next(nodes)
+    assert node1.id == "3547397"
+    assert node1.created_at == datetime.datetime(2021, 3, 20, 5, 25, 10)
+    assert [n.id for n in nodes] == ["3547400"]
+
+
+@vcr.use_cassette("./tests/fixtures/dns_get_zone_not_folund.yaml", filter_headers=["X-Token"])
+def test_connection_iter_objects_error(dns_conn):
+    with pytest.raises(ProviderError, match="domain_not_found") as exc_info:
+        list(dns_conn.connection.iter_objects("v1/domains/example.com"))
+    assert exc_info.value.http_code == 404
+
+
+def test_iter_json_array_byte_chunks():
+    body = '[ {"name": "узел", "tags": [1, 2]}, 12345, "a,b]", null, {"x": {"y": []}} ]'.encode()
+    chunks = (bytes([b]) for b in body)
+    assert list(iter_json_array(chunks)) == [{"name": "узел", "tags": [1, 2]}, 12345, "a,b]", None, {"x": {"y": []}}]
+    assert list(iter_json_array([b"[]"])) == []
+    with pytest.raises(ValueError, match="Unexpected end"):
+        list(iter_json_array([b'[{"a": 1}']))
+
+
 @vcr.use_cassette("./tests/fixtures/dns_list_zones_empty.yaml", filter_headers=["X-Token"])
 def test_dns_list_zones_empty(dns_conn):
     zones = dns_conn.list_zones()
@@ -195,6 +296,30 @@ def test_dns_get_record(dns_conn):
     assert reference.id == record.id
 
 
+@vcr.use_cassette("./tests/fixtures/dns_get_record.yaml", filter_headers=["X-Token"])
+def test_dns_get_record_zone_cache(vscale_key):
+    dns_conn = VscaleDns(key=vscale_key, ex_zone_cache_ttl=60)
+    zone = dns_conn.get_zone("cloudsea.ru")
+    records = dns_conn.list_records(zone)
+    record = dns_conn.get_record(zone.id, records[0].id)
+    assert record.zone.id == zone.id
+    assert dns_conn.get_zone("cloudsea.ru").extra == zone.extra
+    stats = dns_conn.ex_zone_cache_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+
+
+@vcr.use_cassette("./tests/fixtures/dns_delete_zone.yaml", filter_headers=["X-Token"])
+def test_dns_delete_zone_evicts_cache(vscale_key):
+    dns_conn = VscaleDns(key=vscale_key, ex_zone_cache_ttl=60)
+    zone = dns_conn.get_zone("example1.com")
+    assert zone.id in dns_conn.zone_cache
+    assert dns_conn._cached_zone("example1.com").id == zone.id
+    assert dns_conn.delete_zone(zone)
+    assert zone.id not in dns_conn.zone_cache
+    assert dns_conn._cached_zone("example1.com") is None
+
+
 @vcr.use_cassette("./tests/fixtures/dns_create_record.yaml", filter_headers=["X-Token"])
 def test_dns_create_record(dns_conn):
     name = "cloudsea.ru"
@@ -346,7 +471,7 @@ def test_create_node():
     assert new_node.id == "11"
     assert new_node.name == "New-Test"
     assert new_node.image == node_image
-    assert new_node.created_at == "20.08.2015 14:57:04"
+    assert new_node.created_at == datetime.datetime(2015, 8, 20, 14, 57, 4)
 
 
 @vcr.use_cassette("./tests/fixtures/compute_destroy_node_not_exist.yaml", filter_headers=["X-Token"])
@@ -356,3 +481,302 @@ def test_compute_destroy_node():
 
     with pytest.raises(BaseHTTPError, match="Internal server error"):
         conn.destroy_node(node)
+
+
+@vcr.use_cassette("./tests/fixtures/compute_create_nodes.yaml", filter_headers=["X-Token"])
+def test_compute_create_nodes(compute_conn):
+    image = NodeImage(id="ubuntu_20.04_64_001_master", name="ubuntu", driver=compute_conn)
+    medium = NodeSize(id="medium", name="medium", ram=1024, disk=30720, price=0, driver=compute_conn, bandwidth=0)
+    broken = NodeSize(id="broken", name="broken", ram=0, disk=0, price=0, driver=compute_conn, bandwidth=0)
+    specs = [
+        dict(name="worker-1", size=medium, image=image),
+        dict(name="bad", size=broken, image=image),
+        dict(name="worker-2", size=medium, image=image),
+    ]
+    # concurrency=1 сохраняет порядок запросов для кассеты
+    result = compute_conn.ex_create_nodes(specs, concurrency=1)
+    assert not result
+    assert [o.result.name for o in result.succeeded] == ["worker-1", "worker-2"]
+    assert all(isinstance(o.result, Node) for o in result.succeeded)
+    [failed] = result.failed
+    assert failed.item["name"] == "bad"
+    assert isinstance(failed.error, ProviderError)
+    assert failed.error.value == "rplan_not_found"
+
+
+def test_run_bulk_bounded_concurrency():
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def work(item):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        if item % 5 == 0:
+            raise ValueError(item)
+        return item * 2
+
+    result = run_bulk(work, range(1, 21), concurrency=3)
+    assert running[1] <= 3
+    assert sorted(o.result for o in result.succeeded) == [i * 2 for i in range(1, 21) if i % 5]
+    assert sorted(o.item for o in result.failed) == [5, 10, 15, 20]
+
+
+def test_run_bulk_rate_limit():
+    started = []
+    result = run_bulk(lambda i: started.append(time.monotonic()), range(5), concurrency=5, rate=50)
+    assert len(result.succeeded) == 5
+    started.sort()
+    assert started[-1] - started[0] >= 4 / 50 * 0.9
+    assert result.by_item()[3].ok
+
+
+def test_rate_limiter_spacing():
+    now, sleeps = [0.0], []
+    limiter = RateLimiter(rate=10, timer=lambda: now[0], sleep=sleeps.append)
+    for _ in range(3):
+        limiter.acquire()
+    assert sleeps == pytest.approx([0.1, 0.2])
+    now[0] = 5
+    limiter.acquire()
+    assert len(sleeps) == 2
+
+
+@vcr.use_cassette("./tests/fixtures/compute_wait_until_running.yaml", filter_headers=["X-Token"])
+def test_compute_iter_nodes_in_state(compute_conn):
+    nodes = [
+        Node(id="3547400", name="queued", state=NodeState.PENDING, driver=compute_conn, private_ips=[], public_ips=[]),
+        Node(id="3547397", name="started", state=NodeState.PENDING, driver=compute_conn, private_ips=[], public_ips=[]),
+    ]
+    ready = compute_conn.ex_iter_nodes_in_state(nodes, wait_period=0.01)
+    assert next(ready).id == "3547397"
+    assert next(ready).id == "3547400"
+    with pytest.raises(StopIteration):
+        next(ready)
+
+
+@vcr.use_cassette("./tests/fixtures/compute_wait_until_running.yaml", filter_headers=["X-Token"])
+def test_compute_wait_until_running(compute_conn):
+    node = Node(id="3547400", name="queued", state=NodeState.PENDING, driver=compute_conn, private_ips=[], public_ips=[])
+    [(running, ips)] = compute_conn.wait_until_running([node], wait_period=0.01)
+    assert running.state == NodeState.RUNNING
+    assert ips == ["188.68.221.91"]
+
+
+@vcr.use_cassette("./tests/fixtures/list_nodes.yaml", filter_headers=["X-Token"], allow_playback_repeats=True)
+def test_compute_wait_until_running_timeout(compute_conn):
+    node = Node(id="3547400", name="queued", state=NodeState.PENDING, driver=compute_conn, private_ips=[], public_ips=[])
+    with pytest.raises(LibcloudError, match="Timed out"):
+        compute_conn.wait_until_running([node], wait_period=0.01, timeout=0.05)
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"id": 68155, "name": "cloudsea.ru"}' if "domains" in self.path else b"[]"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def keep_alive_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def test_connection_pool_shared_between_drivers(keep_alive_server):
+    # vcr подменяет соединения и не даёт их переиспользовать, поэтому локальный сервер
+    host, port = keep_alive_server
+    pool = VscaleConnectionPool(pool_size=2)
+    compute = VscaleDriver("token", secure=False, host=host, port=port, ex_connection_pool=pool)
+    dns = VscaleDns("token", secure=False, host=host, port=port, ex_connection_pool=pool)
+
+    compute.list_sizes()
+    dns.get_zone("cloudsea.ru")
+    thread = threading.Thread(target=compute.list_sizes)
+    thread.start()
+    thread.join()
+
+    stats = pool.stats()
+    assert stats["hosts"] == 1
+    assert stats["requests"] == 3
+    assert stats["connections"] == 1
+    assert stats["reused"] == 2
+
+
+def test_connection_pool_for_key():
+    assert VscaleConnectionPool.for_key("token-a") is VscaleConnectionPool.for_key("token-a")
+    assert VscaleConnectionPool.for_key("token-a") is not VscaleConnectionPool.for_key("token-b")
+    compute = VscaleDriver(key="token-a", ex_connection_pool=True)
+    dns = VscaleDns(key="token-a", ex_connection_pool=True)
+    assert compute.connection.pool is dns.connection.pool
+
+
+@vcr.use_cassette("./tests/fixtures/dns_sync_zone.yaml", filter_headers=["X-Token"])
+def test_dns_sync_zone(dns_conn):
+    zone = Zone("68155", "cloudsea.ru", "master", ttl=None, driver=dns_conn)
+    desired = [
+        ("cloudsea.ru", RecordType.NS, "ns1.vscale.io"),
+        {"name": "cloudsea.ru", "type": "NS", "data": "ns2.vscale.io"},
+        ("www.cloudsea.ru", "A", "10.0.0.3"),
+        ("cloudsea.ru", "TXT", "v=spf1 -all"),
+    ]
+    result = dns_conn.ex_sync_zone(zone, desired)
+
+    plan = result.plan
+    assert plan.unchanged == 2
+    assert [r.id for r in plan.delete] == ["505"]
+    assert [(r.id, d.data) for r, d in plan.update] == [("504", "10.0.0.3")]
+    assert plan.create == [("cloudsea.ru", "TXT", "v=spf1 -all", None)]
+
+    assert not result
+    assert result.deleted.succeeded[0].result is True
+    assert result.updated.succeeded[0].result.data == "10.0.0.3"
+    assert isinstance(result.created.failed[0].error, RecordAlreadyExistsError)
+
+
+@vcr.use_cassette("./tests/fixtures/dns_sync_zone.yaml", filter_headers=["X-Token"])
+def test_dns_sync_zone_dry_run(dns_conn):
+    zone = Zone("68155", "cloudsea.ru", "master", ttl=None, driver=dns_conn)
+    result = dns_conn.ex_sync_zone(zone, [], dry_run=True)
+    # SOA не удаляется, остальные четыре записи лишние
+    assert len(result.plan) == 4
+    assert result
+
+
+@vcr.use_cassette("./tests/fixtures/dns_list_records_example.yaml", filter_headers=["X-Token"])
+def test_dns_export_zone_to_bind_stream(dns_conn):
+    zone = Zone("123", "example.com", "master", ttl=None, driver=dns_conn)
+    output = io.StringIO()
+    dns_conn.ex_export_zone_to_bind_stream(zone, output)
+    lines = output.getvalue().splitlines()
+    assert lines[1] == "$ORIGIN example.com."
+    assert lines[3] == "example.com.\t86400\tIN\tNS\tns2.vscale.io."
+    assert lines[5].startswith("example.com.\t300\tIN\tSOA\tns1.vscale.io. hello.vscale.io.")
+    assert len(lines) == 6
+
+
+ZONE_FILE = """\
+$ORIGIN cloudsea.ru.
+$TTL 3600
+@       IN SOA ns1.vscale.io. hello.vscale.io. (
+                2016020253 ; serial
+                10800 3600 604800 86400 )
+www             A       10.0.0.1
+@       300     IN MX   10 mail.cloudsea.ru.
+                TXT     "v=spf1 " "-all" ; комментарий
+"""
+
+
+def test_iter_bind_records():
+    records = list(iter_bind_records(io.StringIO(ZONE_FILE), "example.com"))
+    assert records[0].type == "SOA"
+    assert records[0].data == "ns1.vscale.io. hello.vscale.io. 2016020253 10800 3600 604800 86400"
+    assert records[1:] == [
+        BindRecord("www.cloudsea.ru", "A", "10.0.0.1", 3600),
+        BindRecord("cloudsea.ru", "MX", "mail.cloudsea.ru", 300, 10),
+        BindRecord("cloudsea.ru", "TXT", "v=spf1 -all", 3600),
+    ]
+
+
+def test_iter_bind_records_unbalanced():
+    with pytest.raises(ValueError, match="Unbalanced parentheses"):
+        list(iter_bind_records(["@ IN SOA ns1 hello ( 1 2 3"], "example.com"))
+
+
+def test_iter_bind_records_quoted():
+    zone = [
+        'note  TXT "hello (world)"',
+        'open  TXT "unbalanced ( ; not a comment"',
+        'esc   TXT ( "say \\"hi\\"" ; комментарий',
+        '            "back\\\\slash" )',
+        "www   A   10.0.0.1",
+    ]
+    records = list(iter_bind_records(zone, "example.com"))
+    assert [(r.name, r.data) for r in records] == [
+        ("note.example.com", "hello (world)"),
+        ("open.example.com", "unbalanced ( ; not a comment"),
+        ("esc.example.com", 'say "hi"back\\slash'),
+        ("www.example.com", "10.0.0.1"),
+    ]
+
+    record = Record("1", "esc.example.com", "TXT", records[2].data, zone=None, driver=None)
+    line = format_bind_record(record)
+    assert list(iter_bind_records([line], "example.com"))[0].data == records[2].data
+
+    with pytest.raises(ValueError, match="Unterminated"):
+        list(iter_bind_records(['bad TXT "open'], "example.com"))
+
+
+def test_iter_bind_records_relative_data():
+    zone = [
+        "@      MX     10 mail",
+        "www    CNAME  @",
+        "ftp    CNAME  www",
+        "@      NS     ns1.vscale.io.",
+        "_sip._tcp SRV 10 5 5060 sip",
+        "$ORIGIN 0.0.10.in-addr.arpa.",
+        "1      PTR    host.example.com.",
+        "2      PTR    host",
+        "txt    TXT    v=spf1 -all",
+        'dkim   TXT    ( "v=DKIM1; " "p=MIGf" )',
+    ]
+    records = list(iter_bind_records(zone, "example.com."))
+    assert [(r.name, r.type, r.data) for r in records] == [
+        ("example.com", "MX", "mail.example.com"),
+        ("www.example.com", "CNAME", "example.com"),
+        ("ftp.example.com", "CNAME", "www.example.com"),
+        ("example.com", "NS", "ns1.vscale.io"),
+        ("_sip._tcp.example.com", "SRV", "5 5060 sip.example.com"),
+        ("1.0.0.10.in-addr.arpa", "PTR", "host.example.com"),
+        ("2.0.0.10.in-addr.arpa", "PTR", "host.0.0.10.in-addr.arpa"),
+        ("txt.0.0.10.in-addr.arpa", "TXT", "v=spf1 -all"),
+        ("dkim.0.0.10.in-addr.arpa", "TXT", "v=DKIM1; p=MIGf"),
+    ]
+    assert [r.priority for r in records[:5]] == [10, None, None, None, 10]
+
+
+@vcr.use_cassette("./tests/fixtures/dns_import_zone.yaml", filter_headers=["X-Token"])
+def test_dns_import_zone_from_bind(dns_conn):
+    zone = Zone("68155", "cloudsea.ru", "master", ttl=None, driver=dns_conn)
+    result = dns_conn.ex_import_zone_from_bind(zone, io.StringIO(ZONE_FILE), concurrency=1)
+    assert result.created == 2
+    assert not result
+    assert result.failed[0].item.type == "TXT"
+    assert isinstance(result.failed[0].error, RecordAlreadyExistsError)
+
+
+@vcr.use_cassette("./tests/fixtures/dns_sync_zone.yaml", filter_headers=["X-Token"])
+def test_dns_find_records_index(vscale_key):
+    dns_conn = VscaleDns(key=vscale_key, ex_record_index_ttl=60)
+    zone = Zone("68155", "cloudsea.ru", "master", ttl=None, driver=dns_conn)
+
+    (www,) = dns_conn.ex_find_records(zone, name="www.cloudsea.ru", type=RecordType.A)
+    assert www.id == "504"
+    (old,) = dns_conn.ex_find_records(zone, name="old.cloudsea.ru.")
+    assert len(dns_conn.ex_find_records(zone, type=RecordType.NS)) == 2
+
+    # изменения попадают в индекс без повторного чтения записей
+    dns_conn.delete_record(old)
+    dns_conn.update_record(www, name=None, type=None, data="10.0.0.3")
+    assert dns_conn.ex_find_records(zone, name="old.cloudsea.ru", type=RecordType.A) == []
+    assert [r.data for r in dns_conn.ex_find_records(zone, name="www.cloudsea.ru", type=RecordType.A)] == ["10.0.0.3"]
+    assert dns_conn.ex_record_index_stats()["misses"] == 1
+
+    dns_conn._indexed_records(zone).loaded_at -= 100
+    assert dns_conn._indexed_records(zone, max_staleness=10) is None
+    assert dns_conn._indexed_records(zone, max_staleness=1000) is not None
@@ -0,0 +1,128 @@
+import gc
+import threading
+import weakref
+
+import pytest
+from libcloud.compute.types import NodeState
+
+from vscaledriver import VscaleDriver
+from vscaledriver.fake import FakeVscaleApi
+from vscaledriver.watch import NodeTransition, NodeWatcher
+
+
+@pytest.fixture()
+def driver():
+    with FakeVscaleApi() as api:
+        yield VscaleDriver("token", **api.driver_kwargs())
+
+
+def test_node_watcher_transitions(driver):
+    size, image = driver.list_sizes()[0], driver.list_images()[0]
+    node = driver.create_node("node-0", size, image)
+    other = driver.create_node("node-1", size, image)
+
+    watcher = NodeWatcher(driver, wait_period=1, max_wait_period=4, backoff=2)
+    seen, stopped = [], []
+    watcher.subscribe(seen.append)
+    watcher.subscribe(stopped.append, states=[NodeState.STOPPED], node_ids=[node.id])
+
+    # первый опрос только запоминает инвентарь
+    assert watcher.poll() == []
+    assert {n.id for n in watcher.nodes} == {node.id, other.id}
+    assert watcher.interval == 2
+
+    driver.stop_node(node)
+    driver.stop_node(other)
+    transitions = watcher.poll()
+    assert {(t.node.id, t.old_state, t.new_state) for t in transitions} == {
+        (node.id, NodeState.RUNNING, NodeState.STOPPED),
+        (other.id, NodeState.RUNNING, NodeState.STOPPED),
+    }
+    assert seen == transitions
+    assert [t.node.id for t in stopped] == [node.id]
+    assert watcher.interval == 1
+
+    watcher.poll()
+    watcher.poll()
+    watcher.poll()
+    assert watcher.interval == 4
+
+    driver.destroy_node(other)
+    new = driver.create_node("node-2", size, image)
+    assert {(t.node.id, t.old_state, t.new_state) for t in watcher.poll()} == {
+        (other.id, NodeState.STOPPED, None),
+        (new.id, None, NodeState.RUNNING),
+    }
+
+
+def test_node_watcher_thread(driver):
+    node = driver.create_node("node-0", driver.list_sizes()[0], driver.list_images()[0])
+    errors = []
+    watcher = NodeWatcher(driver, wait_period=0.01, max_wait_period=0.02, on_error=errors.append)
+    stopped = threading.Event()
+
+    def callback(transition: NodeTransition):
+        stopped.set()
+        raise RuntimeError("subscriber failed")
+
+    watcher.subscribe(callback)
+    with watcher:
+        while watcher.polls == 0:
+            stopped.wait(0.01)
+        driver.stop_node(node)
+        assert stopped.wait(5)
+    assert isinstance(errors[0], RuntimeError)
+    assert watcher.last_error is errors[0]
+
+
+def test_node_watcher_shared():
+    watcher = VscaleDriver("watcher token").ex_node_watcher(wait_period=1)
+    assert VscaleDriver("watcher token").ex_node_watcher() is watcher
+    assert VscaleDriver("watcher token").ex_node_watcher(wait_period=1) is watcher
+    assert watcher.wait_period == 1
+    assert VscaleDriver("another watcher token").ex_node_watcher() is not watcher
+    assert VscaleDriver("watcher token", host="127.0.0.1").ex_node_watcher() is not watcher
+    with pytest.raises(ValueError, match="wait_period=1"):
+        VscaleDriver("watcher token").ex_node_watcher(wait_period=2)
+
+
+def test_node_watcher_refcount(driver):
+    watcher = NodeWatcher(driver, wait_period=0.01, max_wait_period=0.02)
+    with watcher:
+        with watcher:
+            pass
+        # второй подписчик вышел, опрос первого продолжается
+        polls = watcher.polls
+        while watcher.polls == polls:
+            threading.Event().wait(0.01)
+        assert watcher._thread.is_alive()
+    assert not watcher._thread.is_alive()
+
+
+def test_node_watcher_restart(driver):
+    watcher = NodeWatcher(driver, wait_period=0.01, max_wait_period=0.02)
+    watcher.start()
+    # stop() с нулевым таймаутом не дожидается потока, start() сразу после него запускает новый
+    watcher.stop(timeout=0)
+    stopping = watcher._thread
+    watcher.start()
+    assert watcher._thread is not stopping
+    polls = watcher.polls
+    while watcher.polls < polls + 2:
+        threading.Event().wait(0.01)
+    assert not stopping.is_alive()
+    assert watcher._thread.is_alive()
+    watcher.stop()
+    assert not watcher._thread.is_alive()
+
+
+def test_node_watcher_registry_releases(driver):
+    watcher = driver.ex_node_watcher(wait_period=0.01)
+    released = weakref.ref(watcher)
+    with watcher:
+        pass
+    del watcher
+    gc.collect()
+    # остановленный watcher без ссылок не держит драйвер в реестре
+    assert released() is None
+    assert driver.ex_node_watcher().wait_period == 5
@@ -0,0 +1,591 @@
+"""Асинхронные варианты драйверов поверх aiohttp.
+
+Все соединения внутри одного event loop используют общий пул ``aiohttp.ClientSession``,
+поэтому тысячи запросов могут выполняться одновременно без отдельного потока на вызов.
+"""
+import asyncio
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, MutableMapping, Optional, Set
+from urllib.parse import urlencode
+
+import libcloud
+from libcloud.common.exceptions import exception_from_message
+from libcloud.common.types import ProviderError
+from libcloud.compute.base import KeyPair, Node, NodeAuthSSHKey, NodeImage, NodeLocation, NodeSize, T_Auth
+from libcloud.compute.types import KeyPairDoesNotExistError
+from libcloud.dns.base import Record, Zone
+from libcloud.dns.types import RecordType, ZoneDoesNotExistError
+from libcloud.utils.py3 import httplib
+
+from vscaledriver import codec
+from vscaledriver.catalogstore import CatalogStore
+from vscaledriver.common import VscaleConnection, VscaleJsonResponse
+from vscaledriver.compute import BaseVscaleDriver
+from vscaledriver.dns import BaseVscaleDns
+from vscaledriver.inventory import NodeChanges, NodeSnapshot, diff_nodes
+from vscaledriver.metrics import RequestMetrics, payload_size, response_size
+from vscaledriver.recordindex import ZoneRecords
+from vscaledriver.retry import CircuitBreaker, RetryPolicy, route_template
+from vscaledriver.singleflight import SingleFlight, follower_copy
+from vscaledriver.watch import NodeTransition, NodeWatcher
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+# event loop -> общая сессия
+_sessions: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_shared_session(pool_size: int = 100) -> "aiohttp.ClientSession":
+    """Возвращает общую для текущего event loop сессию, создаёт её при первом вызове"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=pool_size)
+        session = aiohttp.ClientSession(connector=connector)
+        _sessions[loop] = session
+    return session
+
+
+async def close_shared_session() -> None:
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+class AsyncVscaleResponse(VscaleJsonResponse):
+    """Ответ aiohttp, разобранный так же, как ``VscaleJsonResponse``"""
+
+    def __init__(self, status: int, headers, body: str, reason: Optional[str], connection):
+        self.connection = connection
+        self.headers = {k.lower(): v for k, v in headers.items()}
+        self.error = reason
+        self.status = status
+        self.request = None
+        self.body = body.strip() if body else ""
+
+        if not self.success():
+            raise exception_from_message(code=self.status, message=self.parse_error(), headers=self.headers)
+
+        self.object = self.parse_body()
+
+
+# результат общего вызова, ведущего которого отменили
+_ABANDONED = object()
+
+
+class AsyncSingleFlight(SingleFlight):
+    """``SingleFlight`` для корутин, запросы объединяются внутри одного event loop"""
+
+    _registry: Dict[str, SingleFlight] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        key = (asyncio.get_running_loop(), key)
+        future = self._in_flight.get(key)
+        while future is not None:
+            self.coalesced += 1
+            # shield: отмена ведомого не должна отменять общий запрос
+            result = await asyncio.shield(future)
+            if result is not _ABANDONED:
+                return follower_copy(result)
+            # ведущего отменили: его отмена ведомых не касается, один из них становится ведущим
+            self.coalesced -= 1
+            future = self._in_flight.get(key)
+
+        self.calls += 1
+        future = self._in_flight[key] = key[0].create_future()
+        try:
+            result = await func()
+        except Exception as e:
+            future.set_exception(e)
+            # исключение уже получит ведущий, ведомых может не быть
+            future.exception()
+            raise
+        except BaseException:
+            future.set_result(_ABANDONED)
+            raise
+        else:
+            # нетронутая копия для ведомых: ведущий может изменить свой ответ раньше, чем они его скопируют
+            future.set_result(follower_copy(result))
+            return result
+        finally:
+            del self._in_flight[key]
+
+
+class AsyncVscaleConnection:
+    responseCls = AsyncVscaleResponse
+    host = VscaleConnection.host
+    pool_size = 100
+
+    def __init__(
+        self,
+        key: str,
+        secure: bool = True,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        timeout: Optional[float] = None,
+        session: Optional["aiohttp.ClientSession"] = None,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        metrics: Optional[RequestMetrics] = None,
+        coalescer: Optional[AsyncSingleFlight] = None,
+        **kwargs,
+    ):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is not available, install vscaledriver[async]")
+        self.key = key
+        self.secure = secure
+        self.host = host or self.host
+        self.port = port or (httplib.HTTPS_PORT if secure else httplib.HTTP_PORT)
+        self.timeout = timeout
+        self.driver: Any = None
+        self.retry = retry
+        self.breaker = breaker
+        self.metrics = metrics
+        self.coalescer = coalescer
+        self._session = session
+
+    def connect(self):
+        # сессия привязана к event loop, поэтому создаётся при первом запросе
+        pass
+
+    @property
+    def session(self) -> "aiohttp.ClientSession":
+        if self._session is not None:
+            return self._session
+        return get_shared_session(self.pool_size)
+
+    def _url(self, action: str, params: Optional[dict]) -> str:
+        scheme = "https" if self.secure else "http"
+        netloc = self.host
+        if self.port not in (httplib.HTTP_PORT, httplib.HTTPS_PORT):
+            netloc = f"{self.host}:{self.port}"
+        url = f"{scheme}://{netloc}/{action.lstrip('/')}"
+        if params:
+            url = f"{url}?{urlencode(params, doseq=True)}"
+        return url
+
+    async def request(
+        self,
+        action: str,
+        params: Optional[dict] = None,
+        data: Optional[bytes] = None,
+        headers: Optional[dict] = None,
+        method: str = "GET",
+    ) -> AsyncVscaleResponse:
+        if self.coalescer is not None and method == "GET" and data is None:
+            key = (self.key, self.host, self.port, action, tuple(sorted((params or {}).items())))
+            return await self.coalescer.do(key, lambda: self._request_with_retries(action, params, data, headers, method))
+        return await self._request_with_retries(action, params, data, headers, method)
+
+    async def _request_with_retries(
+        self,
+        action: str,
+        params: Optional[dict],
+        data: Optional[bytes],
+        headers: Optional[dict],
+        method: str,
+    ) -> AsyncVscaleResponse:
+        route = route_template(action)
+        attempt = 0
+        while True:
+            if self.breaker is not None:
+                self.breaker.before_request(route)
+            started = time.perf_counter()
+            try:
+                response = await self._request(action, params, data, headers, method)
+            except asyncio.CancelledError:
+                # отменённый запрос не ошибка API, но пробный запрос должен освободить цепь
+                if self.breaker is not None:
+                    self.breaker.release(route)
+                raise
+            except Exception as e:
+                if self.metrics is not None:
+                    self.metrics.record(method, route, time.perf_counter() - started, bytes_sent=payload_size(data), error=e)
+                if self.breaker is not None:
+                    self.breaker.record(route, e)
+                if self.retry is None or not self.retry.should_retry(method, e, attempt):
+                    raise
+                await asyncio.sleep(self.retry.delay(attempt, e))
+                attempt += 1
+                continue
+
+            if self.metrics is not None:
+                self.metrics.record(
+                    method,
+                    route,
+                    time.perf_counter() - started,
+                    status=response.status,
+                    bytes_sent=payload_size(data),
+                    bytes_received=response_size(response),
+                )
+            if self.breaker is not None:
+                self.breaker.record(route)
+            return response
+
+    async def _request(
+        self,
+        action: str,
+        params: Optional[dict],
+        data: Optional[bytes],
+        headers: Optional[dict],
+        method: str,
+    ) -> AsyncVscaleResponse:
+        headers = dict(headers or {})
+        if self.key is not None:
+            headers["X-Token"] = self.key
+        headers["User-Agent"] = f"libcloud/{libcloud.__version__} ({self.driver.name}) aiohttp"
+
+        timeout = aiohttp.ClientTimeout(total=self.timeout) if self.timeout else None
+        async with self.session.request(
+            method,
+            self._url(action, params),
+            data=data,
+            headers=headers,
+            timeout=timeout,
+        ) as response:
+            body = await response.text()
+        return self.responseCls(response.status, response.headers, body, response.reason, self)
+
+
+class AsyncVscaleDriver(BaseVscaleDriver):
+    connectionCls = AsyncVscaleConnection
+    coalescerCls = AsyncSingleFlight
+
+    def __init__(self, key, *args, **kwargs):
+        super().__init__(key, *args, **kwargs)
+        self._catalog_refreshes: Set[asyncio.Task] = set()
+
+    async def _request_catalog(self, action: str) -> list:
+        result = None if self.catalog_cache is None else self.catalog_cache.get(action)
+        if result is None:
+            if self.catalog_store is None:
+                result = (await self.connection.request(action)).object
+            else:
+                result = await self._request_catalog_store(self.catalog_store, action)
+            if self.catalog_cache is not None:
+                self.catalog_cache.set(action, result)
+        return result
+
+    async def _request_catalog_store(self, store: CatalogStore, action: str) -> list:
+        key = self._catalog_key(action)
+        entry = store.lookup(key)
+        if entry is None:
+            result = (await self.connection.request(action)).object
+            store.save(key, result)
+            return result
+        if entry.age > store.max_age and store.start_refresh(key):
+            task = asyncio.get_running_loop().create_task(self._refresh_catalog(store, action, key))
+            # event loop хранит только слабые ссылки на задачи
+            self._catalog_refreshes.add(task)
+            task.add_done_callback(self._catalog_refreshes.discard)
+        return entry.data
+
+    async def _refresh_catalog(self, store: CatalogStore, action: str, key: str) -> None:
+        try:
+            result = (await self.connection.request(action)).object
+        except Exception as e:
+            store.finish_refresh(key, error=e)
+        else:
+            store.finish_refresh(key, result)
+
+    async def list_locations(self) -> List[NodeLocation]:
+        return [self._to_location(loc) for loc in await self._request_catalog("v1/locations")]
+
+    async def list_images(self) -> List[NodeImage]:
+        return [self._to_image(image) for image in await self._request_catalog("v1/images")]
+
+    async def list_sizes(self, location=None) -> List[NodeSize]:
+        return self._to_sizes(await self._request_catalog("v1/rplans"), location)
+
+    async def list_key_pairs(self) -> List[KeyPair]:
+        response = await self.connection.request("v1/sshkeys")
+        key_pairs = [self._to_key_pair(kp) for kp in response.object]
+        self._index_key_pairs(key_pairs)
+        return key_pairs
+
+    async def get_key_pair(self, key_name: str) -> Optional[KeyPair]:
+        index = self._key_pair_index()
+        key_pair = None if index is None else index.get(key_name)
+        if key_pair is None:
+            await self.list_key_pairs()
+            key_pair = (self._key_pairs_by_name or {}).get(key_name)
+        return key_pair
+
+    async def ex_get_key_pair_by_id(self, key_id: int) -> Optional[KeyPair]:
+        if self._key_pair_index() is None or key_id not in self._key_pairs_by_id:
+            await self.list_key_pairs()
+        return self._key_pairs_by_id.get(key_id)
+
+    async def _ssh_key_id(self, auth: T_Auth) -> Optional[int]:
+        if not isinstance(auth, NodeAuthSSHKey):
+            return None
+        key_id = self._indexed_key_pair_id(auth.pubkey)
+        if key_id is None:
+            await self.list_key_pairs()
+            key_id = self._indexed_key_pair_id(auth.pubkey)
+        if key_id is None:
+            raise KeyPairDoesNotExistError(auth.pubkey, self)
+        return key_id
+
+    async def create_key_pair(self, name: str, public_key: str) -> KeyPair:
+        data = codec.dumps({"key": public_key, "name": name})
+        headers = {"Content-Type": "application/json"}
+        response = await self.connection.request("v1/sshkeys", method="POST", headers=headers, data=data)
+        key_pair = self._to_key_pair(response.object, full_extra=True)
+        self._index_key_pair(key_pair)
+        return key_pair
+
+    async def delete_key_pair(self, key_pair: KeyPair) -> bool:
+        key_pair_id = key_pair.extra["id"]
+        try:
+            response = await self.connection.request(f"v1/sshkeys/{key_pair_id}", method="DELETE")
+        except ProviderError as e:
+            if e.http_code == httplib.NOT_FOUND:
+                self._unindex_key_pair(key_pair_id)
+            raise
+        self._unindex_key_pair(key_pair_id)
+        return response.status == httplib.NO_CONTENT
+
+    async def list_nodes(self) -> List[Node]:
+        response = await self.connection.request("v1/scalets")
+        return [self._to_node(n) for n in response.object]
+
+    async def ex_list_node_changes(self, since: Optional[NodeSnapshot] = None) -> NodeChanges:
+        response = await self.connection.request("v1/scalets")
+        return diff_nodes(response.object, since, self._to_node)
+
+    def ex_node_watcher(self, **kwargs) -> "AsyncNodeWatcher":
+        return AsyncNodeWatcher.for_driver(self, **kwargs)
+
+    async def _node_action(self, action: str, method: str, data: Optional[bytes] = None) -> bool:
+        headers = {"Content-Type": "application/json;charset=UTF-8"}
+        response = await self.connection.request(action, headers=headers, data=data, method=method)
+        return response.status == httplib.OK
+
+    async def start_node(self, node: Node) -> bool:
+        data = codec.dumps({"id": node.id})
+        return await self._node_action(f"v1/scalets/{node.id}/start", "POST", data)
+
+    async def stop_node(self, node: Node) -> bool:
+        data = codec.dumps({"id": node.id})
+        return await self._node_action(f"v1/scalets/{node.id}/stop", "POST", data)
+
+    async def destroy_node(self, node: Node) -> bool:
+        return await self._node_action(f"v1/scalets/{node.id}", "DELETE")
+
+    async def reboot_node(self, node: Node) -> bool:
+        return await self._node_action(f"v1/scalets/{node.id}/restart", "PATCH")
+
+    async def create_node(
+        self,
+        name: str,
+        size: NodeSize,
+        image: NodeImage,
+        location: Optional[NodeLocation] = None,
+        auth: T_Auth = None,
+    ) -> Node:
+        payload = self._create_node_payload(name, size, image, location, auth, await self._ssh_key_id(auth))
+        data = codec.dumps(payload)
+        headers = {"Content-Type": "application/json;charset=UTF-8"}
+        response = await self.connection.request("v1/scalets", headers=headers, data=data, method="POST")
+        return self._to_created_node(response, image)
+
+
+class AsyncNodeWatcher(NodeWatcher):
+    """``NodeWatcher`` для ``AsyncVscaleDriver``: опрос идёт задачей в текущем event loop"""
+
+    _registry: MutableMapping[tuple, NodeWatcher] = weakref.WeakValueDictionary()
+
+    def __init__(self, driver, **kwargs):
+        super().__init__(driver, **kwargs)
+        self._task: Optional[asyncio.Task] = None
+
+    async def poll(self) -> List[NodeTransition]:  # type: ignore[override]
+        return self._apply(await self.driver.ex_list_node_changes(since=self._snapshot))
+
+    async def _run(self) -> None:  # type: ignore[override]
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                self.interval = min(self.interval * self.backoff, self.max_wait_period)
+                self._error(e)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> "AsyncNodeWatcher":
+        with self._lock:
+            self._users += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def stop(self) -> None:  # type: ignore[override]
+        if not self._release():
+            return
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def __aenter__(self) -> "AsyncNodeWatcher":
+        return self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+
+class AsyncVscaleDns(BaseVscaleDns):
+    connectionCls = AsyncVscaleConnection
+    coalescerCls = AsyncSingleFlight
+
+    async def get_zone(self, domain_id: str) -> Zone:
+        zone = self._cached_zone(domain_id)
+        if zone is not None:
+            return zone
+
+        response = await self.connection.request(f"v1/domains/{domain_id}")
+        return self._cache_zone(self._to_zone(response.object))
+
+    async def list_zones(self) -> List[Zone]:
+        response = await self.connection.request("v1/domains/")
+        return [self._cache_zone(self._to_zone(n)) for n in response.object]
+
+    async def create_zone(self, domain, type="master", ttl=None, extra=None) -> Zone:
+        data = codec.dumps({"name": domain})
+        headers = {"Content-Type": "application/json"}
+        response = await self.connection.request("v1/domains/", data=data, headers=headers, method="POST")
+        return self._cache_zone(self._to_zone(response.object))
+
+    async def delete_zone(self, zone: Zone) -> bool:
+        try:
+            response = await self.connection.request(f"v1/domains/{zone.id}", method="DELETE")
+        except ProviderError as e:
+            if e.value == "domain_not_found":
+                self._evict_zone(zone)
+                self.ex_invalidate_record_index(zone)
+                raise ZoneDoesNotExistError(e.value, self, zone.id)
+            raise
+
+        self._evict_zone(zone)
+        self.ex_invalidate_record_index(zone)
+        return response.status == httplib.NO_CONTENT
+
+    async def list_records(self, zone: Zone) -> List[Record]:
+        response = await self.connection.request(f"v1/domains/{zone.id}/records/")
+        records = [self._to_record(r, zone) for r in response.object]
+        self._index_records(zone, records)
+        return records
+
+    async def ex_find_records(
+        self,
+        zone: Zone,
+        name: Optional[str] = None,
+        type: Optional[RecordType] = None,
+        max_staleness: Optional[float] = None,
+    ) -> List[Record]:
+        entry = self._indexed_records(zone, max_staleness)
+        if entry is None:
+            records = await self.list_records(zone)
+            entry = self._indexed_records(zone) or ZoneRecords(records)
+        return entry.find(name, type)
+
+    async def get_record(self, zone_id: str, record_id: str) -> Record:
+        response = await self.connection.request(f"v1/domains/{zone_id}/records/{record_id}")
+        zone = await self.get_zone(zone_id)
+        return self._to_record(response.object, zone)
+
+    async def create_record(self, name, zone: Zone, type, data, extra=None) -> Record:
+        payload = {
+            "id": zone.id,
+            "name": name,
+            "type": type,
+            "ttl": 604800,
+            "content": data,
+        }
+        if extra:
+            payload.update({k: extra[k] for k in ("ttl", "priority") if extra.get(k) is not None})
+        headers = {"Content-Type": "application/json"}
+        try:
+            response = await self.connection.request(
+                f"v1/domains/{zone.id}/records/",
+                method="POST",
+                headers=headers,
+                data=codec.dumps(payload),
+            )
+        except ProviderError as e:
+            raise self._record_error(e, zone=zone)
+
+        record = self._to_record(response.object, zone)
+        self._index_record(record)
+        return record
+
+    async def delete_record(self, record: Record) -> bool:
+        try:
+            response = await self.connection.request(
+                f"v1/domains/{record.zone.id}/records/{record.id}",
+                method="DELETE",
+            )
+        except ProviderError as e:
+            if e.value == "record_not_found":
+                self._unindex_record(record)
+            raise self._record_error(e, record)
+        self._unindex_record(record)
+        return response.status == httplib.NO_CONTENT
+
+    async def update_record(
+        self,
+        record: Record,
+        name: Optional[str],
+        type: Optional[RecordType],
+        data: Optional[str],
+        extra=None,
+    ) -> Record:
+        payload = self._update_record_payload(record, name, type, data)
+        headers = {"Content-Type": "application/json"}
+        try:
+            response = await self.connection.request(
+                f"v1/domains/{record.zone.id}/records/{record.id}",
+                method="PUT",
+                headers=headers,
+                data=codec.dumps(payload),
+            )
+        except ProviderError as e:
+            if e.value == "record_not_found":
+                self._unindex_record(record)
+            raise self._record_error(e, record)
+
+        updated = self._to_record(response.object, record.zone)
+        self._unindex_record(record)
+        self._index_record(updated)
+        return updated
+
+    async def update_zone(
+        self,
+        zone: Zone,
+        domain: Optional[str],
+        type: Optional[str] = "master",
+        ttl: Optional[int] = None,
+        extra: Optional[dict] = None,
+    ) -> Zone:
+        payload = self._update_zone_payload(type, extra)
+        headers = {"Content-Type": "application/json"}
+        try:
+            response = await self.connection.request(
+                f"v1/domains/{zone.id}",
+                method="PATCH",
+                headers=headers,
+                data=codec.dumps(payload),
+            )
+        except ProviderError as e:
+            if e.value == "domain_not_found":
+                self._evict_zone(zone)
+            raise self._zone_error(e, zone.id)
+
+        return self._cache_zone(self._to_zone(response.object))
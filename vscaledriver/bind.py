@@ -0,0 +1,175 @@
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from libcloud.dns.base import Record
+from libcloud.dns.types import RecordType
+
+from vscaledriver.bulk import BulkOutcome
+
+# типы, у которых в данных имя хоста: в BIND с точкой на конце, в Vscale без неё
+_HOSTNAME_TYPES = ("CNAME", "MX", "NS", "PTR", "SRV", "DNAME")
+_PRIORITY_TYPES = ("MX", "SRV")
+_CLASSES = ("IN", "CH", "HS")
+
+
+class BindRecord(NamedTuple):
+    name: str
+    type: str
+    data: str
+    ttl: Optional[int] = None
+    priority: Optional[int] = None
+
+
+class BindImportResult(NamedTuple):
+    created: int
+    failed: List[BulkOutcome]
+
+    def __bool__(self) -> bool:
+        return not self.failed
+
+
+def format_bind_record(record: Record, default_ttl: Optional[int] = None) -> str:
+    """Строка BIND для записи Vscale. Имена записей в Vscale полные, поэтому пишутся с точкой на конце"""
+    record_type = str(record.type)
+    data = record.data
+    if record_type in _HOSTNAME_TYPES and not data.endswith("."):
+        data += "."
+    if record_type in (RecordType.TXT, RecordType.SPF):
+        data = '"%s"' % data.replace("\\", "\\\\").replace('"', '\\"')
+
+    parts = [f"{record.name}."]
+    ttl = record.ttl or default_ttl
+    if ttl:
+        parts.append(str(ttl))
+    parts += ["IN", record_type]
+    if record_type in _PRIORITY_TYPES and record.extra.get("priority") is not None:
+        parts.append(str(record.extra["priority"]))
+    parts.append(data)
+    return "\t".join(parts)
+
+
+class _Quoted(str):
+    """Токен, записанный в кавычках"""
+
+
+def _split_line(line: str) -> Tuple[List[str], int]:
+    """Токены строки зоны без комментария и изменение глубины скобок.
+
+    Кавычки снимаются, токены в кавычках - ``_Quoted``. ``;`` и скобки внутри кавычек - часть данных,
+    вне кавычек скобки только группируют строки записи и в токены не попадают.
+    """
+    tokens: List[str] = []
+    depth = 0
+    token: Optional[str] = None
+    quoted = was_quoted = False
+    chars = iter(line)
+    for char in chars:
+        if quoted:
+            if char == "\\":
+                token = (token or "") + next(chars, "")
+            elif char == '"':
+                quoted = False
+            else:
+                token = (token or "") + char
+        elif char == '"':
+            quoted = was_quoted = True
+            token = token or ""
+        elif char == ";":
+            break
+        elif char in "()" or char.isspace():
+            if token is not None:
+                tokens.append(_Quoted(token) if was_quoted else token)
+                token = None
+                was_quoted = False
+            depth += {"(": 1, ")": -1}.get(char, 0)
+        else:
+            token = (token or "") + char
+    if quoted:
+        raise ValueError(f"Unterminated quoted string: {line.strip()}")
+    if token is not None:
+        tokens.append(_Quoted(token) if was_quoted else token)
+    return tokens, depth
+
+
+def _join_text(tokens: List[str]) -> str:
+    # строки в кавычках подряд склеиваются как есть ("v=spf1 " "-all"), остальные токены - через пробел
+    data = ""
+    for i, token in enumerate(tokens):
+        if i and not (isinstance(token, _Quoted) and isinstance(tokens[i - 1], _Quoted)):
+            data += " "
+        data += token
+    return data
+
+
+def _qualify(name: str, origin: str) -> str:
+    # относительное имя дополняется $ORIGIN, полное теряет точку на конце
+    if name == "@":
+        return origin
+    if name.endswith("."):
+        return name[:-1] or name
+    return f"{name}.{origin}"
+
+
+def _iter_statements(lines: Iterable[str]) -> Iterator[List[str]]:
+    # склеивает многострочные записи в скобках, отбрасывает комментарии
+    pending: List[str] = []
+    depth = 0
+    leading_blank = False
+    for line in lines:
+        tokens, delta = _split_line(line)
+        if not pending:
+            leading_blank = line[:1] in (" ", "\t")
+        depth += delta
+        pending += tokens
+        if depth == 0 and pending:
+            if leading_blank:
+                pending.insert(0, "")
+            yield pending
+            pending = []
+    if pending:
+        raise ValueError("Unbalanced parentheses in zone file")
+
+
+def iter_bind_records(lines: Iterable[str], origin: str, default_ttl: Optional[int] = None) -> Iterator[BindRecord]:
+    """Разбирает зону в формате BIND построчно.
+
+    Имена записей и имена хостов в данных CNAME, MX, NS, PTR, SRV и DNAME приводятся к полным
+    без точки на конце, относительные дополняются текущим ``$ORIGIN``.
+    """
+    origin = origin.rstrip(".")
+    previous_name = origin
+
+    for tokens in _iter_statements(lines):
+        if tokens[0] == "$ORIGIN":
+            origin = tokens[1].rstrip(".")
+            continue
+        if tokens[0] == "$TTL":
+            default_ttl = int(tokens[1])
+            continue
+        if tokens[0].startswith("$"):
+            raise ValueError(f"Unsupported directive {tokens[0]}")
+
+        name = tokens.pop(0)
+        name = _qualify(name, origin) if name else previous_name
+        previous_name = name
+
+        ttl = default_ttl
+        while tokens and (tokens[0].isdigit() or tokens[0].upper() in _CLASSES):
+            value = tokens.pop(0)
+            if value.isdigit():
+                ttl = int(value)
+        if len(tokens) < 2:
+            raise ValueError(f"Record for {name} has no data")
+
+        record_type = tokens.pop(0).upper()
+        priority = None
+        if record_type in _PRIORITY_TYPES:
+            priority = int(tokens.pop(0))
+        if record_type in _HOSTNAME_TYPES:
+            # имя хоста - последнее поле данных, у SRV перед ним вес и порт
+            tokens[-1] = _qualify(tokens[-1], origin)
+        if record_type in (RecordType.TXT, RecordType.SPF):
+            data = _join_text(tokens)
+        else:
+            data = " ".join(tokens)
+
+        yield BindRecord(name, record_type, data, ttl, priority)
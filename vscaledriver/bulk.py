@@ -0,0 +1,102 @@
+import itertools
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional
+
+
+class BulkOutcome(NamedTuple):
+    """Результат операции над одним элементом пачки"""
+
+    item: Any
+    result: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BulkResult(NamedTuple):
+    succeeded: List[BulkOutcome]
+    failed: List[BulkOutcome]
+
+    def __bool__(self) -> bool:
+        # пачка успешна, только если не упал ни один элемент
+        return not self.failed
+
+    def by_item(self, key: Callable[[Any], Hashable] = lambda item: item) -> Dict[Hashable, BulkOutcome]:
+        """Результаты по элементам, например ``result.by_item(lambda node: node.id)``"""
+        return {key(outcome.item): outcome for outcome in self.succeeded + self.failed}
+
+
+class RateLimiter:
+    """Не больше ``rate`` вызовов ``acquire`` в секунду, вызовы равномерно распределяются по времени"""
+
+    def __init__(self, rate: float, timer: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.interval = 1 / rate
+        self._timer = timer
+        self._sleep = sleep
+        self._next = timer()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = self._timer()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            self._sleep(start - now)
+
+
+def iter_bulk(
+    func: Callable[[Any], Any], items: Iterable[Any], concurrency: int = 8, rate: Optional[float] = None
+) -> Iterator[BulkOutcome]:
+    """Выполняет ``func`` для каждого элемента в пуле потоков.
+
+    Одновременно в работе не больше ``concurrency`` элементов, ``items`` читается лениво,
+    результаты отдаются по мере готовности. Ошибка одного элемента не прерывает остальные.
+    ``rate`` ограничивает число запусков ``func`` в секунду.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be positive")
+    if rate is not None:
+        limiter, call = RateLimiter(rate), func
+
+        def func(item):
+            limiter.acquire()
+            return call(item)
+
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {}
+
+        def submit(count: int) -> None:
+            for item in itertools.islice(items, count):
+                pending[executor.submit(func, item)] = item
+
+        submit(concurrency)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    yield BulkOutcome(item, future.result())
+                else:
+                    yield BulkOutcome(item, error=error)
+            submit(len(done))
+
+
+def run_bulk(
+    func: Callable[[Any], Any], items: Iterable[Any], concurrency: int = 8, rate: Optional[float] = None
+) -> BulkResult:
+    result = BulkResult(succeeded=[], failed=[])
+    for outcome in iter_bulk(func, items, concurrency, rate):
+        if outcome.ok:
+            result.succeeded.append(outcome)
+        else:
+            result.failed.append(outcome)
+    return result
@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import pathlib
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogEntry(NamedTuple):
+    data: Any
+    fetched_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+def default_path() -> pathlib.Path:
+    """``$XDG_CACHE_HOME/vscaledriver``, по умолчанию ``~/.cache/vscaledriver``"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return pathlib.Path(cache_home) / "vscaledriver"
+
+
+class CatalogStore:
+    """Справочники API (образы, тарифы, локации) на диске между запусками процесса.
+
+    Каждый справочник хранится в отдельном JSON файле с версией формата и временем загрузки.
+    Файл записывается во временный и атомарно переименовывается, поэтому несколько процессов
+    могут одновременно читать и обновлять хранилище, не видя недописанных файлов.
+
+    Записи моложе ``max_age`` секунд отдаются как есть. Более старые тоже отдаются сразу,
+    но в фоновом потоке запрашивается свежая версия. Записи старше ``max_stale`` и повреждённые
+    файлы считаются отсутствующими, тогда справочник запрашивается синхронно.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Union[str, os.PathLike, None] = None, max_age: float = 3600, max_stale: float = 7 * 24 * 3600):
+        self.path = pathlib.Path(path) if path is not None else default_path()
+        self.max_age = max_age
+        self.max_stale = max_stale
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.last_error: Optional[Exception] = None
+        self._refreshing: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _file(self, key: str) -> pathlib.Path:
+        return self.path / (re.sub(r"[^\w.-]+", "_", key) + ".json")
+
+    def load(self, key: str) -> Optional[CatalogEntry]:
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(content, dict) or content.get("version") != self.VERSION or content.get("key") != key:
+            return None
+        entry = CatalogEntry(content["data"], content["fetched_at"])
+        return entry if entry.age <= self.max_stale else None
+
+    def save(self, key: str, data: Any) -> bool:
+        """Записывает справочник на диск. Хранилище - только кеш, поэтому ошибки записи
+        (нет прав, диск заполнен) не прерывают запрос, а логируются и сохраняются в ``last_error``"""
+        try:
+            self._write(key, data)
+        except OSError as e:
+            self.last_error = e
+            logger.warning("Failed to save catalog %s to %s: %s", key, self.path, e)
+            return False
+        return True
+
+    def _write(self, key: str, data: Any) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        content = {"version": self.VERSION, "key": key, "fetched_at": time.time(), "data": data}
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".catalog-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(content, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, self._file(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Удаляет справочник по ключу, без ключа - все"""
+        files = [self._file(key)] if key is not None else self.path.glob("*.json")
+        for file in files:
+            try:
+                file.unlink()
+            except FileNotFoundError:
+                pass
+
+    def lookup(self, key: str) -> Optional[CatalogEntry]:
+        """Запись из хранилища с учётом статистики, None - нужно запросить справочник"""
+        entry = self.load(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            elif entry.age > self.max_age:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def start_refresh(self, key: str) -> bool:
+        """Отмечает начало фонового обновления, False - обновление уже идёт"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def finish_refresh(self, key: str, data: Any = None, error: Optional[Exception] = None) -> None:
+        try:
+            if error is None:
+                self.save(key, data)
+            else:
+                self.last_error = error
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh(self, key: str, fetch: Callable[[], Any]) -> None:
+        try:
+            data = fetch()
+        except Exception as e:
+            self.finish_refresh(key, error=e)
+        else:
+            self.finish_refresh(key, data)
+
+    def get(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """Справочник из хранилища, ``fetch`` запрашивает его из API"""
+        entry = self.lookup(key)
+        if entry is None:
+            data = fetch()
+            self.save(key, data)
+            return data
+        if entry.age > self.max_age and self.start_refresh(key):
+            threading.Thread(target=self._refresh, args=(key, fetch), name="vscale-catalog-refresh", daemon=True).start()
+        return entry.data
+
+    def wait_refreshed(self, timeout: Optional[float] = None) -> bool:
+        """Ждёт завершения фоновых обновлений, полезно перед выходом из короткоживущего процесса"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._refreshing:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+            }
@@ -0,0 +1,83 @@
+"""JSON кодек для тел запросов и ответов API.
+
+При импорте выбирается самый быстрый из установленных бэкендов: orjson, ujson, затем
+стандартный ``json``. ``dumps`` всегда возвращает UTF-8 байты, ``loads`` принимает str и bytes.
+Бэкенд можно сменить через ``set_codec("json")`` или передать свой ``Codec``.
+"""
+import json
+from typing import Any, Callable, NamedTuple, Union
+
+
+class Codec(NamedTuple):
+    name: str
+    loads: Callable[[Union[str, bytes]], Any]
+    dumps: Callable[[Any], bytes]
+
+
+def _stdlib_codec() -> Codec:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    return Codec("json", json.loads, dumps)
+
+
+def _orjson_codec() -> Codec:
+    import orjson
+
+    return Codec("orjson", orjson.loads, orjson.dumps)
+
+
+def _ujson_codec() -> Codec:
+    import ujson  # type: ignore[import]
+
+    def dumps(obj: Any) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    return Codec("ujson", ujson.loads, dumps)
+
+
+BACKENDS = {
+    "orjson": _orjson_codec,
+    "ujson": _ujson_codec,
+    "json": _stdlib_codec,
+}
+
+
+def get_codec(name: str) -> Codec:
+    """Кодек по имени бэкенда, ImportError - бэкенд не установлен"""
+    try:
+        factory = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"unknown JSON backend {name!r}, expected one of {', '.join(BACKENDS)}")
+    return factory()
+
+
+def _default_codec() -> Codec:
+    for name in BACKENDS:
+        try:
+            return get_codec(name)
+        except ImportError:
+            continue
+    raise AssertionError("stdlib json is always available")  # pragma: no cover
+
+
+_current = _default_codec()
+
+
+def current_codec() -> Codec:
+    return _current
+
+
+def set_codec(value: Union[Codec, str]) -> Codec:
+    """Меняет кодек для всех драйверов, возвращает предыдущий"""
+    global _current
+    previous, _current = _current, get_codec(value) if isinstance(value, str) else value
+    return previous
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    return _current.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    return _current.dumps(obj)
@@ -0,0 +1,209 @@
+import threading
+import time
+from typing import Iterator, Optional, Union
+
+from libcloud.common.base import ConnectionKey, JsonResponse, RawResponse
+from libcloud.common.types import InvalidCredsError, MalformedResponseError, ProviderError
+from libcloud.utils.py3 import httplib
+
+from vscaledriver import codec
+from vscaledriver.jsonstream import iter_json_array
+from vscaledriver.metrics import RequestMetrics, payload_size, response_size
+from vscaledriver.pool import VscaleConnectionPool
+from vscaledriver.retry import CircuitBreaker, RetryPolicy, route_template
+from vscaledriver.singleflight import SingleFlight
+
+
+class VscaleJsonResponse(JsonResponse):
+    def parse_body(self):
+        if len(self.body) == 0 and not self.parse_zero_length_body:
+            return self.body
+
+        try:
+            return codec.loads(self.body)
+        except ValueError:
+            raise MalformedResponseError("Failed to parse JSON", body=self.body, driver=self.connection.driver)
+
+    def parse_error(self) -> str:
+        http_code = int(self.status)
+        if http_code == httplib.FORBIDDEN:
+            raise InvalidCredsError("Invalid credentials")
+
+        # прокси перед API на 502/503/504 отвечают HTML, а не JSON
+        try:
+            error = self.parse_body().get("error")
+        except (MalformedResponseError, AttributeError):
+            error = None
+        if error is None:
+            return self.body or httplib.responses.get(http_code, "")
+
+        if http_code == httplib.INTERNAL_SERVER_ERROR and isinstance(error, dict):
+            return error.get("message", str(error))
+
+        if http_code in (httplib.CONFLICT, httplib.NOT_FOUND):
+            raise ProviderError(value=error, http_code=http_code)
+
+        return error
+
+    def success(self):
+        # При успешном DELETE возвращается NO CONTENT
+        if self.status == httplib.NO_CONTENT:
+            return True
+        return super().success()
+
+
+class VscaleRawResponse(RawResponse):
+    """Потоковый ответ, тело читается через ``iter_content``"""
+
+    def __init__(self, connection, response=None):
+        self._http_response = response
+        super().__init__(connection, response)
+        # libcloud до 3.6 не вызывает parse_error из __init__, и ошибка доходила бы до разбора потока
+        if response is not None and not self.success():
+            self.parse_error()
+
+    def success(self):
+        if self.status == httplib.NO_CONTENT:
+            return True
+        return super().success()
+
+    def parse_error(self):
+        # тело ошибки небольшое: читаем его целиком и разбираем как обычный ответ,
+        # VscaleJsonResponse сам выбросит нужное исключение
+        self.connection.responseCls(self._http_response, self.connection)
+
+    def close(self):
+        if self._http_response is not None:
+            self._http_response.close()
+
+
+class VscaleConnection(ConnectionKey):
+    responseCls = VscaleJsonResponse
+    rawResponseCls = VscaleRawResponse
+    host = "api.vscale.io"
+
+    def __init__(
+        self,
+        *args,
+        pool: Optional[VscaleConnectionPool] = None,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        metrics: Optional[RequestMetrics] = None,
+        coalescer: Optional[SingleFlight] = None,
+        **kwargs,
+    ):
+        # LibcloudConnection хранит ответ последнего запроса в атрибуте, поэтому
+        # у каждого потока своё HTTP соединение
+        self._local = threading.local()
+        self.pool = pool
+        self.retry = retry
+        self.breaker = breaker
+        self.metrics = metrics
+        self.coalescer = coalescer
+        super().__init__(*args, **kwargs)
+
+    @property
+    def connection(self):
+        return getattr(self._local, "connection", None)
+
+    @connection.setter
+    def connection(self, value):
+        self._local.connection = value
+
+    def connect(self, *args, **kwargs):
+        super().connect(*args, **kwargs)
+        if self.pool is not None:
+            # сессия потока остаётся своей, а сокеты берутся из общего пула
+            self.pool.mount(self.connection.session)
+
+    def request(self, action, params=None, data=None, headers=None, method="GET", raw=False, stream=False, **kwargs):
+        # одновременные одинаковые GET идут в API одним запросом, потоковые ответы не объединяются
+        if self.coalescer is not None and method == "GET" and not raw and not stream and data is None:
+            key = (self.key, self.host, self.port, action, tuple(sorted((params or {}).items())))
+            return self.coalescer.do(
+                key, lambda: self._request_with_retries(action, params, data, headers, method, raw, stream, **kwargs)
+            )
+        return self._request_with_retries(action, params, data, headers, method, raw, stream, **kwargs)
+
+    def _request_with_retries(self, action, params, data, headers, method, raw, stream, **kwargs):
+        route = route_template(action)
+        attempt = 0
+        while True:
+            if self.breaker is not None:
+                self.breaker.before_request(route)
+            if self.pool is not None:
+                self.pool.acquire()
+            started = time.perf_counter()
+            try:
+                response = super().request(action, params, data, headers, method, raw, stream=stream, **kwargs)
+            except Exception as e:
+                if self.metrics is not None:
+                    self.metrics.record(method, route, time.perf_counter() - started, bytes_sent=payload_size(data), error=e)
+                if self.breaker is not None:
+                    self.breaker.record(route, e)
+                if self.retry is None or not self.retry.should_retry(method, e, attempt):
+                    raise
+                self.retry.sleep(self.retry.delay(attempt, e))
+                attempt += 1
+                continue
+            except BaseException:
+                # KeyboardInterrupt и т.п.: запрос не завершён, пробный запрос не должен занимать цепь
+                if self.breaker is not None:
+                    self.breaker.release(route)
+                raise
+
+            if self.metrics is not None:
+                self.metrics.record(
+                    method,
+                    route,
+                    time.perf_counter() - started,
+                    status=response.status,
+                    bytes_sent=payload_size(data),
+                    bytes_received=response_size(response),
+                )
+            if self.breaker is not None:
+                self.breaker.record(route)
+            return response
+
+    def add_default_headers(self, headers):
+        headers["X-Token"] = self.key
+        return headers
+
+    def iter_objects(self, action: str, chunk_size: int = 64 * 1024) -> Iterator:
+        """Читает JSON массив по ``action`` потоком и отдаёт элементы по одному"""
+        response = self.request(action, raw=True, stream=True)
+        try:
+            yield from iter_json_array(response.iter_content(chunk_size))
+        finally:
+            response.close()
+
+
+def _connection_pool(key: str, pool: Union[VscaleConnectionPool, bool, None]) -> Optional[VscaleConnectionPool]:
+    if pool is True:
+        return VscaleConnectionPool.for_key(key)
+    return pool or None
+
+
+def _retry_policy(retry: Union[RetryPolicy, int, None]) -> Optional[RetryPolicy]:
+    # число - количество повторов с остальными параметрами по умолчанию
+    if isinstance(retry, RetryPolicy) or retry is None:
+        return retry
+    return RetryPolicy(retries=retry) if retry else None
+
+
+def _request_metrics(metrics: Union[RequestMetrics, bool, None]) -> Optional[RequestMetrics]:
+    if metrics is True:
+        return RequestMetrics()
+    return metrics or None
+
+
+def _single_flight(key: str, coalescer: Union[SingleFlight, bool, None], cls=SingleFlight) -> Optional[SingleFlight]:
+    if coalescer is True:
+        return cls.for_key(key)
+    return coalescer or None
+
+
+def _circuit_breaker(breaker: Union[CircuitBreaker, bool, None]) -> Optional[CircuitBreaker]:
+    if breaker is True:
+        return CircuitBreaker()
+    return breaker or None
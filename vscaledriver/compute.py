@@ -0,0 +1,751 @@
+import copy
+import datetime
+import functools
+import os
+import socket
+import time
+from typing import Any, Callable, Collection, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from libcloud.common.types import LibcloudError, ProviderError
+from libcloud.compute.base import (
+    KeyPair,
+    Node,
+    NodeAuthPassword,
+    NodeAuthSSHKey,
+    NodeDriver,
+    NodeImage,
+    NodeLocation,
+    NodeSize,
+    NodeState,
+    T_Auth,
+)
+from libcloud.compute.types import KeyPairDoesNotExistError
+from libcloud.utils.networking import is_valid_ip_address
+from libcloud.utils.py3 import httplib
+
+from vscaledriver import codec
+from vscaledriver.bulk import BulkResult, run_bulk
+from vscaledriver.cache import TTLCache
+from vscaledriver.catalogstore import CatalogStore
+from vscaledriver.common import (
+    VscaleConnection,
+    _circuit_breaker,
+    _connection_pool,
+    _request_metrics,
+    _retry_policy,
+    _single_flight,
+)
+from vscaledriver.inventory import NodeChanges, NodeSnapshot, diff_nodes
+from vscaledriver.metrics import RequestMetrics
+from vscaledriver.pool import VscaleConnectionPool
+from vscaledriver.retry import CircuitBreaker, RetryPolicy
+from vscaledriver.singleflight import SingleFlight
+from vscaledriver.watch import NodeWatcher
+
+
+def _catalog_store(store: Union[CatalogStore, str, os.PathLike, bool, None]) -> Optional[CatalogStore]:
+    # True - хранилище в каталоге по умолчанию, строка или путь - в указанном каталоге
+    if isinstance(store, CatalogStore):
+        return store
+    if not store:
+        return None
+    return CatalogStore() if store is True else CatalogStore(store)
+
+
+def parse_created(value: str) -> datetime.datetime:
+    """Разбирает дату создания скалета в формате ``20.08.2015 14:57:04``.
+
+    Формат фиксированный, поэтому поля берутся срезами строки, это в разы быстрее strptime.
+    """
+    if len(value) != 19 or value[2] != "." or value[5] != "." or value[10] != " " or value[13] != ":" or value[16] != ":":
+        return datetime.datetime.strptime(value, "%d.%m.%Y %H:%M:%S")
+    return datetime.datetime(
+        int(value[6:10]),
+        int(value[3:5]),
+        int(value[0:2]),
+        int(value[11:13]),
+        int(value[14:16]),
+        int(value[17:19]),
+    )
+
+
+class VscaleNode(Node):
+    """Нода, у которой ``created_at`` может храниться строкой API и разбираться при первом чтении"""
+
+    _created_at: Union[datetime.datetime, str, None]
+
+    @property
+    def created_at(self) -> Optional[datetime.datetime]:
+        value = self._created_at
+        if isinstance(value, str):
+            value = self._created_at = parse_created(value)
+        return value
+
+    @created_at.setter
+    def created_at(self, value) -> None:
+        self._created_at = value
+
+
+class VscaleNodeView:
+    """Компактное представление скалета для больших инвентарей.
+
+    Повторяет интерфейс ``Node``, но хранит только основные поля в ``__slots__``.
+    Исходный ответ API хранится сжатой JSON строкой и разбирается при каждом обращении
+    к ``extra``, ``created_at`` разбирается при первом обращении. Полный ``Node``
+    можно получить через ``to_node()``.
+    """
+
+    __slots__ = ("id", "name", "state", "public_ips", "private_ips", "driver", "image", "_created_at", "_extra", "_uuid")
+
+    size = None
+
+    def __init__(self, id, name, state, public_ips, private_ips, driver, image, created_at, extra: bytes):
+        self.id = id
+        self.name = name
+        self.state = state
+        self.public_ips = public_ips
+        self.private_ips = private_ips
+        self.driver = driver
+        self.image = image
+        self._created_at = created_at
+        self._extra = extra
+        self._uuid = None
+
+    @property
+    def created_at(self) -> Optional[datetime.datetime]:
+        value = self._created_at
+        if isinstance(value, str):
+            value = self._created_at = parse_created(value)
+        return value
+
+    @property
+    def extra(self) -> dict:
+        return codec.loads(self._extra)
+
+    get_uuid = Node.get_uuid
+    uuid = Node.uuid
+    reboot = Node.reboot
+    start = Node.start
+    stop_node = Node.stop_node
+    destroy = Node.destroy
+    __repr__ = Node.__repr__
+
+    def to_node(self) -> Node:
+        return VscaleNode(
+            id=self.id,
+            name=self.name,
+            state=self.state,
+            public_ips=list(self.public_ips),
+            private_ips=list(self.private_ips),
+            driver=self.driver,
+            image=self.image,
+            extra=self.extra,
+            created_at=self._created_at,
+        )
+
+
+@functools.lru_cache(maxsize=1024)
+def _openssh_fingerprint(public_key: str) -> str:
+    # тянет cryptography, поэтому импортируется при первом обращении к fingerprint
+    from libcloud.utils.publickey import get_pubkey_openssh_fingerprint
+
+    return get_pubkey_openssh_fingerprint(public_key)
+
+
+class VscaleKeyPair(KeyPair):
+    """SSH ключ, fingerprint вычисляется при первом обращении"""
+
+    _fingerprint: Optional[str]
+
+    @property
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = _openssh_fingerprint(self.public_key)
+        return self._fingerprint
+
+    @fingerprint.setter
+    def fingerprint(self, value: Optional[str]) -> None:
+        self._fingerprint = value
+
+
+class BaseVscaleDriver(NodeDriver):
+    """Общая часть синхронного и асинхронного драйверов: состояние и разбор ответов API"""
+
+    name = "Vscale"
+    website = "https://vscale.io/"
+    coalescerCls = SingleFlight
+    NODE_STATE_MAP = {
+        "started": NodeState.RUNNING,
+        "stopped": NodeState.STOPPED,
+        "billing": NodeState.SUSPENDED,
+        "queued": NodeState.PENDING,  # в документации нет, но в API возвращает
+    }
+
+    def __init__(
+        self,
+        key,
+        *args,
+        ex_catalog_cache_ttl: Optional[float] = None,
+        ex_catalog_cache_size: int = 16,
+        ex_catalog_store: Union[CatalogStore, str, os.PathLike, bool, None] = None,
+        ex_connection_pool: Union[VscaleConnectionPool, bool, None] = None,
+        ex_defer_created: bool = False,
+        ex_compact_nodes: bool = False,
+        ex_retry: Union[RetryPolicy, int, None] = None,
+        ex_circuit_breaker: Union[CircuitBreaker, bool, None] = None,
+        ex_metrics: Union[RequestMetrics, bool, None] = None,
+        ex_coalesce_requests: Union[SingleFlight, bool, None] = None,
+        ex_key_pair_index_ttl: float = 60,
+        **kwargs,
+    ):
+        # ex_defer_created=True - created_at разбирается только при обращении к нему
+        self.defer_created = ex_defer_created
+        # ex_compact_nodes=True - list_nodes и ex_iter_nodes возвращают VscaleNodeView
+        self.compact_nodes = ex_compact_nodes
+        # образы, из которых созданы скалеты: один NodeImage на id
+        self._node_images: Dict[str, NodeImage] = {}
+        # ex_connection_pool=True - общий пул для всех драйверов с этим токеном
+        self.connection_pool = _connection_pool(key, ex_connection_pool)
+        self.retry_policy = _retry_policy(ex_retry)
+        self.circuit_breaker = _circuit_breaker(ex_circuit_breaker)
+        self.metrics = _request_metrics(ex_metrics)
+        # ex_coalesce_requests=True - общий для токена SingleFlight
+        self.coalescer = _single_flight(key, ex_coalesce_requests, self.coalescerCls)
+        # Кеш справочников (локации, образы, тарифы) выключен по умолчанию
+        self.catalog_cache: Optional[TTLCache] = None
+        if ex_catalog_cache_ttl:
+            self.catalog_cache = TTLCache(ex_catalog_cache_ttl, ex_catalog_cache_size)
+        # Справочники на диске между запусками процесса, выключены по умолчанию
+        self.catalog_store = _catalog_store(ex_catalog_store)
+        # Индекс ключей заполняется при list_key_pairs и живёт ex_key_pair_index_ttl секунд:
+        # ключ могут удалить или заменить из панели или другим процессом
+        self.key_pair_index_ttl = ex_key_pair_index_ttl
+        self._key_pairs_by_name: Optional[Dict[str, KeyPair]] = None
+        self._key_pairs_by_id: Dict[int, KeyPair] = {}
+        self._key_pairs_indexed_at = 0.0
+        super().__init__(key, *args, **kwargs)
+
+    def _ex_connection_class_kwargs(self):
+        return {
+            "pool": self.connection_pool,
+            "retry": self.retry_policy,
+            "breaker": self.circuit_breaker,
+            "metrics": self.metrics,
+            "coalescer": self.coalescer,
+        }
+
+    def ex_invalidate_catalog_cache(self, action: Optional[str] = None) -> None:
+        """Сбрасывает кеш справочников, например ``ex_invalidate_catalog_cache("v1/rplans")``"""
+        if self.catalog_cache is not None:
+            self.catalog_cache.invalidate(action)
+        if self.catalog_store is not None:
+            self.catalog_store.invalidate(None if action is None else self._catalog_key(action))
+
+    def ex_catalog_cache_stats(self) -> dict:
+        stats: Dict[str, Any] = {} if self.catalog_cache is None else self.catalog_cache.stats()
+        if self.catalog_store is not None:
+            stats["store"] = self.catalog_store.stats()
+        return stats
+
+    def _catalog_key(self, action: str) -> str:
+        return f"{self.connection.host}/{action}"
+
+    def ex_invalidate_key_pair_index(self) -> None:
+        self._key_pairs_by_name = None
+        self._key_pairs_by_id = {}
+
+    def _key_pair_index(self) -> Optional[Dict[str, KeyPair]]:
+        """Индекс ключей по имени, None - индекс не загружен или устарел"""
+        if self._key_pairs_by_name is not None and time.monotonic() - self._key_pairs_indexed_at >= self.key_pair_index_ttl:
+            self.ex_invalidate_key_pair_index()
+        return self._key_pairs_by_name
+
+    def _index_key_pairs(self, key_pairs: List[KeyPair]) -> None:
+        # при одинаковых именах get_key_pair отдаёт первый ключ из списка
+        self._key_pairs_by_name = {kp.name: kp for kp in reversed(key_pairs)}
+        self._key_pairs_by_id = {kp.extra["id"]: kp for kp in key_pairs}
+        self._key_pairs_indexed_at = time.monotonic()
+
+    def _index_key_pair(self, key_pair: KeyPair) -> None:
+        if self._key_pairs_by_name is not None:
+            self._key_pairs_by_name[key_pair.name] = key_pair
+            self._key_pairs_by_id[key_pair.extra["id"]] = key_pair
+
+    def _indexed_key_pair_id(self, public_key: str) -> Optional[int]:
+        # ключи сравниваются по типу и телу, комментарий не учитывается
+        if self._key_pair_index() is None:
+            return None
+        wanted = public_key.split()[:2]
+        for key_pair in self._key_pairs_by_id.values():
+            if key_pair.public_key.split()[:2] == wanted:
+                return key_pair.extra["id"]
+        return None
+
+    def _unindex_key_pair(self, key_pair_id: int) -> None:
+        if self._key_pairs_by_name is not None:
+            indexed = self._key_pairs_by_id.pop(key_pair_id, None)
+            if indexed is not None and self._key_pairs_by_name.get(indexed.name) is indexed:
+                del self._key_pairs_by_name[indexed.name]
+
+    def _to_location(self, loc: dict) -> NodeLocation:
+        # there is only one possible location RU
+        default_location = "RU"
+        return NodeLocation(loc["id"], loc["description"], default_location, self, extra=copy.deepcopy(loc))
+
+    def _to_image(self, image: dict) -> NodeImage:
+        return NodeImage(image["id"], image["description"], self, extra=copy.deepcopy(image))
+
+    def _to_sizes(self, plans: list, location=None) -> List[NodeSize]:
+        sizes = []
+        for plan in plans:
+            # since selectel doesnt support filtering do it manually
+            if location and location not in plan["locations"]:
+                continue
+            # selectel doesn't provide prices for plans and bandwidth
+            #  so set to 0
+            # копия: словари каталогов лежат в кэше
+            extra = copy.deepcopy(plan)
+            sizes.append(
+                NodeSize(
+                    id=plan["id"],
+                    name=plan["id"],
+                    ram=plan["memory"],
+                    disk=plan["disk"],
+                    price=0,
+                    bandwidth=0,
+                    driver=self,
+                    extra=extra,
+                ),
+            )
+        return sizes
+
+    def _to_key_pair(self, kp: dict, full_extra: bool = False) -> KeyPair:
+        # в list_key_pairs extra - только id, create_key_pair отдаёт в extra весь ответ API
+        extra = {k: v for k, v in kp.items() if k not in ("key", "name")} if full_extra else dict(id=kp["id"])
+        return VscaleKeyPair(
+            name=kp["name"],
+            public_key=kp["key"],
+            fingerprint=None,
+            driver=self,
+            extra=extra,
+        )
+
+    def _to_node_image(self, made_from: str) -> NodeImage:
+        image = self._node_images.get(made_from)
+        if image is None:
+            # неправильно передаётся name. для сравнения используется поле id
+            image = self._node_images.setdefault(made_from, NodeImage(made_from, name=made_from, driver=self))
+        return image
+
+    def _to_node(self, n: dict) -> Union[Node, VscaleNodeView]:
+        state = self.NODE_STATE_MAP.get(n["status"], NodeState.UNKNOWN)
+
+        created = n["created"] if self.defer_created or self.compact_nodes else parse_created(n["created"])
+
+        private_ips = []
+        if n["private_address"]:
+            private_ips.append(n["private_address"]["address"])
+
+        public_ips = []
+        if n["public_address"]:
+            public_ips.append(n["public_address"]["address"])
+
+        image = self._to_node_image(n["made_from"])
+
+        if self.compact_nodes:
+            return VscaleNodeView(
+                str(n["ctid"]),
+                n["name"],
+                state,
+                tuple(public_ips),
+                tuple(private_ips),
+                self,
+                image,
+                created,
+                codec.dumps(n),
+            )
+
+        return VscaleNode(
+            id=n["ctid"],
+            name=n["name"],
+            state=state,
+            public_ips=public_ips,
+            private_ips=private_ips,
+            driver=self,
+            image=image,
+            extra=n,
+            created_at=created,
+        )
+
+    def _to_created_node(self, response, image: NodeImage) -> Node:
+        state = self.NODE_STATE_MAP.get(response.object.get("status"), NodeState.UNKNOWN)
+        created = response.object.get("created")
+        if created and not self.defer_created:
+            created = parse_created(created)
+        return VscaleNode(
+            id=response.object.get("ctid"),
+            name=response.object.get("name"),
+            state=state,
+            public_ips=response.object.get("public_address"),
+            private_ips=response.object.get("private_address"),
+            driver=self,
+            image=image,
+            extra=response,
+            created_at=created,
+        )
+
+    def _create_node_payload(
+        self,
+        name: str,
+        size: NodeSize,
+        image: NodeImage,
+        location: Optional[NodeLocation] = None,
+        auth: T_Auth = None,
+        key_id: Optional[int] = None,
+    ) -> dict:
+        payload = {
+            "make_from": image.id,
+            "rplan": size.id,
+            "do_start": True,
+            "name": name,
+        }
+        if location:
+            payload["location"] = getattr(location, "id", location)
+        if isinstance(auth, NodeAuthSSHKey):
+            # API принимает id ключей аккаунта, а не сами ключи
+            payload["keys"] = [key_id]
+        elif isinstance(auth, NodeAuthPassword):
+            payload["password"] = auth.password
+        return payload
+
+
+class VscaleDriver(BaseVscaleDriver):
+    connectionCls = VscaleConnection
+
+    def _request_catalog(self, action: str) -> list:
+        result = None if self.catalog_cache is None else self.catalog_cache.get(action)
+        if result is None:
+            if self.catalog_store is None:
+                result = self.connection.request(action).object
+            else:
+                result = self.catalog_store.get(self._catalog_key(action), lambda: self.connection.request(action).object)
+            if self.catalog_cache is not None:
+                self.catalog_cache.set(action, result)
+        return result
+
+    def list_locations(self):
+        return [self._to_location(loc) for loc in self._request_catalog("v1/locations")]
+
+    def list_images(self):
+        return [self._to_image(image) for image in self._request_catalog("v1/images")]
+
+    def list_sizes(self, location=None):
+        return self._to_sizes(self._request_catalog("v1/rplans"), location)
+
+    def list_key_pairs(self):
+        response = self.connection.request("v1/sshkeys")
+        key_pairs = [self._to_key_pair(kp) for kp in response.object]
+        self._index_key_pairs(key_pairs)
+        return key_pairs
+
+    def get_key_pair(self, key_name):
+        index = self._key_pair_index()
+        key_pair = None if index is None else index.get(key_name)
+        if key_pair is None:
+            # индекс не загружен, устарел или ключ добавлен в обход драйвера
+            self.list_key_pairs()
+            key_pair = (self._key_pairs_by_name or {}).get(key_name)
+        return key_pair
+
+    def ex_get_key_pair_by_id(self, key_id: int) -> Optional[KeyPair]:
+        if self._key_pair_index() is None or key_id not in self._key_pairs_by_id:
+            self.list_key_pairs()
+        return self._key_pairs_by_id.get(key_id)
+
+    def _ssh_key_id(self, auth: T_Auth) -> Optional[int]:
+        """id ключа аккаунта для ``NodeAuthSSHKey``, ключ должен быть заранее добавлен в аккаунт"""
+        if not isinstance(auth, NodeAuthSSHKey):
+            return None
+        key_id = self._indexed_key_pair_id(auth.pubkey)
+        if key_id is None:
+            self.list_key_pairs()
+            key_id = self._indexed_key_pair_id(auth.pubkey)
+        if key_id is None:
+            raise KeyPairDoesNotExistError(auth.pubkey, self)
+        return key_id
+
+    def create_key_pair(self, name: str, public_key: str) -> KeyPair:
+        payload = {
+            "key": public_key,
+            "name": name,
+        }
+        data = codec.dumps(payload)
+        headers = {"Content-Type": "application/json"}
+        response = self.connection.request(
+            "v1/sshkeys",
+            method="POST",
+            headers=headers,
+            data=data,
+        )
+        key_pair = self._to_key_pair(response.object, full_extra=True)
+        self._index_key_pair(key_pair)
+        return key_pair
+
+    def delete_key_pair(self, key_pair: KeyPair):
+        key_pair_id = key_pair.extra["id"]
+        try:
+            response = self.connection.request(f"v1/sshkeys/{key_pair_id}", method="DELETE")
+        except ProviderError as e:
+            # ключа уже нет в API, в индексе его тоже быть не должно
+            if e.http_code == httplib.NOT_FOUND:
+                self._unindex_key_pair(key_pair_id)
+            raise
+        self._unindex_key_pair(key_pair_id)
+        return response.status == httplib.NO_CONTENT
+
+    def list_nodes(self):
+        response = self.connection.request("v1/scalets")
+        return [self._to_node(n) for n in response.object]
+
+    def ex_iter_nodes(self) -> Iterator[Node]:
+        """Как ``list_nodes``, но разбирает ответ потоком и отдаёт ноды по одной"""
+        for n in self.connection.iter_objects("v1/scalets"):
+            yield self._to_node(n)
+
+    def ex_list_node_changes(self, since: Optional[NodeSnapshot] = None) -> NodeChanges:
+        """Скалеты, добавленные, изменённые и удалённые после снимка ``since``.
+
+        Ноды создаются только для добавленных и изменённых скалетов, для удалённых
+        возвращаются id. Новый снимок из ``NodeChanges.snapshot`` передаётся в следующий вызов.
+        """
+        return diff_nodes(self.connection.iter_objects("v1/scalets"), since, self._to_node)
+
+    def ex_node_watcher(self, **kwargs) -> NodeWatcher:
+        """Общий для токена и адреса API ``NodeWatcher``, ``kwargs`` применяются при первом вызове.
+
+        Опрос запускается ``start()``, каждый ``start()`` завершается своим ``stop()``.
+        """
+        return NodeWatcher.for_driver(self, **kwargs)
+
+    def start_node(self, node: Node) -> bool:
+        payload = {
+            "id": node.id,
+        }
+        data = codec.dumps(payload)
+        headers = {"Content-Type": "application/json;charset=UTF-8"}
+        response = self.connection.request(
+            f"v1/scalets/{node.id}/start",
+            data=data,
+            headers=headers,
+            method="POST",
+        )
+        return response.status == httplib.OK
+
+    def stop_node(self, node: Node) -> bool:
+        payload = {
+            "id": node.id,
+        }
+        data = codec.dumps(payload)
+        headers = {"Content-Type": "application/json;charset=UTF-8"}
+        response = self.connection.request(
+            f"v1/scalets/{node.id}/stop",
+            headers=headers,
+            data=data,
+            method="POST",
+        )
+        return response.status == httplib.OK
+
+    def destroy_node(self, node: Node) -> bool:
+        headers = {"Content-Type": "application/json;charset=UTF-8"}
+        response = self.connection.request(
+            f"v1/scalets/{node.id}",
+            headers=headers,
+            method="DELETE",
+        )
+        return response.status == httplib.OK
+
+    def reboot_node(self, node: Node) -> bool:
+        headers = {"Content-Type": "application/json;charset=UTF-8"}
+        response = self.connection.request(
+            f"v1/scalets/{node.id}/restart",
+            headers=headers,
+            method="PATCH",
+        )
+        return response.status == httplib.OK
+
+    def create_node(
+        self,
+        name: str,
+        size: NodeSize,
+        image: NodeImage,
+        location: Optional[NodeLocation] = None,
+        auth: T_Auth = None,
+    ) -> Node:
+        payload = self._create_node_payload(name, size, image, location, auth, self._ssh_key_id(auth))
+        data = codec.dumps(payload)
+        headers = {"Content-Type": "application/json;charset=UTF-8"}
+        response = self.connection.request(
+            "v1/scalets",
+            headers=headers,
+            data=data,
+            method="POST",
+        )
+        return self._to_created_node(response, image)
+
+    def ex_iter_nodes_in_state(
+        self,
+        nodes: Iterable[Node],
+        states: Collection[str] = (NodeState.RUNNING,),
+        wait_period: float = 3,
+        max_wait_period: float = 30,
+        backoff: float = 1.5,
+        timeout: float = 600,
+        ready: Optional[Callable[[Node], bool]] = None,
+        ex_list_nodes_kwargs: Optional[dict] = None,
+    ) -> Iterator[Node]:
+        """Ждёт перехода нод в одно из состояний ``states``, отдаёт каждую ноду сразу по готовности.
+
+        За один шаг опроса делается один запрос ``v1/scalets`` на все ноды. Пока состояние нод не
+        меняется, интервал опроса растёт в ``backoff`` раз до ``max_wait_period``, после любого
+        изменения сбрасывается на ``wait_period``. ``ready`` - дополнительное условие готовности
+        ноды в нужном состоянии, ``ex_list_nodes_kwargs`` передаются в ``list_nodes``.
+        """
+        waiting: Dict[str, Optional[str]] = {node.id: None for node in nodes}
+        deadline = time.monotonic() + timeout
+        interval = wait_period
+        while waiting:
+            changed = False
+            for node in self.list_nodes(**(ex_list_nodes_kwargs or {})):
+                if node.id not in waiting:
+                    continue
+                if node.state in states and (ready is None or ready(node)):
+                    del waiting[node.id]
+                    changed = True
+                    yield node
+                elif waiting[node.id] is None:
+                    # первое наблюдение состояния изменением не считается
+                    waiting[node.id] = node.state
+                elif waiting[node.id] != node.state:
+                    changed = True
+                    waiting[node.id] = node.state
+
+            if not waiting:
+                return
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LibcloudError(value=f"Timed out after {timeout} seconds", driver=self)
+
+            interval = wait_period if changed else min(interval * backoff, max_wait_period)
+            time.sleep(min(interval, remaining))
+
+    def wait_until_running(
+        self,
+        nodes: List[Node],
+        wait_period: float = 3,
+        timeout: int = 600,
+        ssh_interface: str = "public_ips",
+        force_ipv4: bool = True,
+        ex_list_nodes_kwargs: Optional[dict] = None,
+        ex_max_wait_period: float = 30,
+    ) -> List[Tuple[Node, List[str]]]:
+        """Ждёт запуска нод (статус ``started``) одним запросом ``v1/scalets`` на шаг опроса.
+
+        Как и в ``NodeDriver``, нода готова, когда у неё есть адрес в ``ssh_interface``
+        (только IPv4 при ``force_ipv4``).
+        """
+        if ssh_interface not in ("public_ips", "private_ips"):
+            raise ValueError("ssh_interface argument must either be public_ips or private_ips")
+
+        def addresses(node: Node) -> List[str]:
+            ips = getattr(node, ssh_interface) or []
+            if force_ipv4:
+                ips = [ip for ip in ips if is_valid_ip_address(ip, socket.AF_INET)]
+            return ips
+
+        running = {}
+        for node in self.ex_iter_nodes_in_state(
+            nodes,
+            wait_period=wait_period,
+            max_wait_period=ex_max_wait_period,
+            timeout=timeout,
+            ready=lambda node: bool(addresses(node)),
+            ex_list_nodes_kwargs=ex_list_nodes_kwargs,
+        ):
+            running[node.id] = node
+        return [(running[node.id], addresses(running[node.id])) for node in nodes]
+
+    def ex_create_nodes(self, specs: Iterable[dict], concurrency: int = 8) -> BulkResult:
+        """Создаёт ноды пачкой, не больше ``concurrency`` запросов одновременно.
+
+        Каждый элемент ``specs`` - аргументы ``create_node``. Ошибка одной ноды не прерывает
+        остальные: в ``failed`` попадает спецификация и исключение, в ``succeeded`` - созданная нода.
+        """
+        return run_bulk(lambda spec: self.create_node(**spec), specs, concurrency)
+
+    def _bulk_node_action(
+        self,
+        action: Callable[[Node], bool],
+        nodes: Iterable[Node],
+        concurrency: int,
+        rate: Optional[float],
+        wait_states: Optional[Collection[str]] = None,
+        timeout: float = 600,
+    ) -> BulkResult:
+        result = run_bulk(action, nodes, concurrency, rate)
+        if not wait_states:
+            return result
+
+        # ожидание одним общим опросом v1/scalets, результат - нода в целевом состоянии
+        waiting = {outcome.item.id: i for i, outcome in enumerate(result.succeeded) if outcome.result}
+        nodes = [result.succeeded[i].item for i in waiting.values()]
+        try:
+            for node in self.ex_iter_nodes_in_state(nodes, wait_states, timeout=timeout):
+                i = waiting.pop(node.id)
+                result.succeeded[i] = result.succeeded[i]._replace(result=node)
+        except Exception as e:
+            # действие над нодами уже выполнено, ошибка опроса (5xx, 429, таймаут) - ошибка ожидания каждой ноды
+            for i in sorted(waiting.values(), reverse=True):
+                result.failed.append(result.succeeded.pop(i)._replace(error=e))
+        return result
+
+    def ex_start_nodes(
+        self,
+        nodes: Iterable[Node],
+        concurrency: int = 8,
+        rate: Optional[float] = None,
+        wait: bool = False,
+        timeout: float = 600,
+    ) -> BulkResult:
+        """Запускает ноды пачкой: не больше ``concurrency`` запросов одновременно и ``rate`` запросов в секунду.
+
+        С ``wait=True`` ждёт состояния RUNNING, тогда ``result`` успешных элементов - нода в этом
+        состоянии, а ноды, не дождавшиеся его за ``timeout``, попадают в ``failed``.
+        Результат по каждой ноде - ``result.by_item(lambda node: node.id)``.
+        """
+        return self._bulk_node_action(
+            self.start_node, nodes, concurrency, rate, (NodeState.RUNNING,) if wait else None, timeout
+        )
+
+    def ex_stop_nodes(
+        self,
+        nodes: Iterable[Node],
+        concurrency: int = 8,
+        rate: Optional[float] = None,
+        wait: bool = False,
+        timeout: float = 600,
+    ) -> BulkResult:
+        """Как ``ex_start_nodes``, но останавливает ноды и ждёт состояния STOPPED"""
+        return self._bulk_node_action(self.stop_node, nodes, concurrency, rate, (NodeState.STOPPED,) if wait else None, timeout)
+
+    def ex_reboot_nodes(self, nodes: Iterable[Node], concurrency: int = 8, rate: Optional[float] = None) -> BulkResult:
+        """Как ``ex_start_nodes``, но перезагружает ноды.
+
+        Ожидания нет: во время перезагрузки API продолжает отдавать состояние RUNNING, поэтому
+        её завершение по состоянию ноды не определить.
+        """
+        return self._bulk_node_action(self.reboot_node, nodes, concurrency, rate)
+
+    def ex_destroy_nodes(self, nodes: Iterable[Node], concurrency: int = 8, rate: Optional[float] = None) -> BulkResult:
+        """Удаляет ноды пачкой с теми же ограничениями, что и ``ex_start_nodes``"""
+        return self._bulk_node_action(self.destroy_node, nodes, concurrency, rate)
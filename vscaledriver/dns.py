@@ -0,0 +1,550 @@
+import copy
+import datetime
+import io
+from typing import IO, Collection, Dict, Iterable, List, Optional, Union
+
+from libcloud.common.types import ProviderError
+from libcloud.dns.base import DNSDriver, Record, Zone
+from libcloud.dns.types import (
+    RecordAlreadyExistsError,
+    RecordDoesNotExistError,
+    RecordError,
+    RecordType,
+    ZoneDoesNotExistError,
+    ZoneError,
+)
+from libcloud.utils.py3 import httplib
+
+from vscaledriver import codec
+from vscaledriver.bind import BindImportResult, format_bind_record, iter_bind_records
+from vscaledriver.bulk import BulkResult, iter_bulk, run_bulk
+from vscaledriver.cache import TTLCache
+from vscaledriver.common import (
+    VscaleConnection,
+    _circuit_breaker,
+    _connection_pool,
+    _request_metrics,
+    _retry_policy,
+    _single_flight,
+)
+from vscaledriver.metrics import RequestMetrics
+from vscaledriver.pool import VscaleConnectionPool
+from vscaledriver.recordindex import ZoneRecords
+from vscaledriver.retry import CircuitBreaker, RetryPolicy
+from vscaledriver.singleflight import SingleFlight
+from vscaledriver.zonesync import ZoneSyncPlan, ZoneSyncResult, plan_zone_sync, to_desired_record
+
+
+def _copy_zone(zone: Zone) -> Zone:
+    # кеш хранит и отдаёт копии: изменения extra у вызывающего не должны попадать в кеш
+    return Zone(
+        id=zone.id,
+        domain=zone.domain,
+        type=zone.type,
+        ttl=zone.ttl,
+        driver=zone.driver,
+        extra=copy.deepcopy(zone.extra),
+    )
+
+
+class BaseVscaleDns(DNSDriver):
+    """Общая часть синхронного и асинхронного DNS драйверов"""
+
+    name = "Vscale"
+    website = "https://vscale.io/"
+    coalescerCls = SingleFlight
+
+    RECORD_TYPE_MAP = {
+        RecordType.SOA: "SOA",
+        RecordType.NS: "NS",
+        RecordType.A: "A",
+        RecordType.AAAA: "AAAA",
+        RecordType.CNAME: "CNAME",
+        RecordType.SRV: "SRV",
+        RecordType.MX: "MX",
+        RecordType.TXT: "TXT",
+        RecordType.SPF: "SPF",
+    }
+
+    def __init__(
+        self,
+        key,
+        *args,
+        ex_connection_pool: Union[VscaleConnectionPool, bool, None] = None,
+        ex_zone_cache_ttl: Optional[float] = None,
+        ex_zone_cache_size: int = 1024,
+        ex_record_index_ttl: Optional[float] = None,
+        ex_record_index_size: int = 256,
+        ex_retry: Union[RetryPolicy, int, None] = None,
+        ex_circuit_breaker: Union[CircuitBreaker, bool, None] = None,
+        ex_metrics: Union[RequestMetrics, bool, None] = None,
+        ex_coalesce_requests: Union[SingleFlight, bool, None] = None,
+        **kwargs,
+    ):
+        self.connection_pool = _connection_pool(key, ex_connection_pool)
+        self.retry_policy = _retry_policy(ex_retry)
+        self.circuit_breaker = _circuit_breaker(ex_circuit_breaker)
+        self.metrics = _request_metrics(ex_metrics)
+        # ex_coalesce_requests=True - общий для токена SingleFlight
+        self.coalescer = _single_flight(key, ex_coalesce_requests, self.coalescerCls)
+        # Кеш зон по id, выключен по умолчанию; get_zone по имени домена находит id через _zone_ids
+        self.zone_cache: Optional[TTLCache] = None
+        self._zone_ids: Dict[str, str] = {}
+        if ex_zone_cache_ttl:
+            self.zone_cache = TTLCache(ex_zone_cache_ttl, ex_zone_cache_size)
+        # Индекс записей по id зоны, выключен по умолчанию
+        self.record_index: Optional[TTLCache] = None
+        if ex_record_index_ttl:
+            self.record_index = TTLCache(ex_record_index_ttl, ex_record_index_size)
+        super().__init__(key, *args, **kwargs)
+
+    def _ex_connection_class_kwargs(self):
+        return {
+            "pool": self.connection_pool,
+            "retry": self.retry_policy,
+            "breaker": self.circuit_breaker,
+            "metrics": self.metrics,
+            "coalescer": self.coalescer,
+        }
+
+    def ex_invalidate_zone_cache(self, zone: Optional[Zone] = None) -> None:
+        if self.zone_cache is None:
+            return
+        if zone is None:
+            self.zone_cache.invalidate()
+            self._zone_ids.clear()
+        else:
+            self._evict_zone(zone)
+
+    def ex_zone_cache_stats(self) -> dict:
+        if self.zone_cache is None:
+            return {}
+        return self.zone_cache.stats()
+
+    def _cached_zone(self, domain_id) -> Optional[Zone]:
+        # get_zone принимает и id зоны, и имя домена
+        if self.zone_cache is None:
+            return None
+        key = str(domain_id)
+        zone = self.zone_cache.get(self._zone_ids.get(key, key))
+        return None if zone is None else _copy_zone(zone)
+
+    def _cache_zone(self, zone: Zone) -> Zone:
+        if self.zone_cache is not None:
+            self.zone_cache.set(str(zone.id), _copy_zone(zone))
+            self._zone_ids[zone.domain] = str(zone.id)
+        return zone
+
+    def _evict_zone(self, zone: Zone) -> None:
+        if self.zone_cache is not None:
+            self.zone_cache.invalidate(str(zone.id))
+            self._zone_ids.pop(zone.domain, None)
+
+    def ex_invalidate_record_index(self, zone: Optional[Zone] = None) -> None:
+        if self.record_index is None:
+            return
+        self.record_index.invalidate(None if zone is None else str(zone.id))
+
+    def ex_record_index_stats(self) -> dict:
+        if self.record_index is None:
+            return {}
+        return self.record_index.stats()
+
+    def _indexed_records(self, zone: Zone, max_staleness: Optional[float] = None) -> Optional[ZoneRecords]:
+        if self.record_index is None:
+            return None
+        entry = self.record_index.get(str(zone.id))
+        if entry is not None and max_staleness is not None and entry.age > max_staleness:
+            return None
+        return entry
+
+    def _index_records(self, zone: Zone, records: List[Record]) -> None:
+        if self.record_index is not None:
+            self.record_index.set(str(zone.id), ZoneRecords(records))
+
+    def _index_record(self, record: Record) -> None:
+        # индекс обновляется, только если записи зоны уже загружены
+        if self.record_index is None:
+            return
+        entry = self.record_index.get(str(record.zone.id), count=False)
+        if entry is not None:
+            entry.add(record)
+
+    def _unindex_record(self, record: Record) -> None:
+        if self.record_index is None:
+            return
+        entry = self.record_index.get(str(record.zone.id), count=False)
+        if entry is not None:
+            entry.discard(record.id)
+
+    def _to_zone(self, result: dict) -> Zone:
+        zone_id = result.pop("id")
+        name = result.pop("name")
+        extra = result
+
+        return Zone(
+            id=zone_id,
+            domain=name,
+            type="master",
+            ttl=None,
+            driver=self,
+            extra=extra,
+        )
+
+    def _to_record(self, result: dict, zone: Zone) -> Record:
+        result_id = str(result.pop("id"))
+        name = result.pop("name")
+        result_type = result.pop("type")
+        data = result.pop("content")
+        ttl = result.pop("ttl", None)
+        extra = result
+
+        return Record(
+            id=result_id,
+            name=name,
+            type=result_type,
+            data=data,
+            zone=zone,
+            driver=self,
+            ttl=ttl,
+            extra=extra,
+        )
+
+    def _update_record_payload(
+        self,
+        record: Record,
+        name: Optional[str],
+        type: Optional[RecordType],
+        data: Optional[str],
+    ) -> dict:
+        payload = {}
+        payload["name"] = record.name if name is None else name
+        payload["type"] = record.type if type is None else type
+        payload["content"] = record.data if data is None else data
+        return payload
+
+    def _update_zone_payload(self, type: Optional[str], extra: Optional[dict]) -> dict:
+        # INFO: TTL и domain нельзя обновить
+        # TODO: Сделать warning на TTL и domain
+        payload = {}
+        if extra:
+            payload.update(extra)
+        if type is not None:
+            payload["type"] = type
+        return payload
+
+    def _zone_error(self, e: ProviderError, zone_id: str) -> Exception:
+        if e.value == "domain_not_found":
+            return ZoneDoesNotExistError(e.value, self, zone_id)
+        if e.value == "tag_not_found":
+            return ZoneError(e.value, self, zone_id)
+        return e
+
+    def _record_error(self, e: ProviderError, record: Optional[Record] = None, zone: Optional[Zone] = None) -> Exception:
+        # при создании записи ещё нет, есть только зона
+        zone = record.zone if record is not None else zone
+        record_id = record.id if record is not None else None
+        if e.value == "domain_not_found":
+            return ZoneDoesNotExistError(e.value, self, zone.id if zone is not None else None)
+        if e.value == "record_not_found":
+            return RecordDoesNotExistError(e.value, self, record_id)
+        if e.value == "record_already_exists":
+            return RecordAlreadyExistsError(e.value, self, record_id)
+        if e.value in (
+            "cname_record_conflict",
+            "record_does_not_belong_to_domain",
+            "cant_add_soa",
+            "string_required",
+            "bad_zone_name",
+            "bad_record_name",
+            "zone_name_too_long",
+        ):
+            return RecordError(e.value, self, record_id)
+        return e
+
+
+class VscaleDns(BaseVscaleDns):
+    connectionCls = VscaleConnection
+
+    def get_zone(self, domain_id: str) -> Zone:
+        zone = self._cached_zone(domain_id)
+        if zone is not None:
+            return zone
+
+        response = self.connection.request(f"v1/domains/{domain_id}")
+        return self._cache_zone(self._to_zone(response.object))
+
+    def list_zones(self):
+        response = self.connection.request("v1/domains/")
+        # API отдаёт в списке те же поля, что и для одной зоны, поэтому список заполняет кеш get_zone
+        return [self._cache_zone(self._to_zone(n)) for n in response.object]
+
+    def create_zone(self, domain, type="master", ttl=None, extra=None) -> Zone:
+        payload = {"name": domain}
+        data = codec.dumps(payload)
+        headers = {"Content-Type": "application/json"}
+        response = self.connection.request(
+            "v1/domains/",
+            data=data,
+            headers=headers,
+            method="POST",
+        )
+        return self._cache_zone(self._to_zone(response.object))
+
+    def delete_zone(self, zone) -> bool:
+        try:
+            response = self.connection.request(f"v1/domains/{zone.id}", method="DELETE")
+        except ProviderError as e:
+            if e.value == "domain_not_found":
+                self._evict_zone(zone)
+                self.ex_invalidate_record_index(zone)
+                raise ZoneDoesNotExistError(e.value, self, zone.id)
+            raise
+
+        self._evict_zone(zone)
+        self.ex_invalidate_record_index(zone)
+        return response.status == httplib.NO_CONTENT
+
+    def list_records(self, zone: Zone) -> List[Record]:
+        response = self.connection.request(f"v1/domains/{zone.id}/records/")
+        records = [self._to_record(r, zone) for r in response.object]
+        self._index_records(zone, records)
+        return records
+
+    def ex_find_records(
+        self,
+        zone: Zone,
+        name: Optional[str] = None,
+        type: Optional[RecordType] = None,
+        max_staleness: Optional[float] = None,
+    ) -> List[Record]:
+        """Ищет записи зоны по имени и типу.
+
+        С включённым индексом (``ex_record_index_ttl``) ответ берётся из памяти, если записи зоны
+        загружены не раньше чем ``max_staleness`` секунд назад, иначе записи перечитываются из API.
+        Без индекса каждый вызов читает записи из API.
+        """
+        entry = self._indexed_records(zone, max_staleness)
+        if entry is None:
+            records = self.list_records(zone)
+            entry = self._indexed_records(zone) or ZoneRecords(records)
+        return entry.find(name, type)
+
+    def get_record(self, zone_id: str, record_id: str):
+        response = self.connection.request(f"v1/domains/{zone_id}/records/{record_id}")
+        result = response.object
+
+        zone = self.get_zone(zone_id)
+
+        return self._to_record(result, zone)
+
+    def create_record(self, name, zone: Zone, type, data, extra=None):
+        payload = {
+            "id": zone.id,
+            "name": name,
+            "type": type,
+            "ttl": 604800,
+            "content": data,
+        }
+        if extra:
+            payload.update({k: extra[k] for k in ("ttl", "priority") if extra.get(k) is not None})
+        data = codec.dumps(payload)
+        headers = {"Content-Type": "application/json"}
+        url = f"v1/domains/{zone.id}/records/"
+        try:
+            response = self.connection.request(
+                url,
+                method="POST",
+                headers=headers,
+                data=data,
+            )
+        except ProviderError as e:
+            raise self._record_error(e, zone=zone)
+
+        record = self._to_record(response.object, zone)
+        self._index_record(record)
+        return record
+
+    def delete_record(self, record):
+        try:
+            response = self.connection.request(
+                f"v1/domains/{record.zone.id}/records/{record.id}",
+                method="DELETE",
+            )
+        except ProviderError as e:
+            if e.value == "record_not_found":
+                self._unindex_record(record)
+            raise self._record_error(e, record)
+        self._unindex_record(record)
+        return response.status == httplib.NO_CONTENT
+
+    def ex_create_records(
+        self, zone: Zone, records: Iterable, concurrency: int = 8, rate: Optional[float] = None
+    ) -> BulkResult:
+        """Создаёт записи пачкой: не больше ``concurrency`` запросов одновременно и ``rate`` запросов в секунду.
+
+        Записи - ``Record``, словари с ключами name/type/data/extra или кортежи (name, type, data[, extra]).
+        Ошибки отдельных записей переводятся в исключения libcloud, как в ``create_record``
+        (``RecordAlreadyExistsError``, ``RecordError`` и т.д.), и не прерывают остальные.
+        В ``item`` каждого результата - исходная запись, в ``result`` - созданный ``Record``.
+        """
+
+        def create(record) -> Record:
+            desired = to_desired_record(record)
+            return self.create_record(desired.name, zone, desired.type, desired.data, desired.extra)
+
+        return run_bulk(create, records, concurrency, rate)
+
+    def ex_delete_records(self, records: Iterable[Record], concurrency: int = 8, rate: Optional[float] = None) -> BulkResult:
+        """Удаляет записи пачкой с теми же ограничениями и обработкой ошибок, что и ``ex_create_records``"""
+        return run_bulk(self.delete_record, records, concurrency, rate)
+
+    def update_record(
+        self,
+        record,
+        name: Optional[str],
+        type: Optional[RecordType],
+        data: Optional[str],
+        extra=None,
+    ):
+        payload = self._update_record_payload(record, name, type, data)
+
+        url = f"v1/domains/{record.zone.id}/records/{record.id}"
+        headers = {"Content-Type": "application/json"}
+        body = codec.dumps(payload)
+        try:
+            response = self.connection.request(
+                url,
+                method="PUT",
+                headers=headers,
+                data=body,
+            )
+        except ProviderError as e:
+            if e.value == "record_not_found":
+                self._unindex_record(record)
+            raise self._record_error(e, record)
+
+        updated = self._to_record(response.object, record.zone)
+        self._unindex_record(record)
+        self._index_record(updated)
+        return updated
+
+    def update_zone(
+        self,
+        zone: Zone,
+        domain: Optional[str],
+        type: Optional[str] = "master",
+        ttl: Optional[int] = None,
+        extra: Optional[dict] = None,
+    ) -> Zone:
+        """Обновляет зону"""
+
+        payload = self._update_zone_payload(type, extra)
+
+        url = f"v1/domains/{zone.id}"
+        headers = {"Content-Type": "application/json"}
+        data = codec.dumps(payload)
+        try:
+            response = self.connection.request(
+                url,
+                method="PATCH",
+                headers=headers,
+                data=data,
+            )
+        except ProviderError as e:
+            if e.value == "domain_not_found":
+                self._evict_zone(zone)
+            raise self._zone_error(e, zone.id)
+
+        return self._cache_zone(self._to_zone(response.object))
+
+    def ex_plan_zone_sync(
+        self,
+        zone: Zone,
+        desired_records: Iterable,
+        ignore_types: Collection[str] = (RecordType.SOA,),
+    ) -> ZoneSyncPlan:
+        """Считает изменения для ``ex_sync_zone``, ничего не меняя в зоне"""
+        return plan_zone_sync(self.list_records(zone), desired_records, ignore_types)
+
+    def ex_sync_zone(
+        self,
+        zone: Zone,
+        desired_records: Iterable,
+        concurrency: int = 8,
+        ignore_types: Collection[str] = (RecordType.SOA,),
+        dry_run: bool = False,
+    ) -> ZoneSyncResult:
+        """Приводит записи зоны к ``desired_records``.
+
+        Желаемые записи - ``Record``, словари с ключами name/type/data/extra или кортежи (name, type, data[, extra]),
+        как в ``ex_create_records``. Записи сравниваются по (name, type, data), ``extra`` (ttl, priority)
+        передаётся только при создании. Выполняются только нужные изменения:
+        сначала создания и обновления, затем удаления, чтобы при сбое в зоне не пропадали нужные записи.
+        Каждая фаза выполняется параллельно в ``concurrency`` потоков.
+        Ошибки отдельных записей собираются в результат и не прерывают синхронизацию.
+        """
+        plan = self.ex_plan_zone_sync(zone, desired_records, ignore_types)
+        if dry_run:
+            return ZoneSyncResult(plan, BulkResult([], []), BulkResult([], []), BulkResult([], []))
+
+        created = run_bulk(
+            lambda record: self.create_record(record.name, zone, record.type, record.data, record.extra),
+            plan.create,
+            concurrency,
+        )
+        updated = run_bulk(
+            lambda change: self.update_record(change[0], name=change[1].name, type=change[1].type, data=change[1].data),
+            plan.update,
+            concurrency,
+        )
+        deleted = run_bulk(self.delete_record, plan.delete, concurrency)
+        return ZoneSyncResult(plan, created, updated, deleted)
+
+    def ex_export_zone_to_bind_stream(self, zone: Zone, fileobj: IO[str]) -> None:
+        """Пишет зону в формате BIND в ``fileobj`` по мере чтения записей из API, не загружая их все в память"""
+        fileobj.write(f"; Generated by libcloud-vscale on {datetime.datetime.utcnow():%Y-%m-%d %H:%M:%S} UTC\n")
+        fileobj.write(f"$ORIGIN {zone.domain}.\n")
+        if zone.ttl:
+            fileobj.write(f"$TTL {zone.ttl}\n")
+        fileobj.write("\n")
+        for result in self.connection.iter_objects(f"v1/domains/{zone.id}/records/"):
+            fileobj.write(format_bind_record(self._to_record(result, zone), zone.ttl) + "\n")
+
+    def export_zone_to_bind_format(self, zone: Zone) -> str:
+        output = io.StringIO()
+        self.ex_export_zone_to_bind_stream(zone, output)
+        return output.getvalue()
+
+    def export_zone_to_bind_zone_file(self, zone: Zone, file_path: str) -> None:
+        with open(file_path, "w") as fp:
+            self.ex_export_zone_to_bind_stream(zone, fp)
+
+    def ex_import_zone_from_bind(
+        self,
+        zone: Zone,
+        fileobj: Iterable[str],
+        concurrency: int = 8,
+        ignore_types: Collection[str] = (RecordType.SOA,),
+    ) -> BindImportResult:
+        """Создаёт записи из файла зоны в формате BIND.
+
+        Файл разбирается построчно, записи создаются параллельно в ``concurrency`` потоков,
+        поэтому в памяти одновременно держится не больше ``concurrency`` записей.
+        Ошибки отдельных записей собираются в результат и не прерывают импорт.
+        """
+        ignore_types = {str(t) for t in ignore_types}
+        records = (r for r in iter_bind_records(fileobj, zone.domain, zone.ttl) if r.type not in ignore_types)
+
+        created = 0
+        failed = []
+        for outcome in iter_bulk(
+            lambda r: self.create_record(r.name, zone, r.type, r.data, extra={"ttl": r.ttl, "priority": r.priority}),
+            records,
+            concurrency,
+        ):
+            if outcome.ok:
+                created += 1
+            else:
+                failed.append(outcome)
+        return BindImportResult(created, failed)
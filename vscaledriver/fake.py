@@ -0,0 +1,577 @@
+"""Локальный API Vscale с состоянием для нагрузочных и офлайн тестов.
+
+Поддерживает те эндпоинты ``v1/scalets``, ``v1/sshkeys``, ``v1/rplans``, ``v1/images``,
+``v1/locations`` и ``v1/domains``, которые используют драйверы, и отвечает теми же строками
+ошибок, что и настоящий API (``domain_not_found``, ``record_already_exists`` и т.п.)::
+
+    with FakeVscaleApi(latency=0.01, rate_limit=(100, 1.0)) as api:
+        driver = VscaleDriver("token", **api.driver_kwargs())
+        dns = VscaleDns("token", **api.driver_kwargs())
+"""
+import datetime
+import itertools
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+DEFAULT_LOCATIONS = ("spb0", "msk0")
+DEFAULT_RPLANS = {
+    "small": (1, 512, 20480),
+    "medium": (1, 1024, 30720),
+    "large": (2, 2048, 40960),
+}
+DEFAULT_IMAGES = ("ubuntu_20.04_64_001_master", "debian_10_64_001_master", "centos_7_64_001_master")
+RECORD_TYPES = ("A", "AAAA", "CNAME", "MX", "NS", "SRV", "TXT", "SPF")
+
+
+class FakeApiError(Exception):
+    def __init__(self, status: int, error: Union[str, dict], **fields):
+        super().__init__(error)
+        self.status = status
+        self.body = dict(fields, error=error)
+
+
+def _not_found(error: str, **fields) -> FakeApiError:
+    return FakeApiError(404, error, **fields)
+
+
+class FakeVscaleState:
+    """Состояние аккаунта: скалеты, ключи, домены и записи. Все методы потокобезопасны"""
+
+    def __init__(self, boot_time: float = 0.0):
+        # через сколько секунд созданный или запущенный скалет переходит в started
+        self.boot_time = boot_time
+        self.lock = threading.RLock()
+        self.locations = [
+            {"id": loc, "description": loc, "active": True, "private_networking": False, "rplans": list(DEFAULT_RPLANS)}
+            for loc in DEFAULT_LOCATIONS
+        ]
+        self.images = [
+            {"id": image, "description": image.capitalize(), "size": 2048, "locations": list(DEFAULT_LOCATIONS), "active": True}
+            for image in DEFAULT_IMAGES
+        ]
+        self.rplans = [
+            {
+                "id": plan,
+                "cpus": cpus,
+                "memory": memory,
+                "disk": disk,
+                "addresses": 1,
+                "network": 1024,
+                "locations": list(DEFAULT_LOCATIONS),
+            }
+            for plan, (cpus, memory, disk) in DEFAULT_RPLANS.items()
+        ]
+        self.scalets: Dict[int, dict] = {}
+        self.sshkeys: Dict[int, dict] = {}
+        self.domains: Dict[int, dict] = {}
+        self._domain_ids: Dict[str, int] = {}
+        self.records: Dict[int, Dict[int, dict]] = {}
+        # время, после которого скалет считается запущенным
+        self._boot_at: Dict[int, float] = {}
+        self._ids = itertools.count(100000)
+
+    # скалеты
+
+    def _scalet_view(self, scalet: dict) -> dict:
+        boot_at = self._boot_at.get(scalet["ctid"])
+        if boot_at is not None and time.monotonic() >= boot_at:
+            scalet["status"] = "started"
+            scalet["active"] = True
+            scalet["locked"] = False
+            del self._boot_at[scalet["ctid"]]
+        return dict(scalet)
+
+    def _get_scalet(self, ctid: int) -> dict:
+        scalet = self.scalets.get(ctid)
+        if scalet is None:
+            # настоящий API на несуществующий скалет отвечает 500
+            raise FakeApiError(500, {"code": "INTERNAL_SERVER_ERROR", "status": 500, "message": "Internal server error"})
+        return scalet
+
+    def list_scalets(self) -> List[dict]:
+        with self.lock:
+            return [self._scalet_view(s) for s in self.scalets.values()]
+
+    def get_scalet(self, ctid: int) -> dict:
+        with self.lock:
+            return self._scalet_view(self._get_scalet(ctid))
+
+    def add_scalet(
+        self,
+        name: str,
+        rplan: str = "small",
+        make_from: str = DEFAULT_IMAGES[0],
+        location: str = DEFAULT_LOCATIONS[0],
+        do_start: bool = True,
+        keys: Optional[List[int]] = None,
+    ) -> dict:
+        with self.lock:
+            if rplan not in DEFAULT_RPLANS:
+                # как в кассете compute_create_nodes: 404 без поля field
+                raise FakeApiError(404, "rplan_not_found")
+            if make_from not in DEFAULT_IMAGES:
+                raise FakeApiError(400, "template_not_found", field="make_from")
+            if location not in DEFAULT_LOCATIONS:
+                raise FakeApiError(400, "location_not_found", field="location")
+            # ключи передаются id ключей аккаунта
+            if not all(isinstance(k, int) and not isinstance(k, bool) and k in self.sshkeys for k in keys or ()):
+                raise FakeApiError(400, "key_not_found", field="keys")
+            ctid = next(self._ids)
+            octet = ctid % 250 + 2
+            self.scalets[ctid] = {
+                "ctid": ctid,
+                "name": name,
+                "status": "queued" if do_start else "stopped",
+                "location": location,
+                "rplan": rplan,
+                "keys": [{"id": k, "name": self.sshkeys[k]["name"]} for k in keys or ()],
+                "tags": [],
+                "public_address": {
+                    "netmask": "255.255.255.0",
+                    "gateway": "10.0.0.1",
+                    "address": f"10.0.{ctid // 250 % 250}.{octet}",
+                },
+                "private_address": {},
+                "made_from": make_from,
+                "hostname": f"cs{ctid}.vscale.io",
+                "created": datetime.datetime.now().strftime("%d.%m.%Y %H:%M:%S"),
+                "active": False,
+                "locked": True,
+                "deleted": None,
+                "block_reason": None,
+                "block_reason_custom": None,
+                "date_block": None,
+            }
+            if do_start:
+                self._boot_at[ctid] = time.monotonic() + self.boot_time
+            return self._scalet_view(self.scalets[ctid])
+
+    def scalet_action(self, ctid: int, action: str) -> dict:
+        with self.lock:
+            scalet = self._get_scalet(ctid)
+            if action == "stop":
+                self._boot_at.pop(ctid, None)
+                scalet["status"] = "stopped"
+                scalet["active"] = False
+            else:
+                scalet["status"] = "queued"
+                self._boot_at[ctid] = time.monotonic() + self.boot_time
+            return self._scalet_view(scalet)
+
+    def delete_scalet(self, ctid: int) -> dict:
+        with self.lock:
+            scalet = self._get_scalet(ctid)
+            del self.scalets[ctid]
+            self._boot_at.pop(ctid, None)
+            return dict(scalet, status="deleted", deleted=datetime.datetime.now().strftime("%d.%m.%Y %H:%M:%S"))
+
+    # ssh ключи
+
+    def add_sshkey(self, name: str, key: str) -> dict:
+        if not name or not key:
+            raise FakeApiError(400, "string_required", field="name" if not name else "key")
+        with self.lock:
+            key_id = next(self._ids)
+            self.sshkeys[key_id] = {"id": key_id, "name": name, "key": key}
+            return dict(self.sshkeys[key_id])
+
+    def delete_sshkey(self, key_id: int) -> None:
+        with self.lock:
+            if self.sshkeys.pop(key_id, None) is None:
+                raise _not_found("sshkey_not_found", field="key_id")
+
+    # домены
+
+    def _get_domain(self, domain: str) -> dict:
+        if domain.isdigit():
+            found = self.domains.get(int(domain))
+        else:
+            domain_id = self._domain_ids.get(domain)
+            found = self.domains.get(domain_id) if domain_id is not None else None
+        if found is None:
+            raise _not_found("domain_not_found")
+        return found
+
+    def get_domain(self, domain: str) -> dict:
+        with self.lock:
+            return dict(self._get_domain(domain))
+
+    def add_domain(self, name: str) -> dict:
+        name = (name or "").rstrip(".").lower()
+        if not name:
+            raise FakeApiError(400, "string_required", field="name")
+        if "." not in name or len(name) > 253:
+            raise FakeApiError(400, "bad_zone_name" if len(name) <= 253 else "zone_name_too_long", field="name")
+        with self.lock:
+            if name in self._domain_ids:
+                raise FakeApiError(409, "domain_already_exists")
+            now = int(time.time())
+            domain_id = next(self._ids)
+            self.domains[domain_id] = {
+                "id": domain_id,
+                "name": name,
+                "tags": [],
+                "user_id": 1,
+                "create_date": now,
+                "change_date": now,
+            }
+            self._domain_ids[name] = domain_id
+            self.records[domain_id] = {}
+            # как и настоящий API, создаём NS и SOA записи
+            for content in ("ns1.vscale.io", "ns2.vscale.io"):
+                self._add_record(domain_id, {"name": name, "type": "NS", "ttl": 86400, "content": content})
+            soa = f"ns1.vscale.io. hello.vscale.io. {now} 10800 3600 604800 86400"
+            self._add_record(domain_id, {"name": name, "type": "SOA", "ttl": 300, "content": soa, "email": "hello@vscale.io"})
+            return dict(self.domains[domain_id])
+
+    def update_domain(self, domain: str, payload: dict) -> dict:
+        with self.lock:
+            found = self._get_domain(domain)
+            if "tags" in payload:
+                found["tags"] = list(payload["tags"])
+            found["change_date"] = int(time.time())
+            return dict(found)
+
+    def delete_domain(self, domain: str) -> None:
+        with self.lock:
+            found = self._get_domain(domain)
+            del self.domains[found["id"]]
+            del self._domain_ids[found["name"]]
+            del self.records[found["id"]]
+
+    # записи
+
+    def list_records(self, domain: str) -> List[dict]:
+        with self.lock:
+            return [dict(r) for r in self.records[self._get_domain(domain)["id"]].values()]
+
+    def get_record(self, domain: str, record_id: int) -> dict:
+        with self.lock:
+            return dict(self._get_record(domain, record_id))
+
+    def _get_record(self, domain: str, record_id: int) -> dict:
+        record = self.records[self._get_domain(domain)["id"]].get(record_id)
+        if record is None:
+            raise _not_found("record_not_found", field="record_id")
+        return record
+
+    def _validate_record(self, domain_id: int, payload: dict, record_id: Optional[int] = None) -> dict:
+        zone = self.domains[domain_id]["name"]
+        for field in ("name", "type", "content"):
+            if not isinstance(payload.get(field), str) or not payload[field]:
+                raise FakeApiError(400, "string_required", field=field)
+        name = payload["name"].rstrip(".").lower()
+        record_type = payload["type"].upper()
+        if record_type == "SOA":
+            raise FakeApiError(400, "cant_add_soa", field="type")
+        if record_type not in RECORD_TYPES:
+            raise FakeApiError(400, "bad_record_type", field="type")
+        if len(name) > 253:
+            raise FakeApiError(400, "zone_name_too_long", field="name")
+        if name != zone and not name.endswith("." + zone):
+            raise FakeApiError(400, "bad_record_name", field="name")
+
+        for other in self.records[domain_id].values():
+            if other["id"] == record_id or other["name"] != name:
+                continue
+            if other["type"] == record_type and other["content"] == payload["content"]:
+                raise FakeApiError(409, "record_already_exists")
+            if "CNAME" in (record_type, other["type"]) and other["type"] != "SOA":
+                raise FakeApiError(409, "cname_record_conflict")
+
+        record = {"name": name, "type": record_type, "ttl": int(payload.get("ttl") or 86400), "content": payload["content"]}
+        if "priority" in payload:
+            record["priority"] = int(payload["priority"])
+        return record
+
+    def _add_record(self, domain_id: int, record: dict) -> dict:
+        record_id = next(self._ids)
+        self.records[domain_id][record_id] = dict(record, id=record_id)
+        return self.records[domain_id][record_id]
+
+    def add_record(self, domain: str, payload: dict) -> dict:
+        with self.lock:
+            domain_id = self._get_domain(domain)["id"]
+            return dict(self._add_record(domain_id, self._validate_record(domain_id, payload)))
+
+    def update_record(self, domain: str, record_id: int, payload: dict) -> dict:
+        with self.lock:
+            record = self._get_record(domain, record_id)
+            if record["type"] == "SOA":
+                raise FakeApiError(400, "cant_add_soa", field="type")
+            domain_id = self._get_domain(domain)["id"]
+            record.update(self._validate_record(domain_id, dict(record, **payload), record_id))
+            return dict(record)
+
+    def delete_record(self, domain: str, record_id: int) -> None:
+        with self.lock:
+            record = self._get_record(domain, record_id)
+            del self.records[self._get_domain(domain)["id"]][record["id"]]
+
+
+class _RateLimiter:
+    """Token bucket: ``requests`` запросов за ``period`` секунд"""
+
+    def __init__(self, requests: int, period: float):
+        self.rate = requests / period
+        self.capacity = requests
+        self.tokens = float(requests)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> Optional[float]:
+        """None если запрос можно выполнить, иначе через сколько секунд появится токен"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return None
+            return (1 - self.tokens) / self.rate
+
+
+_ROUTES: List[Tuple[str, re.Pattern, str]] = []
+
+
+def _route(method: str, pattern: str):
+    def register(func):
+        _ROUTES.append((method, re.compile(f"^/{pattern}$"), func.__name__))
+        return func
+
+    return register
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "_FakeServer"
+
+    def _dispatch(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        api = self.server.api
+        api._count_request()
+
+        latency = api.latency() if callable(api.latency) else api.latency
+        if latency:
+            time.sleep(latency)
+
+        try:
+            if api.token is not None and self.headers.get("X-Token") != api.token:
+                raise FakeApiError(403, "invalid_token")
+            if api.rate_limiter is not None:
+                retry_after = api.rate_limiter.acquire()
+                if retry_after is not None:
+                    api._count_rate_limited()
+                    self._send(429, {"error": "too_many_requests"}, {"Retry-After": str(math.ceil(retry_after))})
+                    return
+            try:
+                payload = json.loads(raw) if raw else {}
+            except ValueError:
+                raise FakeApiError(400, "bad_json")
+
+            path = self.path.split("?", 1)[0]
+            for method, pattern, name in _ROUTES:
+                match = pattern.match(path)
+                if match and method == self.command:
+                    status, body = getattr(self, name)(payload, *match.groups())
+                    break
+            else:
+                raise _not_found("not_found")
+        except FakeApiError as e:
+            status, body = e.status, e.body
+        self._send(status, body)
+
+    def _send(self, status: int, body, headers: Optional[Dict[str, str]] = None):
+        data = b"" if body is None else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def state(self) -> FakeVscaleState:
+        return self.server.api.state
+
+    @_route("GET", "v1/locations")
+    def locations(self, payload):
+        return 200, self.state.locations
+
+    @_route("GET", "v1/images")
+    def images(self, payload):
+        return 200, self.state.images
+
+    @_route("GET", "v1/rplans")
+    def rplans(self, payload):
+        return 200, self.state.rplans
+
+    @_route("GET", "v1/sshkeys")
+    def list_sshkeys(self, payload):
+        with self.state.lock:
+            return 200, [dict(k) for k in self.state.sshkeys.values()]
+
+    @_route("POST", "v1/sshkeys")
+    def create_sshkey(self, payload):
+        return 201, self.state.add_sshkey(payload.get("name"), payload.get("key"))
+
+    @_route("DELETE", r"v1/sshkeys/(\d+)")
+    def delete_sshkey(self, payload, key_id):
+        self.state.delete_sshkey(int(key_id))
+        return 204, None
+
+    @_route("GET", "v1/scalets")
+    def list_scalets(self, payload):
+        return 200, self.state.list_scalets()
+
+    @_route("POST", "v1/scalets")
+    def create_scalet(self, payload):
+        scalet = self.state.add_scalet(
+            payload.get("name") or "Scalet",
+            rplan=payload.get("rplan", "small"),
+            make_from=payload.get("make_from", DEFAULT_IMAGES[0]),
+            location=payload.get("location", DEFAULT_LOCATIONS[0]),
+            do_start=payload.get("do_start", True),
+            keys=payload.get("keys"),
+        )
+        return 200, scalet
+
+    @_route("GET", r"v1/scalets/(\d+)")
+    def get_scalet(self, payload, ctid):
+        return 200, self.state.get_scalet(int(ctid))
+
+    @_route("DELETE", r"v1/scalets/(\d+)")
+    def delete_scalet(self, payload, ctid):
+        return 200, self.state.delete_scalet(int(ctid))
+
+    @_route("POST", r"v1/scalets/(\d+)/(start|stop|restart)")
+    @_route("PATCH", r"v1/scalets/(\d+)/(start|stop|restart)")
+    def scalet_action(self, payload, ctid, action):
+        return 200, self.state.scalet_action(int(ctid), action)
+
+    @_route("GET", "v1/domains/")
+    def list_domains(self, payload):
+        with self.state.lock:
+            return 200, [dict(d) for d in self.state.domains.values()]
+
+    @_route("POST", "v1/domains/")
+    def create_domain(self, payload):
+        return 200, self.state.add_domain(payload.get("name"))
+
+    @_route("GET", r"v1/domains/([^/]+)")
+    def get_domain(self, payload, domain):
+        return 200, self.state.get_domain(domain)
+
+    @_route("PATCH", r"v1/domains/([^/]+)")
+    def update_domain(self, payload, domain):
+        return 200, self.state.update_domain(domain, payload)
+
+    @_route("DELETE", r"v1/domains/([^/]+)")
+    def delete_domain(self, payload, domain):
+        self.state.delete_domain(domain)
+        return 204, None
+
+    @_route("GET", r"v1/domains/([^/]+)/records/")
+    def list_records(self, payload, domain):
+        return 200, self.state.list_records(domain)
+
+    @_route("POST", r"v1/domains/([^/]+)/records/")
+    def create_record(self, payload, domain):
+        return 200, self.state.add_record(domain, payload)
+
+    @_route("GET", r"v1/domains/([^/]+)/records/(\d+)")
+    def get_record(self, payload, domain, record_id):
+        return 200, self.state.get_record(domain, int(record_id))
+
+    @_route("PUT", r"v1/domains/([^/]+)/records/(\d+)")
+    def update_record(self, payload, domain, record_id):
+        return 200, self.state.update_record(domain, int(record_id), payload)
+
+    @_route("DELETE", r"v1/domains/([^/]+)/records/(\d+)")
+    def delete_record(self, payload, domain, record_id):
+        self.state.delete_record(domain, int(record_id))
+        return 204, None
+
+
+class _FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    api: "FakeVscaleApi"
+
+
+class FakeVscaleApi:
+    """HTTP сервер в отдельном потоке, отвечающий как API Vscale.
+
+    ``latency`` - задержка каждого ответа в секундах или функция, которая её возвращает.
+    ``rate_limit`` - (запросов, секунд): сверх лимита сервер отвечает 429 с ``Retry-After``.
+    ``token`` - если задан, запросы с другим ``X-Token`` получают 403.
+    ``boot_time`` - через сколько секунд созданный или запущенный скалет становится started.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: Union[float, Callable[[], float]] = 0.0,
+        rate_limit: Optional[Tuple[int, float]] = None,
+        token: Optional[str] = None,
+        boot_time: float = 0.0,
+    ):
+        self.state = FakeVscaleState(boot_time=boot_time)
+        self.latency = latency
+        self.rate_limiter = _RateLimiter(*rate_limit) if rate_limit else None
+        self.token = token
+        self.requests = 0
+        self.rate_limited = 0
+        self._counter_lock = threading.Lock()
+        self._server = _FakeServer((host, port), _FakeHandler)
+        self._server.api = self
+        self._thread: Optional[threading.Thread] = None
+
+    def _count_request(self) -> None:
+        with self._counter_lock:
+            self.requests += 1
+
+    def _count_rate_limited(self) -> None:
+        with self._counter_lock:
+            self.rate_limited += 1
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def driver_kwargs(self) -> dict:
+        """Аргументы для ``VscaleDriver``/``VscaleDns``, направляющие запросы на этот сервер"""
+        host, port = self.address
+        return {"secure": False, "host": host, "port": port}
+
+    def start(self) -> "FakeVscaleApi":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="fake-vscale-api", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeVscaleApi":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
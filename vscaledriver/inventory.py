@@ -0,0 +1,64 @@
+import json
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+
+def node_fingerprint(n: dict) -> int:
+    """CRC32 канонического JSON скалета: меняется при изменении любого поля ответа API"""
+    return zlib.crc32(json.dumps(n, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+class NodeSnapshot:
+    """Снимок инвентаря: по одному отпечатку на скалет.
+
+    Хранит только ``ctid -> crc32``, поэтому занимает несколько десятков байт на скалет
+    независимо от размера ответа API. Передаётся в ``ex_list_node_changes(since=...)``.
+    """
+
+    __slots__ = ("fingerprints", "taken_at")
+
+    def __init__(self, fingerprints: Dict[str, int], taken_at: Optional[float] = None):
+        self.fingerprints = fingerprints
+        self.taken_at = time.time() if taken_at is None else taken_at
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    def __contains__(self, node_id) -> bool:
+        return str(node_id) in self.fingerprints
+
+    def __repr__(self) -> str:
+        return f"<NodeSnapshot: nodes={len(self)}, taken_at={self.taken_at}>"
+
+
+class NodeChanges(NamedTuple):
+    added: List[Any]
+    modified: List[Any]
+    # удалённых скалетов в ответе API уже нет, поэтому только их id
+    removed: List[str]
+    snapshot: NodeSnapshot
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+
+def diff_nodes(objects: Iterable[dict], since: Optional[NodeSnapshot], to_node: Callable[[dict], Any]) -> NodeChanges:
+    """Сравнивает скалеты из ответа API со снимком ``since``.
+
+    ``to_node`` вызывается только для добавленных и изменённых скалетов. Без ``since``
+    все скалеты считаются добавленными.
+    """
+    previous = since.fingerprints if since is not None else {}
+    current: Dict[str, int] = {}
+    added, modified = [], []
+    for n in objects:
+        node_id = str(n["ctid"])
+        fingerprint = current[node_id] = node_fingerprint(n)
+        old = previous.get(node_id)
+        if old is None:
+            added.append(to_node(n))
+        elif old != fingerprint:
+            modified.append(to_node(n))
+    removed = [node_id for node_id in previous if node_id not in current]
+    return NodeChanges(added, modified, removed, NodeSnapshot(current))
@@ -0,0 +1,58 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_array(chunks: Iterable[bytes], decoder: json.JSONDecoder = json.JSONDecoder()) -> Iterator[Any]:
+    """Разбирает JSON массив из потока байтов и отдаёт элементы по одному.
+
+    В памяти держится только текущий, ещё не разобранный элемент, поэтому большие
+    ответы API обрабатываются за постоянную память.
+    """
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = False
+    eof = False
+    chunks = iter(chunks)
+
+    while True:
+        # пропускаем пробелы и разделители между элементами
+        while pos < len(buffer) and (buffer[pos] in _WHITESPACE or (started and buffer[pos] == ",")):
+            pos += 1
+
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("JSON array expected")
+                started = True
+                pos += 1
+                continue
+
+            if buffer[pos] == "]":
+                return
+
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # число в конце буфера может быть недочитанным
+                if end < len(buffer) or eof or isinstance(item, (dict, list, str)):
+                    pos = end
+                    yield item
+                    continue
+        elif eof:
+            raise ValueError("Unexpected end of JSON array")
+
+        chunk = next(chunks, None)
+        buffer = buffer[pos:]
+        pos = 0
+        if chunk is None:
+            eof = True
+            buffer += utf8.decode(b"", final=True)
+        else:
+            buffer += utf8.decode(chunk)
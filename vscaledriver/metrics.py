@@ -0,0 +1,157 @@
+import bisect
+import logging
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from libcloud.common.base import RawResponse
+from libcloud.common.types import ProviderError
+
+from vscaledriver.retry import error_status
+
+logger = logging.getLogger(__name__)
+
+# верхние границы корзин гистограммы задержек, секунды
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestSample(NamedTuple):
+    """Один запрос к API, передаётся экспортерам"""
+
+    method: str
+    route: str
+    status: Optional[int]
+    duration: float
+    bytes_sent: int
+    bytes_received: int
+    error: Optional[str]
+
+
+def error_label(error: Exception) -> str:
+    """Строка ошибки Vscale (``domain_not_found``) или имя класса исключения"""
+    if isinstance(error, ProviderError) and isinstance(error.value, str):
+        return error.value
+    return type(error).__name__
+
+
+def payload_size(data) -> int:
+    if not data:
+        return 0
+    return len(data.encode("utf-8")) if isinstance(data, str) else len(data)
+
+
+def response_size(response) -> int:
+    """Размер тела ответа; потоковые ответы не читаются, берётся Content-Length"""
+    length = (response.headers or {}).get("content-length")
+    if length is not None:
+        return int(length)
+    if isinstance(response, RawResponse):
+        return 0
+    return payload_size(response.body)
+
+
+class _RouteMetrics:
+    __slots__ = ("count", "errors", "bytes_sent", "bytes_received", "latency_sum", "buckets", "statuses", "error_labels")
+
+    def __init__(self, bucket_count: int):
+        self.count = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency_sum = 0.0
+        # последняя корзина - больше самой большой границы
+        self.buckets = [0] * (bucket_count + 1)
+        self.statuses: Dict[int, int] = {}
+        self.error_labels: Dict[str, int] = {}
+
+
+class RequestMetrics:
+    """Метрики запросов по маршрутам API: количество, байты, ошибки и гистограммы задержек.
+
+    Маршрут - метод и шаблон пути, например ``GET v1/domains/{id}/records/``. Каждый запрос
+    (в том числе каждая повторная попытка) дополнительно передаётся в ``exporters``; ошибки
+    экспортеров логируются и не влияют на сам запрос.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, exporters: Sequence[Callable[[RequestSample], None]] = ()):
+        self.bucket_bounds = tuple(sorted(buckets))
+        self.exporters: List[Callable[[RequestSample], None]] = list(exporters)
+        self._routes: Dict[str, _RouteMetrics] = {}
+        self._lock = threading.Lock()
+
+    def add_exporter(self, exporter: Callable[[RequestSample], None]) -> None:
+        self.exporters.append(exporter)
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        duration: float,
+        status: Optional[int] = None,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+        error: Optional[Exception] = None,
+    ) -> None:
+        if error is not None and status is None:
+            status = error_status(error)
+        label = error_label(error) if error is not None else None
+        key = f"{method.upper()} {route}"
+        with self._lock:
+            metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = _RouteMetrics(len(self.bucket_bounds))
+            metrics.count += 1
+            metrics.bytes_sent += bytes_sent
+            metrics.bytes_received += bytes_received
+            metrics.latency_sum += duration
+            metrics.buckets[bisect.bisect_left(self.bucket_bounds, duration)] += 1
+            if status is not None:
+                metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            if label is not None:
+                metrics.errors += 1
+                metrics.error_labels[label] = metrics.error_labels.get(label, 0) + 1
+
+        if self.exporters:
+            sample = RequestSample(method.upper(), route, status, duration, bytes_sent, bytes_received, label)
+            for exporter in self.exporters:
+                try:
+                    exporter(sample)
+                except Exception:
+                    logger.exception("Request metrics exporter %r failed", exporter)
+
+    def _quantile(self, buckets: List[int], count: int, q: float) -> Optional[float]:
+        # верхняя граница корзины, в которую попадает квантиль
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for bound, bucket in zip(self.bucket_bounds + (float("inf"),), buckets):
+            seen += bucket
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Копия накопленных метрик по маршрутам"""
+        with self._lock:
+            return {
+                key: {
+                    "count": m.count,
+                    "errors": m.errors,
+                    "bytes_sent": m.bytes_sent,
+                    "bytes_received": m.bytes_received,
+                    "statuses": dict(m.statuses),
+                    "error_labels": dict(m.error_labels),
+                    "latency": {
+                        "sum": m.latency_sum,
+                        "buckets": dict(zip(self.bucket_bounds + (float("inf"),), m.buckets)),
+                        "p50": self._quantile(m.buckets, m.count, 0.5),
+                        "p90": self._quantile(m.buckets, m.count, 0.9),
+                        "p99": self._quantile(m.buckets, m.count, 0.99),
+                    },
+                }
+                for key, m in self._routes.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
@@ -0,0 +1,95 @@
+import threading
+import time
+from typing import Dict, Optional
+
+import requests  # type: ignore[import]
+from requests.adapters import HTTPAdapter  # type: ignore[import]
+
+
+class VscaleConnectionPool:
+    """Общий пул keep-alive соединений для драйверов с одним токеном.
+
+    Внутри один ``requests.adapters.HTTPAdapter``, который монтируется в сессии всех
+    подключённых драйверов, поэтому compute и DNS драйверы в любых потоках переиспользуют
+    одни и те же TLS соединения.
+
+    ``pool_size`` - сколько keep-alive соединений держать на хост. Если задан
+    ``max_connections_per_host``, это жёсткий лимит: лишние запросы ждут свободное соединение.
+    Соединения пула, простаивавшего дольше ``idle_timeout`` секунд, закрываются перед
+    следующим запросом, чтобы не нарваться на закрытые сервером сокеты.
+    """
+
+    _registry: Dict[str, "VscaleConnectionPool"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        max_connections_per_host: Optional[int] = None,
+        idle_timeout: Optional[float] = 60,
+    ):
+        self.pool_size = pool_size
+        self.max_connections_per_host = max_connections_per_host
+        self.idle_timeout = idle_timeout
+        self.adapter = HTTPAdapter(
+            pool_maxsize=max_connections_per_host or pool_size,
+            pool_block=max_connections_per_host is not None,
+        )
+        self.idle_resets = 0
+        # счётчики пулов urllib3, закрытых по простою
+        self._closed = {"connections": 0, "requests": 0}
+        self._last_used = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_key(cls, key: str, **kwargs) -> "VscaleConnectionPool":
+        """Возвращает общий для токена пул, при первом вызове создаёт его с параметрами ``kwargs``"""
+        with cls._registry_lock:
+            pool = cls._registry.get(key)
+            if pool is None:
+                pool = cls._registry[key] = cls(**kwargs)
+            return pool
+
+    def mount(self, session: requests.Session) -> None:
+        session.mount("https://", self.adapter)
+        session.mount("http://", self.adapter)
+
+    def acquire(self) -> None:
+        """Отмечает начало запроса, закрывает простаивавшие соединения"""
+        with self._lock:
+            now = time.monotonic()
+            if self.idle_timeout is not None and now - self._last_used > self.idle_timeout:
+                counters = self._pool_counters()
+                self._closed["connections"] += counters["connections"]
+                self._closed["requests"] += counters["requests"]
+                self.adapter.poolmanager.clear()
+                self.idle_resets += 1
+            self._last_used = now
+
+    def close(self) -> None:
+        self.adapter.close()
+
+    def _pool_counters(self) -> Dict[str, int]:
+        pools = self.adapter.poolmanager.pools
+        counters = {"hosts": 0, "connections": 0, "requests": 0}
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            counters["hosts"] += 1
+            counters["connections"] += pool.num_connections
+            counters["requests"] += pool.num_requests
+        return counters
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counters = self._pool_counters()
+            connections = counters["connections"] + self._closed["connections"]
+            requests_count = counters["requests"] + self._closed["requests"]
+            return {
+                "hosts": counters["hosts"],
+                "connections": connections,
+                "requests": requests_count,
+                "reused": requests_count - connections,
+                "idle_resets": self.idle_resets,
+            }
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from libcloud.dns.base import Record
+
+
+class ZoneRecords:
+    """Записи одной зоны с индексом по (name, type).
+
+    Поиск по имени и типу выполняется за O(1), ``loaded_at`` - момент загрузки записей из API
+    по ``time.monotonic``, по нему считается устаревание индекса.
+    """
+
+    def __init__(self, records: Iterable[Record]):
+        self.loaded_at = time.monotonic()
+        self._by_id: Dict[str, Record] = {}
+        self._by_key: Dict[Tuple[str, str], Dict[str, Record]] = defaultdict(dict)
+        self._lock = threading.Lock()
+        for record in records:
+            self._add(record)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.loaded_at
+
+    def _add(self, record: Record) -> None:
+        self._by_id[record.id] = record
+        self._by_key[(record.name, str(record.type))][record.id] = record
+
+    def _discard(self, record_id: str) -> None:
+        record = self._by_id.pop(record_id, None)
+        if record is None:
+            return
+        key = (record.name, str(record.type))
+        group = self._by_key[key]
+        group.pop(record_id, None)
+        if not group:
+            del self._by_key[key]
+
+    def add(self, record: Record) -> None:
+        with self._lock:
+            self._discard(record.id)
+            self._add(record)
+
+    def discard(self, record_id: str) -> None:
+        with self._lock:
+            self._discard(record_id)
+
+    def find(self, name: Optional[str] = None, type: Optional[str] = None) -> List[Record]:
+        if name is not None:
+            name = name.rstrip(".")
+        with self._lock:
+            if name is not None and type is not None:
+                return list(self._by_key.get((name, str(type)), {}).values())
+            return [
+                r
+                for r in self._by_id.values()
+                if (name is None or r.name == name) and (type is None or str(r.type) == str(type))
+            ]
@@ -0,0 +1,187 @@
+import random
+import re
+import sys
+import threading
+import time
+from typing import Callable, Collection, Dict, Optional
+
+from libcloud.common.types import LibcloudError
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# id, ctid и имена доменов в пути заменяются на {id}
+_ID_SEGMENT = re.compile(r"^(\d+|[^/]+\.[^/]+)$")
+
+
+def route_template(action: str) -> str:
+    """Нормализует путь запроса: ``v1/domains/68155/records/504`` -> ``v1/domains/{id}/records/{id}``"""
+    path = action.split("?", 1)[0].lstrip("/")
+    return "/".join("{id}" if _ID_SEGMENT.match(s) else s for s in path.split("/"))
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP код из исключений libcloud"""
+    status = getattr(error, "code", None)
+    if status is None:
+        status = getattr(error, "http_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _network_errors() -> tuple:
+    # сетевые ошибки requests и сокетов наследуют OSError, а у aiohttp и asyncio свои классы;
+    # если модуль ещё не импортирован, его исключений быть не может, поэтому он не импортируется
+    errors = [OSError]
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is not None:
+        errors.append(asyncio.TimeoutError)
+    aiohttp = sys.modules.get("aiohttp")
+    if aiohttp is not None:
+        errors.extend((aiohttp.ClientConnectionError, aiohttp.ClientPayloadError))
+    return tuple(errors)
+
+
+def is_transient_error(error: BaseException, statuses: Collection[int] = RETRY_STATUSES) -> bool:
+    if isinstance(error, _network_errors()):
+        return True
+    status = error_status(error)
+    return status is not None and status in statuses
+
+
+class CircuitOpenError(LibcloudError):
+    """Запросы к маршруту временно не выполняются: API отвечает ошибками"""
+
+    def __init__(self, route: str, retry_in: float, driver=None):
+        self.route = route
+        self.retry_in = retry_in
+        super().__init__(f"Circuit for {route} is open, retry in {retry_in:.1f}s", driver)
+
+
+class RetryPolicy:
+    """Повтор запросов с экспоненциальной задержкой и случайным разбросом (full jitter).
+
+    Повторяются только идемпотентные ``methods``; ответ 429 повторяется для любого метода,
+    так как API отклонил запрос, не выполняя его. Если в ответе есть ``Retry-After``,
+    задержка не меньше указанной сервером.
+    """
+
+    def __init__(
+        self,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        methods: Collection[str] = IDEMPOTENT_METHODS,
+        statuses: Collection[int] = RETRY_STATUSES,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if retries < 0:
+            raise ValueError("retries must not be negative")
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.methods = {m.upper() for m in methods}
+        self.statuses = tuple(statuses)
+        self.sleep = sleep
+
+    def should_retry(self, method: str, error: Exception, attempt: int) -> bool:
+        if attempt >= self.retries or not is_transient_error(error, self.statuses):
+            return False
+        return method.upper() in self.methods or error_status(error) == 429
+
+    def delay(self, attempt: int, error: Optional[Exception] = None) -> float:
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def _retry_after(error: Optional[Exception]) -> Optional[float]:
+    headers = getattr(error, "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class _Circuit:
+    __slots__ = ("failures", "opened_at", "trial")
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+
+
+class CircuitBreaker:
+    """Размыкатель цепи по маршрутам API.
+
+    После ``failure_threshold`` ошибок подряд (5xx, 429, сетевые) запросы к маршруту сразу
+    завершаются ``CircuitOpenError``. Через ``reset_timeout`` секунд пропускается один пробный
+    запрос: при успехе цепь замыкается, при ошибке снова размыкается.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        statuses: Collection[int] = (429, 500, 502, 503, 504),
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be positive")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.statuses = tuple(statuses)
+        self._timer = timer
+        self._circuits: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def before_request(self, route: str) -> None:
+        with self._lock:
+            circuit = self._circuits.get(route)
+            if circuit is None or circuit.opened_at is None:
+                return
+            retry_in = circuit.opened_at + self.reset_timeout - self._timer()
+            if retry_in > 0 or circuit.trial:
+                raise CircuitOpenError(route, max(retry_in, 0.0))
+            circuit.trial = True
+
+    def record(self, route: str, error: Optional[Exception] = None) -> None:
+        """Учитывает результат запроса; ошибки клиента (404, 409 и т.п.) считаются успехом"""
+        failed = error is not None and is_transient_error(error, self.statuses)
+        with self._lock:
+            circuit = self._circuits.get(route)
+            if not failed:
+                if circuit is not None:
+                    del self._circuits[route]
+                return
+            if circuit is None:
+                circuit = self._circuits[route] = _Circuit()
+            circuit.failures += 1
+            if circuit.trial or circuit.failures >= self.failure_threshold:
+                circuit.opened_at = self._timer()
+            circuit.trial = False
+
+    def release(self, route: str) -> None:
+        """Снимает пробный запрос без учёта результата, например если его отменили"""
+        with self._lock:
+            circuit = self._circuits.get(route)
+            if circuit is not None:
+                circuit.trial = False
+
+    def _state(self, circuit: Optional[_Circuit]) -> str:
+        if circuit is None or circuit.opened_at is None:
+            return "closed"
+        if circuit.trial or circuit.opened_at + self.reset_timeout <= self._timer():
+            return "half-open"
+        return "open"
+
+    def state(self, route: str) -> str:
+        with self._lock:
+            return self._state(self._circuits.get(route))
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {route: {"state": self._state(c), "failures": c.failures} for route, c in self._circuits.items()}
@@ -0,0 +1,93 @@
+import copy
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def follower_copy(response):
+    # копия разобранного ответа: разбор ответа драйвером меняет object на месте (_to_zone забирает id и name)
+    response = copy.copy(response)
+    response.object = copy.deepcopy(response.object)
+    return response
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "abandoned")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        # ведущий прерван (KeyboardInterrupt, отмена): ведомые повторяют вызов сами
+        self.abandoned = False
+
+
+class SingleFlight:
+    """Объединяет одновременные одинаковые запросы в один.
+
+    Первый вызов ``do`` с ключом выполняет ``func``, остальные вызовы с тем же ключом,
+    пришедшие до его завершения, ждут и получают копию того же ответа или то же исключение.
+    Ведомым достаётся копия, снятая до возврата ответа ведущему, поэтому изменения ответа
+    ведущим их не затрагивают.
+    Если ведущего прервали, его прерывание ведомым не передаётся: они повторяют вызов.
+    Результаты не кешируются: следующий вызов после завершения снова идёт в API.
+    """
+
+    _registry: Dict[str, "SingleFlight"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        # _Call, у AsyncSingleFlight - asyncio.Future
+        self._in_flight: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_key(cls, key: str) -> "SingleFlight":
+        """Возвращает общий для токена экземпляр"""
+        with cls._registry_lock:
+            flight = cls._registry.get(key)
+            if flight is None:
+                flight = cls._registry[key] = cls()
+            return flight
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._in_flight.get(key)
+            if call is None:
+                call = self._in_flight[key] = _Call()
+                leader = True
+                self.calls += 1
+            else:
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.abandoned:
+                with self._lock:
+                    self.coalesced -= 1
+                return self.do(key, func)
+            if call.error is not None:
+                raise call.error
+            return follower_copy(call.result)
+
+        try:
+            result = func()
+            # нетронутая копия для ведомых: ведущий может изменить свой ответ раньше, чем они его скопируют
+            call.result = follower_copy(result)
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            call.abandoned = True
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._in_flight)}
@@ -0,0 +1,207 @@
+import threading
+import weakref
+from typing import Any, Callable, Collection, Dict, List, MutableMapping, NamedTuple, Optional, Type, TypeVar, cast
+
+from vscaledriver.inventory import NodeChanges, NodeSnapshot
+
+W = TypeVar("W", bound="NodeWatcher")
+
+
+class NodeTransition(NamedTuple):
+    """Смена состояния скалета. ``old_state`` - None для нового скалета, ``new_state`` - None для удалённого"""
+
+    node: Any
+    old_state: Optional[str]
+    new_state: Optional[str]
+
+
+class _Subscription(NamedTuple):
+    callback: Callable[[NodeTransition], None]
+    states: Optional[Collection[str]]
+    node_ids: Optional[Collection[str]]
+
+    def matches(self, transition: NodeTransition) -> bool:
+        if self.node_ids is not None and transition.node.id not in self.node_ids:
+            return False
+        return self.states is None or transition.new_state in self.states
+
+
+class NodeWatcher:
+    """Один фоновый опрос ``v1/scalets`` на всех подписчиков.
+
+    Каждый шаг - ``ex_list_node_changes`` от прошлого снимка, подписчики получают
+    ``NodeTransition`` при смене состояния (``NODE_STATE_MAP``), появлении и удалении скалета.
+    Первый опрос только запоминает инвентарь. Пока ничего не меняется, интервал опроса растёт
+    в ``backoff`` раз до ``max_wait_period``, после любого изменения сбрасывается на ``wait_period``.
+
+    Ошибки API и исключения подписчиков не останавливают опрос, они передаются в ``on_error``.
+
+    Watcher может быть общим для нескольких частей приложения: каждый ``start()`` (или ``with``)
+    должен завершаться своим ``stop()``, опрос останавливается после последнего из них.
+    """
+
+    # слабые ссылки: остановленный и никем не используемый watcher освобождается вместе с драйвером
+    _registry: MutableMapping[tuple, "NodeWatcher"] = weakref.WeakValueDictionary()
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        driver,
+        wait_period: float = 5,
+        max_wait_period: float = 60,
+        backoff: float = 1.5,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ):
+        self.driver = driver
+        self.wait_period = wait_period
+        self.max_wait_period = max_wait_period
+        self.backoff = backoff
+        self.on_error = on_error
+        self.interval = wait_period
+        self.polls = 0
+        self.last_error: Optional[Exception] = None
+        self._nodes: Dict[str, Any] = {}
+        self._snapshot: Optional[NodeSnapshot] = None
+        self._subscriptions: List[_Subscription] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # сколько раз watcher запущен и ещё не остановлен
+        self._users = 0
+
+    @classmethod
+    def for_driver(cls: Type[W], driver, **kwargs) -> W:
+        """Возвращает общий для токена и адреса API watcher, при первом вызове создаёт его с параметрами ``kwargs``.
+
+        Если watcher уже создан с другими параметрами, выбрасывается ``ValueError``.
+        """
+        key = (driver.key, driver.connection.host, driver.connection.port)
+        with cls._registry_lock:
+            watcher = cls._registry.get(key)
+            if watcher is None:
+                watcher = cls._registry[key] = cls(driver, **kwargs)
+            conflicts = [
+                f"{name}={getattr(watcher, name, None)!r}"
+                for name, value in kwargs.items()
+                if getattr(watcher, name, None) != value
+            ]
+            if conflicts:
+                raise ValueError(f"NodeWatcher for this account is already created with {', '.join(conflicts)}")
+            return cast(W, watcher)
+
+    @property
+    def nodes(self) -> List[Any]:
+        """Ноды по результату последнего опроса"""
+        with self._lock:
+            return list(self._nodes.values())
+
+    def subscribe(
+        self,
+        callback: Callable[[NodeTransition], None],
+        states: Optional[Collection[str]] = None,
+        node_ids: Optional[Collection[str]] = None,
+    ) -> Callable[[], None]:
+        """Подписывает ``callback`` на переходы в ``states`` для нод ``node_ids`` (None - все).
+
+        Возвращает функцию для отписки.
+        """
+        subscription = _Subscription(callback, states, None if node_ids is None else {str(i) for i in node_ids})
+        with self._lock:
+            self._subscriptions.append(subscription)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if subscription in self._subscriptions:
+                    self._subscriptions.remove(subscription)
+
+        return unsubscribe
+
+    def _apply(self, changes: NodeChanges) -> List[NodeTransition]:
+        transitions = []
+        with self._lock:
+            baseline = self._snapshot is None
+            for node in changes.added:
+                self._nodes[node.id] = node
+                if not baseline:
+                    transitions.append(NodeTransition(node, None, node.state))
+            for node in changes.modified:
+                old = self._nodes.get(node.id)
+                self._nodes[node.id] = node
+                if old is not None and old.state != node.state:
+                    transitions.append(NodeTransition(node, old.state, node.state))
+            for node_id in changes.removed:
+                old = self._nodes.pop(node_id, None)
+                if old is not None:
+                    transitions.append(NodeTransition(old, old.state, None))
+            self._snapshot = changes.snapshot
+            subscriptions = list(self._subscriptions)
+            self.polls += 1
+
+        # изменения без смены состояния тоже считаются активностью
+        self.interval = (
+            self.wait_period if changes and not baseline else min(self.interval * self.backoff, self.max_wait_period)
+        )
+        for transition in transitions:
+            for subscription in subscriptions:
+                if subscription.matches(transition):
+                    try:
+                        subscription.callback(transition)
+                    except Exception as e:
+                        self._error(e)
+        return transitions
+
+    def _error(self, error: Exception) -> None:
+        self.last_error = error
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def poll(self) -> List[NodeTransition]:
+        """Один шаг опроса: запрашивает изменения и уведомляет подписчиков"""
+        return self._apply(self.driver.ex_list_node_changes(since=self._snapshot))
+
+    def _run(self, stopped: threading.Event, previous: Optional[threading.Thread]) -> None:
+        # поток, остановленный перед этим start(), может ещё опрашивать API
+        if previous is not None:
+            previous.join()
+        while not stopped.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                self.interval = min(self.interval * self.backoff, self.max_wait_period)
+                self._error(e)
+            stopped.wait(self.interval)
+
+    def start(self) -> "NodeWatcher":
+        with self._lock:
+            self._users += 1
+            # у каждого потока своё событие остановки, stop() не может остановить поток следующего start()
+            if self._thread is None or not self._thread.is_alive() or self._stopped.is_set():
+                self._stopped = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._stopped, self._thread), name="vscale-node-watcher", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def _release(self) -> bool:
+        """Снимает один ``start()``, True - больше никто не использует опрос"""
+        with self._lock:
+            self._users = max(self._users - 1, 0)
+            return self._users == 0
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Завершает один ``start()``, опрос останавливается, когда завершены все"""
+        with self._lock:
+            self._users = max(self._users - 1, 0)
+            if self._users:
+                return
+            self._stopped.set()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def __enter__(self) -> "NodeWatcher":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
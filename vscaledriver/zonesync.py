@@ -0,0 +1,100 @@
+from collections import defaultdict
+from typing import Any, Collection, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from libcloud.dns.base import Record
+
+from vscaledriver.bulk import BulkResult
+
+RecordKey = Tuple[str, str, str]
+
+
+def _name_key(name: str) -> str:
+    # имена сравниваются без учёта регистра и точки в конце, как в API
+    return name.rstrip(".").lower()
+
+
+class DesiredRecord(NamedTuple):
+    name: str
+    type: str
+    data: str
+    # ttl, priority и т.п., в сравнении записей не участвуют
+    extra: Optional[dict] = None
+
+    @property
+    def key(self) -> RecordKey:
+        return _name_key(self.name), self.type, self.data
+
+
+class ZoneSyncPlan(NamedTuple):
+    """Минимальный набор изменений, приводящий зону к желаемому состоянию"""
+
+    create: List[DesiredRecord]
+    update: List[Tuple[Record, DesiredRecord]]
+    delete: List[Record]
+    unchanged: int
+
+    def __len__(self) -> int:
+        return len(self.create) + len(self.update) + len(self.delete)
+
+
+class ZoneSyncResult(NamedTuple):
+    plan: ZoneSyncPlan
+    created: BulkResult
+    updated: BulkResult
+    deleted: BulkResult
+
+    def __bool__(self) -> bool:
+        return bool(self.created) and bool(self.updated) and bool(self.deleted)
+
+
+def to_desired_record(record: Any) -> DesiredRecord:
+    """Приводит ``Record``, словарь с ключами name/type/data/extra или кортеж (name, type, data[, extra]) к ``DesiredRecord``"""
+    if isinstance(record, Record):
+        extra = dict(record.extra or {})
+        if record.ttl is not None:
+            extra["ttl"] = record.ttl
+        return DesiredRecord(record.name, str(record.type), record.data, extra or None)
+    if isinstance(record, dict):
+        return DesiredRecord(record["name"], str(record["type"]), record["data"], record.get("extra"))
+    name, record_type, data, *extra = record
+    return DesiredRecord(name, str(record_type), data, extra[0] if extra else None)
+
+
+def plan_zone_sync(current: Iterable[Record], desired: Iterable[Any], ignore_types: Collection[str] = ()) -> ZoneSyncPlan:
+    """Сравнивает записи по (name, type, data), имена - без учёта регистра и точки в конце.
+
+    Лишняя и недостающая запись с одинаковыми name и type превращаются в одно обновление
+    вместо удаления и создания. Записи типов из ``ignore_types`` не трогаются.
+    """
+    ignore_types = {str(t) for t in ignore_types}
+
+    wanted: Dict[RecordKey, DesiredRecord] = {}
+    for item in desired:
+        record = to_desired_record(item)
+        if record.type not in ignore_types:
+            wanted[record.key] = record
+
+    unchanged = 0
+    extra: Dict[Tuple[str, str], List[Record]] = defaultdict(list)
+    for record in current:
+        key = to_desired_record(record)
+        if key.type in ignore_types:
+            continue
+        if wanted.pop(key.key, None) is not None:
+            unchanged += 1
+        else:
+            extra[key.key[:2]].append(record)
+
+    missing: Dict[Tuple[str, str], List[DesiredRecord]] = defaultdict(list)
+    for record in wanted.values():
+        missing[record.key[:2]].append(record)
+
+    plan = ZoneSyncPlan(create=[], update=[], delete=[], unchanged=unchanged)
+    for group in sorted(set(extra) | set(missing)):
+        to_delete = extra.get(group, [])
+        to_create = missing.get(group, [])
+        paired = min(len(to_delete), len(to_create))
+        plan.update.extend(zip(to_delete[:paired], to_create[:paired]))
+        plan.delete.extend(to_delete[paired:])
+        plan.create.extend(to_create[paired:])
+    return plan